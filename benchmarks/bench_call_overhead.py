@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Per-call overhead of the bridge, before and after the lean server commands.
+
+"before" goes through pymat_eval, the way run_func, get_variable and
+set_variable used to (stdout capture, figure export, rehash). "after" uses
+the call/get/set commands. The work done in Matlab is trivial, so the
+difference is the per-call overhead.
+
+Usage::
+
+    python benchmarks/bench_call_overhead.py [--backend octave] [-n 200]
+"""
+
+from __future__ import print_function
+
+import argparse
+
+from common import Case, add_backend_argument, make_session, time_calls
+
+
+def cases(session, backend):
+    session.set_variable('x', 1.0)
+    return [
+        Case('call/empty', lambda: session.run_func('plus', 1, 2,
+                                                    capture=False)),
+        Case('call/captured', lambda: session.run_func('plus', 1, 2)),
+        Case('run_code', lambda: session.run_code('x = 1;')),
+        Case('get_variable/scalar', lambda: session.get_variable('x')),
+        Case('set_variable/scalar', lambda: session.set_variable('x', 1.0)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    add_backend_argument(parser)
+    parser.add_argument('-n', '--number', type=int, default=200,
+                        help='number of calls per benchmark')
+    args = parser.parse_args()
+
+    session = make_session(args.backend)
+    session.start()
+    try:
+        session.set_variable('x', 1.0)
+        cases = [
+            ('run_func', lambda: session.run_func('plus', 1, 2),
+             lambda: session.run_func('plus', 1, 2, capture=False)),
+            ('get_variable', lambda: session.run_func('evalin', 'base', 'x'),
+             lambda: session.get_variable('x')),
+            ('set_variable',
+             lambda: session.run_func('assignin', 'base', 'x', 1.0, nargout=0),
+             lambda: session.set_variable('x', 1.0)),
+        ]
+        print('%-14s %12s %12s' % ('operation', 'before [ms]', 'after [ms]'))
+        for name, before, after in cases:
+            print('%-14s %12.3f %12.3f' % (
+                name, time_calls(before, args.number)[0] * 1e3,
+                time_calls(after, args.number)[0] * 1e3))
+    finally:
+        session.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Time spent serializing cells and structs in Matlab, by JSON codec.
+
+The same payloads are sent and fetched with the Java codec (org.json, one
+element at a time) and with the native one (jsonencode and jsondecode),
+where Matlab or Octave has it (see json_codec): a cell of strings, a struct
+array and a 3-d cell array. Numeric arrays are sent as raw bytes by both,
+and aren't timed here.
+
+Usage::
+
+    python benchmarks/run.py -k codec
+"""
+
+from __future__ import print_function
+
+from common import Case, Skip
+
+
+def codecs(session):
+    """The codecs the server has, ending with the one it uses by default"""
+    if not session.run_func('json_codec', 'native', capture=False)['success']:
+        return ['java']
+    return ['java', 'native']
+
+
+def cases(session, backend):
+    if backend == 'fake':
+        raise Skip('the fake server has no JSON codecs')
+    current = [None]
+
+    def using(codec, func):
+        def call():
+            if current[0] != codec:
+                session.run_func('json_codec', codec, nargout=0,
+                                 capture=False)
+                current[0] = codec
+            func()
+        return call
+
+    strings = ['item %d' % i for i in range(10000)]
+    structs = [dict(name='item %d' % i, value=float(i), flag=i % 2 == 0)
+               for i in range(1000)]
+    session.run_code('codec_cell3 = num2cell(rand(20, 20, 20));')
+
+    cases = []
+    for codec in codecs(session):
+        name = 'codec/%s/' % codec
+        cases += [
+            Case(name + 'set/cellstr/1e+04',
+                 using(codec, lambda: session.set_variable('codec_c',
+                                                           strings))),
+            Case(name + 'get/cellstr/1e+04',
+                 using(codec, lambda: session.get_variable('codec_c'))),
+            Case(name + 'set/struct_array/1e+03',
+                 using(codec, lambda: session.set_variable('codec_s',
+                                                           structs))),
+            Case(name + 'get/struct_array/1e+03',
+                 using(codec, lambda: session.get_variable('codec_s'))),
+            Case(name + 'get/cell3/8e+03',
+                 using(codec, lambda: session.get_variable('codec_cell3'))),
+        ]
+    return cases
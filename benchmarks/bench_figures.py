@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+Cost of returning figures from run_code, by format.
+
+The same plot is made without returning figures, and returned as png and as
+svg.
+
+Usage::
+
+    python benchmarks/run.py -k figures
+"""
+
+from __future__ import print_function
+
+from common import Case, Skip
+
+CODE = 'plot(1:100);'
+
+
+def cases(session, backend):
+    if backend == 'fake':
+        raise Skip('the fake server does not make figures')
+    return [
+        Case('figures/none', lambda: session.run_code(CODE, figures=False)),
+        Case('figures/png', lambda: session.run_code(CODE,
+                                                     figure_format='png')),
+        Case('figures/svg', lambda: session.run_code(CODE,
+                                                     figure_format='svg')),
+    ]
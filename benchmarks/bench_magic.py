@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Overhead of the %%matlab cell magic, over run_code.
+
+The magic sets the plot settings, parses its arguments and publishes the
+output of each cell, and sends the -i variables and fetches the -o ones.
+The cells run in the session of the benchmark.
+
+Usage::
+
+    python benchmarks/run.py -k magic
+"""
+
+from __future__ import print_function
+
+from common import Case, Skip
+
+
+def make_magics(session):
+    try:
+        from IPython.core.magic import Magics
+        from IPython.testing.globalipapp import get_ipython
+        from pymatbridge.matlab_magic import MatlabMagics
+    except ImportError as e:
+        raise Skip('the magic can not be imported (%s)' % e)
+
+    class SessionMagics(MatlabMagics):
+        """The magics, with a session that's started already"""
+
+        def __init__(self, shell, session):
+            Magics.__init__(self, shell)
+            self.Matlab = session
+            self.pyconverter = lambda value: value
+
+    shell = get_ipython()
+    shell.register_magics(SessionMagics(shell, session))
+    return shell
+
+
+def cases(session, backend):
+    shell = make_magics(session)
+    shell.user_ns['x'] = 1.0
+    return [
+        Case('magic/run_code', lambda: session.run_code('a = 1;')),
+        Case('magic/cell', lambda: shell.run_cell_magic('matlab', '',
+                                                        'a = 1;')),
+        Case('magic/cell/input_output',
+             lambda: shell.run_cell_magic('matlab', '-i x -o y', 'y = x;')),
+    ]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Per-iteration cost of feeding a function an input that changes every time.
+
+"set_variable" sends the input with set_variable before each call. "share"
+rewrites a shared array in place and syncs it, so that only the call goes
+over the socket. The function (sum) is cheap, so the difference is the cost
+of the transfer.
+
+Usage::
+
+    python benchmarks/bench_shared_array.py [--backend octave] [-n 200]
+                                            [--size 1e6]
+"""
+
+from __future__ import print_function
+
+import argparse
+
+import numpy as np
+
+from common import (Case, Skip, add_backend_argument, make_session,
+                    time_calls)
+
+
+def with_set_variable(session, data):
+    def call():
+        data[0] += 1
+        session.set_variable('v', data)
+        session.run_func('sum', session.var['v'], capture=False)
+    return call
+
+
+def with_share(session, shared):
+    def call():
+        shared.array[0] += 1
+        shared.sync()
+        session.run_func('sum', shared, capture=False)
+    return call
+
+
+def cases(session, backend, size=1e6):
+    if session.shared_dir is None:
+        raise Skip('arrays are only shared on Linux')
+    data = np.random.random_sample(int(size))
+    shared = session.share('u', data)
+    return [Case('share/set_variable/1e6', with_set_variable(session, data),
+                 nbytes=data.nbytes),
+            Case('share/sync/1e6', with_share(session, shared),
+                 nbytes=data.nbytes)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    add_backend_argument(parser)
+    parser.add_argument('-n', '--number', type=int, default=200,
+                        help='number of iterations per benchmark')
+    parser.add_argument('--size', type=float, default=1e6,
+                        help='number of elements of the input')
+    args = parser.parse_args()
+
+    session = make_session(args.backend)
+    session.start()
+    try:
+        data = np.random.random_sample(int(args.size))
+        shared = session.share('u', data)
+        print('%-14s %12s' % ('input', 'time [ms]'))
+        print('%-14s %12.3f' % ('set_variable', time_calls(
+            with_set_variable(session, data), args.number)[0] * 1e3))
+        print('%-14s %12.3f' % ('share', time_calls(
+            with_share(session, shared), args.number)[0] * 1e3))
+    finally:
+        session.stop()
+
+
+if __name__ == '__main__':
+    main()
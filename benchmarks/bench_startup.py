@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Time to start a session, and the memory its server takes, with and without
+the JVM.
+
+Each call starts a new session of the backend (with jvm=True, then with
+jvm=False where the server has jsonencode and jsondecode) and stops it
+again. Run on its own, this module also prints the resident memory of the
+server after its first call.
+
+Usage::
+
+    python benchmarks/bench_startup.py [--backend octave] [-n 5]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from common import Case, Skip, add_backend_argument, session_options
+
+
+def modes(session):
+    """The values of jvm the server can run with"""
+    if session.run_func('exist', 'jsondecode', capture=False)['result'] > 0:
+        return [True, False]
+    return [True]
+
+
+def start_session(backend, jvm):
+    """A started session of the backend, and the seconds it took to start"""
+    cls, kwargs = session_options(backend)
+    session = cls(jvm=jvm, **kwargs)
+    start = time.time()
+    session.start()
+    return session, time.time() - start
+
+
+def restart(backend, jvm):
+    def call():
+        session, _ = start_session(backend, jvm)
+        session.stop()
+    return call
+
+
+def cases(session, backend):
+    if backend == 'fake':
+        raise Skip('the fake server has no JVM')
+    return [Case('startup/%s' % ('jvm' if jvm else 'nojvm'),
+                 restart(backend, jvm), number=3)
+            for jvm in modes(session)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    add_backend_argument(parser)
+    parser.add_argument('-n', '--number', type=int, default=5,
+                        help='number of sessions started per mode')
+    args = parser.parse_args()
+    if args.backend == 'fake':
+        parser.error('the fake server has no JVM')
+
+    session, _ = start_session(args.backend, True)
+    try:
+        jvms = modes(session)
+    finally:
+        session.stop()
+
+    print('%-8s %12s %12s' % ('mode', 'startup [s]', 'RSS [MB]'))
+    for jvm in jvms:
+        times = []
+        for _ in range(args.number):
+            session, seconds = start_session(args.backend, jvm)
+            try:
+                session.run_func('plus', 1, 2, capture=False)
+                memory = session.stats()['call']['memory']
+            finally:
+                session.stop()
+            times.append(seconds)
+        print('%-8s %12.2f %12s' % (
+            'jvm' if jvm else 'nojvm', min(times),
+            '%.0f' % (memory / 2.**20) if memory >= 0 else 'n/a'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Throughput of set_variable and get_variable, by type and size.
+
+Arrays of each dtype are sent and fetched back. 'set_variable/kept' sends the
+same array with blobs turned on (see blob_bytes), to show what keeping it on
+the server saves, or costs where it is handed over through a file anyway.
+Sparse matrices, cells of strings and structs are timed too.
+
+Usage::
+
+    python benchmarks/bench_transfer.py [--backend octave] [-n 20] [-k 1e6]
+"""
+
+from __future__ import print_function
+
+import argparse
+import re
+
+import numpy as np
+
+from common import Case, add_backend_argument, make_session, time_calls
+
+DTYPES = ('float64', 'float32', 'int32', 'uint8', 'bool', 'complex128')
+
+SIZES = (1e3, 1e5, 1e6)
+
+
+def make_array(dtype, size):
+    data = np.random.random_sample(int(size)) * 100
+    if dtype == 'bool':
+        return data > 50
+    if dtype == 'complex128':
+        return data + 1j * data
+    return data.astype(dtype)
+
+
+def with_blobs(session, func):
+    """Call func with the big arguments kept by the server"""
+    def call():
+        session.blob_bytes = 2**20
+        try:
+            func()
+        finally:
+            del session.blob_bytes
+    return call
+
+
+def number_for(nbytes):
+    """Fewer calls for bigger transfers"""
+    return 5 if nbytes > 2**22 else None
+
+
+def cases(session, backend):
+    cases = []
+    for dtype in DTYPES:
+        for size in SIZES:
+            data = make_array(dtype, size)
+            name = '%s/%.0e' % (dtype, size)
+            cases.append(Case(
+                'set_variable/' + name,
+                lambda data=data: session.set_variable('x', data),
+                nbytes=data.nbytes, number=number_for(data.nbytes)))
+            varname = 'x_%s_%d' % (dtype, size)
+            session.set_variable(varname, data)
+            cases.append(Case(
+                'get_variable/' + name,
+                lambda varname=varname: session.get_variable(varname),
+                nbytes=data.nbytes, number=number_for(data.nbytes)))
+
+    data = make_array('float64', SIZES[-1])
+    cases.append(Case('set_variable/kept/float64/1e+06',
+                      with_blobs(session,
+                                 lambda: session.set_variable('x', data)),
+                      nbytes=data.nbytes))
+
+    cells = ['item %d' % i for i in range(1000)]
+    cases.append(Case('set_variable/cell/1e+03',
+                      lambda: session.set_variable('c', cells)))
+    cases.append(Case('get_variable/cell/1e+03',
+                      lambda: session.get_variable('c')))
+    struct = dict(('field%d' % i, float(i)) for i in range(100))
+    cases.append(Case('set_variable/struct/1e+02',
+                      lambda: session.set_variable('s', struct)))
+    cases.append(Case('get_variable/struct/1e+02',
+                      lambda: session.get_variable('s')))
+
+    if backend != 'fake':
+        try:
+            import scipy.sparse
+        except ImportError:
+            pass
+        else:
+            sparse = scipy.sparse.random(1000, 1000, density=0.01,
+                                         format='csc')
+            cases.append(Case('set_variable/sparse/1e+04',
+                              lambda: session.set_variable('m', sparse)))
+            cases.append(Case('get_variable/sparse/1e+04',
+                              lambda: session.get_variable('m')))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    add_backend_argument(parser)
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help='number of calls per benchmark')
+    parser.add_argument('-k', dest='pattern', default=None,
+                        help='only run the benchmarks whose name matches this '
+                             'regular expression')
+    args = parser.parse_args()
+
+    session = make_session(args.backend)
+    session.start()
+    try:
+        print('%-36s %12s %12s' % ('benchmark', 'time [ms]', 'MB/s'))
+        for case in cases(session, args.backend):
+            if args.pattern and not re.search(args.pattern, case.name):
+                continue
+            ms = time_calls(case.func, case.number or args.number)[0] * 1e3
+            print('%-36s %12.3f %12s' % (
+                case.name, ms, '%.1f' % (case.nbytes / ms * 1e3 / 2**20)
+                if case.nbytes else ''))
+    finally:
+        session.stop()
+
+
+if __name__ == '__main__':
+    main()
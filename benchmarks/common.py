@@ -0,0 +1,85 @@
+"""
+What the benchmarks share: how to start a session for a backend, and how to
+time a call.
+
+Each benchmark module has a function ``cases(session, backend)``, which
+returns the `Case`s to time against a started session (run.py runs them
+all), or raises `Skip`. Most modules can be run on their own as well.
+"""
+
+from __future__ import print_function
+
+import time
+
+import pymatbridge as pymat
+from pymatbridge.testing import FakeSession
+
+BACKENDS = ('matlab', 'octave', 'fake')
+
+
+class Skip(Exception):
+    """Raised by cases() when its benchmarks can't run against a backend"""
+
+
+class Case(object):
+
+    def __init__(self, name, func, nbytes=None, number=None):
+        """
+        Something to time.
+
+        Parameters
+        ----------
+
+        name : str
+            Name of the benchmark, e.g. 'set_variable/float64/1e6'.
+
+        func : callable
+            Called without arguments, `number` times in a row.
+
+        nbytes : int, optional
+            Bytes transferred by each call, to report a throughput.
+
+        number : int, optional
+            Number of calls per repeat, instead of the runner's default.
+        """
+        self.name = name
+        self.func = func
+        self.nbytes = nbytes
+        self.number = number
+
+
+def session_options(backend):
+    """The class and keyword arguments of a session for a backend"""
+    if backend == 'matlab':
+        return pymat.Matlab, {}
+    elif backend == 'octave':
+        return pymat.Octave, {}
+    elif backend == 'fake':
+        return FakeSession, {}
+    raise ValueError('Unknown backend %s' % backend)
+
+
+def make_session(backend):
+    cls, kwargs = session_options(backend)
+    return cls(**kwargs)
+
+
+def add_backend_argument(parser):
+    parser.add_argument('--backend', choices=BACKENDS, default='matlab',
+                        help='what to benchmark against (fake is a Python '
+                             'server, which measures the bridge alone)')
+    parser.add_argument('--octave', action='store_const', const='octave',
+                        dest='backend', help='same as --backend octave')
+
+
+def time_calls(func, number, repeat=1):
+    """Call `func` once to warm up, then `number` times in a row, `repeat`
+    times over, and return the seconds per call of each repeat"""
+    func()  # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            func()
+        times.append((time.time() - start) / number)
+    return times
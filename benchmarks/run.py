@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Runs the benchmarks of all the bench_*.py modules against one backend.
+
+Each case is called `number` times in a row, `repeat` times over, and the
+time per call of each repeat is kept. The table printed shows the best and
+median times, and the throughput for transfers. --json writes the results,
+along with the versions and machine they were measured on, for comparison
+between runs.
+
+Usage::
+
+    python benchmarks/run.py [--backend matlab|octave|fake] [-n 20]
+                             [--repeat 5] [-k set_variable] [--json out.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import glob
+import importlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+import numpy as np
+
+import pymatbridge as pymat
+from common import Skip, add_backend_argument, make_session, time_calls
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def modules():
+    """The benchmark modules, by name"""
+    names = sorted(os.path.splitext(os.path.basename(path))[0]
+                   for path in glob.glob(os.path.join(HERE, 'bench_*.py')))
+    return [importlib.import_module(name) for name in names]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.STDOUT
+                                       ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine(session, backend):
+    codec = session.run_func('json_codec', capture=False)
+    return dict(backend=backend,
+                server_version=session.run_func('version',
+                                                capture=False)['result'],
+                codec=codec['result'] if codec['success'] else None,
+                pymatbridge=pymat.__version__, commit=git_commit(),
+                python=platform.python_version(), numpy=np.__version__,
+                platform=platform.platform(), processor=platform.processor(),
+                date=datetime.datetime.now().isoformat())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    add_backend_argument(parser)
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help='calls per repeat (unless a case says otherwise)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of repeats')
+    parser.add_argument('-k', dest='pattern', default=None,
+                        help='only run the cases whose name matches this '
+                             'regular expression')
+    parser.add_argument('--json', default=None,
+                        help='file to write the results to')
+    args = parser.parse_args()
+
+    session = make_session(args.backend)
+    session.start()
+    results = []
+    skipped = {}
+    info = None
+    try:
+        info = machine(session, args.backend)
+        print('%-40s %12s %12s %12s' % ('benchmark', 'best [ms]',
+                                        'median [ms]', 'MB/s'))
+        for module in modules():
+            try:
+                cases = module.cases(session, args.backend)
+            except Skip as e:
+                skipped[module.__name__] = str(e)
+                print('%-40s skipped: %s' % (module.__name__, e))
+                continue
+            for case in cases:
+                if args.pattern and not re.search(args.pattern, case.name):
+                    continue
+                number = case.number or args.number
+                times = time_calls(case.func, number, args.repeat)
+                median = float(np.median(times))
+                result = dict(name=case.name, number=number, times=times,
+                              best=min(times), median=median,
+                              nbytes=case.nbytes, throughput=None)
+                if case.nbytes:
+                    result['throughput'] = case.nbytes / median
+                results.append(result)
+                print('%-40s %12.3f %12.3f %12s' % (
+                    case.name, min(times) * 1000, median * 1000,
+                    '%.1f' % (result['throughput'] / 2**20)
+                    if case.nbytes else ''))
+                sys.stdout.flush()
+    finally:
+        session.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(machine=info, number=args.number,
+                           repeat=args.repeat, results=results,
+                           skipped=skipped), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
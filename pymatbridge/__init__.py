@@ -1,4 +1,6 @@
 from .pymatbridge import *
+from .cache import *
+from .stats import *
 from .version import __version__
 
 try:
@@ -10,3 +12,13 @@ try:
     from .matlab_magic import *
 except ImportError:
     pass
+
+try:
+    from .pool import *
+except ImportError:
+    pass
+
+try:
+    from .aio import *
+except (ImportError, SyntaxError):
+    pass
@@ -0,0 +1,340 @@
+"""
+pymatbridge.aio
+===============
+
+Asyncio versions of the Matlab and Octave sessions. All methods that talk to
+the server are coroutines, so an event loop is never blocked while Matlab is
+busy.
+
+Example
+-------
+
+>>> import asyncio
+>>> from pymatbridge.aio import AsyncMatlab
+>>> async def main():
+...     mlab = AsyncMatlab()
+...     await mlab.start()
+...     roots = await asyncio.gather(mlab.run_func('sqrt', 4.0),
+...                                  mlab.run_func('sqrt', 9.0))
+...     await mlab.stop()
+...     return [r['result'] for r in roots]
+>>> asyncio.run(main())
+[2.0, 3.0]
+
+"""
+
+import asyncio
+import atexit
+import json
+import random
+import time
+from uuid import uuid4
+
+import zmq
+import zmq.asyncio
+
+from .pymatbridge import Matlab, Octave, Batch, decode_message, spmatrix
+
+__all__ = ['AsyncMatlab', 'AsyncOctave', 'AsyncBatch']
+
+
+class _AsyncSession(object):
+    """
+    Replaces the blocking REQ socket of a session by an asyncio DEALER socket.
+
+    Each request carries a unique ID in its envelope, which the server's REP
+    socket echoes back with the reply. Several requests can therefore be
+    queued to the server without waiting for each reply (the server still
+    runs them one at a time), and a request that times out is simply
+    forgotten, instead of leaving the socket waiting for a reply that would
+    have to be received before anything else can be sent.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_AsyncSession, self).__init__(*args, **kwargs)
+        self._pending = {}
+        self._reader = None
+        self._watcher = None
+        # stop() is a coroutine here, so it can't run at interpreter exit
+        atexit.unregister(self.stop)
+        atexit.register(self._stop_at_exit)
+
+    def __getattr__(self, name):
+        raise AttributeError("'%s' object has no attribute '%s' (use run_func "
+                             "to call Matlab functions asynchronously)"
+                             % (type(self).__name__, name))
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(self.__dict__))
+
+    async def start(self):
+        # Setup socket
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.DEALER)
+        if self.platform == "win32":
+            # The stream socket takes the next port
+            rndport = random.randrange(49152, 65535)
+            self.socket_addr = self.socket_addr + ":%s" % rndport
+
+        # Start the MATLAB server in a new process
+        print("Starting %s on ZMQ socket %s" % (self._program_name(), self.socket_addr))
+        print("Send 'exit' command to kill the server")
+        self._run_server()
+
+        # Start the client
+        self.socket.connect(self.socket_addr)
+        self._reader = asyncio.ensure_future(self._read_replies())
+        self._watcher = asyncio.ensure_future(self._watch_server())
+
+        self.started = True
+
+        # Test if connection is established
+        if await self.is_connected():
+            print("%s started and connected!" % self._program_name())
+            await self._negotiate_protocol()
+            await self.set_plot_settings()
+            return self
+        else:
+            raise ValueError("%s failed to start" % self._program_name())
+
+    async def _read_replies(self):
+        """Hand each reply to the request waiting for it"""
+        while True:
+            try:
+                frames = await self.socket.recv_multipart(copy=False)
+            except (zmq.ZMQError, asyncio.CancelledError):
+                return
+            # The envelope is the request ID and an empty delimiter frame
+            future = self._pending.pop(bytes(frames[0]), None)
+            if future is not None and not future.done():
+                future.set_result(frames[2:])
+
+    async def _watch_server(self):
+        """Fail the pending requests as soon as the server process exits"""
+        if self.process is None:
+            return
+        while self.process.poll() is None:
+            await asyncio.sleep(self.exit_check_interval)
+
+        self.started = False
+        error = self._server_exit_error()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._reader.cancel()
+        self.socket.close(linger=0)
+
+    async def _request(self, frames, timeout=None):
+        req_id = uuid4().bytes
+        future = asyncio.get_event_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self.socket.send_multipart([req_id, b''] + frames,
+                                             copy=False)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def _response(self, _timeout=None, **kwargs):
+        while True:
+            times = [time.time()]
+            frames = self._encode_request(kwargs)
+            times.append(time.time())
+            reply = await self._request(frames, _timeout)
+            if not self._forget_blobs(reply):
+                break
+        # Sending is part of the wait here, and the reply isn't decoded in
+        # one place, so the record is complete already
+        now = time.time()
+        reply = self._record_reply(kwargs, frames, reply,
+                                   times + [times[-1], now, now])
+        self._finish_record()
+        return reply
+
+    async def _json_response(self, _timeout=None, **kwargs):
+        return decode_message(await self._response(_timeout, **kwargs))
+
+    async def _negotiate_protocol(self):
+        self._blobs.clear()
+        frames = await self._response(cmd='handshake', protocol='binary',
+                                      blob_budget=self.blob_budget)
+        handshake = self._parse_handshake(frames)
+        self.protocol = handshake['protocol']
+        self.server_timing = handshake['timing']
+        return self.protocol
+
+    async def stop(self, timeout=None):
+        if not self.started:
+            return True
+
+        # Matlab should respond with "exit" if successful
+        frames = await self._response(timeout or self.maxtime, cmd='exit')
+        if bytes(frames[0]) == b"exit":
+            print("%s closed" % self._program_name())
+
+        self._reader.cancel()
+        self._watcher.cancel()
+        self.socket.close(linger=0)
+        self.started = False
+        self.protocol = 'json'
+        self.server_timing = False
+        return True
+
+    def _stop_at_exit(self):
+        """Ask the server to exit, without an event loop"""
+        if not self.started:
+            return
+        context = zmq.Context()
+        socket = context.socket(zmq.REQ)
+        socket.connect(self.socket_addr)
+        socket.send_string(json.dumps(dict(cmd='exit')))
+        socket.poll(1000 * self.maxtime)
+        context.destroy(linger=0)
+        self.started = False
+
+    async def is_connected(self, timeout=None):
+        if not self.started:
+            return False
+
+        try:
+            frames = await self._request([b'{"cmd": "connect"}'],
+                                         timeout or self.maxtime)
+        except asyncio.TimeoutError:
+            print("%s session timed out after %d seconds" % (self._program_name(), self.maxtime))
+            return False
+        return bytes(frames[0]) == b"connected"
+
+    async def run_func(self, func_path, *func_args, **kwargs):
+        """Run a function in Matlab and return the result.
+
+        Takes the same arguments as `Matlab.run_func`, except `stream`
+        (asyncio sessions don't listen to the stream of the server), plus:
+
+        timeout: float, optional
+            Seconds to wait for the result before raising
+            asyncio.TimeoutError. Default is to wait forever.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        if 'stream' in kwargs:
+            raise TypeError('run_func of an asyncio session does not take '
+                            'stream')
+        timeout = kwargs.pop('timeout', None)
+        cache = kwargs.pop('cache', False)
+        if cache is True:
+            cache = self.result_cache
+        request = self._func_request(func_path, *func_args, **kwargs)
+        key = await self._cache_key(request) if cache else None
+        if key is not None:
+            resp = cache.get(key)
+            if resp is not None:
+                return resp
+
+        resp = self._func_response(request,
+                                   await self._response(timeout, **request))
+        if key is not None and resp['success']:
+            cache.put(key, resp)
+        return resp
+
+    async def _cache_key(self, request):
+        if request.get('ref'):
+            return None
+        if self._server_version is None:
+            self._server_version = (await self.run_func(
+                'version', capture=False))['result']
+        name = (request['dname'], request['func_name'])
+        if name not in self._function_files:
+            self._found_function(name, (await self.run_func(
+                'pymat_path', 'which', *name, capture=False))['result'])
+        return self._request_key(request, self._server_version,
+                                 self._checked_function_file(name))
+
+    async def run_code(self, code, timeout=None, **kwargs):
+        return await self.run_func('evalin', 'base', code, nargout=0,
+                                   timeout=timeout, **kwargs)
+
+    async def get_variable(self, varname, default=None, timeout=None,
+                           ref=False, index=None):
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        request, result = self._get_request(varname, ref, index)
+        return result(await self._json_response(timeout, **request), default)
+
+    async def whos(self, varname=None, timeout=None):
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        return self._whos_result(await self._json_response(
+            timeout, cmd='whos', varname=varname or ''))
+
+    async def set_variable(self, varname, value, timeout=None):
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        if isinstance(value, spmatrix):
+            return await self._set_sparse_variable(varname, value)
+        return await self._json_response(timeout, cmd='set', varname=varname,
+                                         value=value)
+
+    async def _set_sparse_variable(self, varname, value):
+        value = value.todok()
+        prefix = 'pymatbridge_temp_sparse_%s_' % uuid4().hex
+        async with self.batch() as batch:
+            batch.set_variable(prefix + 'keys', list(value.keys()))
+            # correct for 1-indexing in MATLAB
+            batch.run_code('{0}keys = {0}keys + 1;'.format(prefix))
+            batch.set_variable(prefix + 'values', list(value.values()))
+            cmd = "{1} = sparse({0}keys(:, 1), {0}keys(:, 2), {0}values');"
+            result = batch.run_code(cmd.format(prefix, varname))
+            batch.run_code('clear {0}keys {0}values'.format(prefix))
+        return result.get()
+
+    async def set_plot_settings(self, width=512, height=384, inline=True):
+        await self.run_func('evalin', 'base',
+                            self._plot_settings_code(width, height, inline),
+                            nargout=0, capture=False)
+
+    def batch(self):
+        """Collect several operations and run them in a single round trip
+
+        Like `Matlab.batch`, but used with ``async with``.
+        """
+        return AsyncBatch(self)
+
+    async def run_batch(self, ops):
+        batch = AsyncBatch(self)
+        results = [getattr(batch, op[0])(*op[1:]) for op in ops]
+        await batch.execute()
+        return results
+
+
+class AsyncBatch(Batch):
+    """A `Batch` for asyncio sessions, which executes with ``async with``"""
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with a batch of an asyncio session")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.execute()
+
+    async def execute(self):
+        ops, results = self._take()
+        if not ops:
+            return self._finish(dict(success=True, failed=-1), [], [])
+        frames = await self.session._response(cmd='batch', ops=ops)
+        header, frames = self.session._split_batch(frames)
+        return self._finish(header, frames, results)
+
+
+class AsyncMatlab(_AsyncSession, Matlab):
+    """A Matlab session whose methods are coroutines (see `Matlab`)"""
+
+
+class AsyncOctave(_AsyncSession, Octave):
+    """An Octave session whose methods are coroutines (see `Octave`)"""
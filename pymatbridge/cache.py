@@ -0,0 +1,124 @@
+"""
+pymatbridge.cache
+=================
+
+A cache of the results of pure Matlab functions, which `run_func` uses for
+the calls made with ``cache=True``.
+
+Example
+-------
+
+>>> from pymatbridge import Matlab, ResultCache
+>>> mlab = Matlab()
+>>> mlab.result_cache = ResultCache(directory='~/.cache/pymatbridge')
+>>> mlab.start()
+>>> b = mlab.run_func('fir1', 48, [0.35, 0.65], cache=True)['result']
+>>> b = mlab.run_func('fir1', 48, [0.35, 0.65], cache=True)['result']
+>>> mlab.result_cache.stats()
+{'hits': 1, 'misses': 1, 'disk_hits': 0, 'entries': 1}
+
+"""
+
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from copy import deepcopy
+
+__all__ = ['ResultCache']
+
+
+class ResultCache(object):
+
+    def __init__(self, max_entries=128, directory=None):
+        """
+        Results by key, the least recently used ones being dropped from
+        memory, and optionally kept on disk as well.
+
+        Parameters
+        ----------
+
+        max_entries : int
+            Number of results kept in memory.
+
+        directory : str, optional
+            A directory in which results are also kept, one pickle file each,
+            so that they are shared by processes and outlive them. Nothing is
+            ever removed from it, except by `clear`.
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        if directory is not None:
+            self.directory = os.path.expanduser(directory)
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key):
+        """The result kept for `key`, or None"""
+        if key in self._entries:
+            value = self._entries.pop(key)
+            self._entries[key] = value
+        else:
+            value = self._load(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        self.hits += 1
+        # The caller is free to change what it gets
+        return deepcopy(value)
+
+    def put(self, key, value):
+        value = deepcopy(value)
+        self._remember(key, value)
+        if self.directory is not None:
+            self._store(key, value)
+
+    def stats(self):
+        """Dictionary with keys 'hits', 'misses', 'disk_hits' (hits that
+        were read from disk) and 'entries' (results kept in memory)"""
+        return dict(hits=self.hits, misses=self.misses,
+                    disk_hits=self.disk_hits, entries=len(self._entries))
+
+    def clear(self):
+        """Forget all results, including those on disk"""
+        self._entries.clear()
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _remember(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _store(self, key, value):
+        # Written aside and renamed, so other processes never read half a
+        # file
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=2)
+            os.rename(path, self._path(key))
+        except (IOError, OSError):
+            if os.path.exists(path):
+                os.remove(path)
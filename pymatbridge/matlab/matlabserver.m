@@ -1,31 +1,184 @@
-function matlabserver(socket_address)
+function matlabserver(socket_address, stream_address)
 % This function takes a socket address as input and initiates a ZMQ session
 % over the socket. I then enters the listen-respond mode until it gets an
 % "exit" command
+%
+% If a second socket address is given, output and progress of requests are
+% streamed over it (see pymat_stream), provided the messenger supports it.
+%
+% With the binary protocol, requests with a true timing field get the time
+% spent in each phase (see pymat_timing) as an extra JSON frame at the end
+% of the response.
+%
+% The session runs json_startup beforehand if the server has a JVM (which
+% has to happen before the messenger starts), or otherwise selects the
+% native JSON codec (see json_codec).
 
-json_startup
-messenger('init', socket_address);
+% Messenger builds that predate multipart messages don't know the 'version'
+% command; those can only talk plain JSON.
+try
+    messenger_version = messenger('version');
+catch
+    messenger_version = 0;
+end
+binary = false;
+
+streaming = nargin > 1 && messenger_version >= 3;
+if streaming && messenger_version >= 4
+    % Without a stream socket (it couldn't be bound), output is only sent
+    % along with the result
+    [ok, streaming] = messenger('init', socket_address, stream_address);
+elseif streaming
+    messenger('init', socket_address, stream_address);
+else
+    messenger('init', socket_address);
+end
+pymat_stream('init', streaming);
 
 c=onCleanup(@()exit);
 
 while(1)
-    msg_in = messenger('listen');
-    req = json_load(msg_in);
+    [msg_in, buffers] = listen_(messenger_version);
+    pymat_timing('start');
+    t = tic;
+    req = json_load(msg_in, 'Buffers', buffers);
+    pymat_timing('add', 'decode', toc(t));
+    timed = binary && isfield(req, 'timing') && req.timing;
+
+    % Clear the variables that the client no longer refers to (see pymat_refs)
+    if isfield(req, 'release')
+        pymat_refs('release', req.release);
+    end
+
+    % Reload the shared variables that the client changed (see pymat_shared)
+    if isfield(req, 'sync')
+        try
+            pymat_shared('load', req.sync);
+        catch ME
+            warning('pymat:sync', '%s', ME.message);
+        end
+    end
+
+    % Ask for the big arguments that were sent before, but are no longer
+    % kept (see pymat_blobs), before doing anything else
+    missing = pymat_blobs('missing', req);
+    if ~isempty(missing)
+        messenger('respond', json_dump(struct('missing_blobs', {missing})));
+        continue
+    end
+
+    % Hand big arrays of the response over through files, if the client
+    % shares a directory with us
+    dump_options = {};
+    if isfield(req, 'shared')
+        dump_options = {'SharedDir', req.shared.dir, ...
+                        'SharedBytes', req.shared.min_bytes};
+    end
 
     switch(req.cmd)
         case {'connect'}
             messenger('respond', 'connected');
 
+        case {'handshake'}
+            binary = isfield(req, 'protocol') && ...
+                strcmp(req.protocol, 'binary') && messenger_version >= 1;
+            protocol = 'json';
+            if binary
+                protocol = 'binary';
+            end
+            stream = streaming && isfield(req, 'stream') && req.stream;
+            % The client starts with no arguments kept
+            pymat_blobs('clear');
+            if isfield(req, 'blob_budget')
+                pymat_blobs('budget', req.blob_budget);
+            end
+            messenger('respond', json_dump(struct('protocol', protocol, ...
+                                                  'stream', stream, ...
+                                                  'timing', binary)));
+
         case {'exit'}
             messenger('exit');
             break;
 
-        case {'eval'}
-            resp = pymat_eval(req);
-            messenger('respond', resp);
+        case {'eval', 'call', 'get', 'set', 'whos'}
+            t = tic;
+            resp = pymat_request(req);
+            pymat_timing('add', 'request', toc(t));
+            respond_(resp, binary, dump_options, timed);
+
+        case {'batch'}
+            t = tic;
+            [resp, results] = pymat_batch(req);
+            pymat_timing('add', 'request', toc(t));
+            respond_batch_(resp, results, binary, dump_options, timed);
 
         otherwise
             messenger('respond', 'i dont know what you want');
     end
 
 end
+
+end %function
+
+
+function [msg_in, buffers] = listen_(messenger_version)
+% Receive a request, along with any binary frames that came with it
+if messenger_version >= 1
+    [msg_in, buffers] = messenger('listen');
+else
+    msg_in = messenger('listen');
+    buffers = {};
+end
+end %function
+
+
+function respond_(resp, binary, dump_options, timed)
+% Send a response, with arrays as separate binary frames if negotiated
+t = tic;
+if binary
+    [json_response, buffers] = json_dump(resp, 'Buffers', true, ...
+                                         dump_options{:});
+    pymat_timing('add', 'encode', toc(t));
+    timing = timing_frame_(timed);
+    messenger('respond', json_response, buffers{:}, timing{:});
+else
+    messenger('respond', json_dump(resp, dump_options{:}));
+end
+end %function
+
+
+function frame = timing_frame_(timed)
+% The phase timings of the request, as a frame to append to the response
+frame = {};
+if timed
+    frame = {json_dump(pymat_timing('stop'))};
+end
+end %function
+
+
+function respond_batch_(resp, results, binary, dump_options, timed)
+% Send the results of a batch, each serialized on its own, so the client
+% only needs to decode the ones it reads
+t = tic;
+if binary
+    % Each result is a JSON frame followed by its own array buffers.
+    % resp.results holds the frame index and buffer count of each result.
+    frames = {};
+    layout = zeros(numel(results), 2);
+    for i = 1:numel(results)
+        [json_result, buffers] = json_dump(results{i}, 'Buffers', true, ...
+                                           dump_options{:});
+        layout(i, :) = [numel(frames) + 1, numel(buffers)];
+        frames = [frames, {json_result}, buffers];
+    end
+    resp.results = layout;
+    json_response = json_dump(resp);
+    pymat_timing('add', 'encode', toc(t));
+    timing = timing_frame_(timed);
+    messenger('respond', json_response, frames{:}, timing{:});
+else
+    resp.results = cellfun(@(r) json_dump(r, dump_options{:}), results, ...
+                           'UniformOutput', false);
+    messenger('respond', json_dump(resp));
+end
+end %function
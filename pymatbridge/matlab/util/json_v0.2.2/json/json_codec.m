@@ -0,0 +1,54 @@
+function codec = json_codec(name)
+%JSON_CODEC Get or set the codec that json_dump and json_load use.
+%
+% SYNOPSIS
+%
+%   codec = json_codec()
+%   codec = json_codec(name)
+%
+% The 'native' codec uses the builtin jsonencode and jsondecode functions
+% (MATLAB R2016b and later, Octave 7 and later), which convert whole arrays
+% at once. The 'java' codec builds an org.json tree element by element, and
+% needs the JVM. By default ('auto'), the native codec is used when it is
+% available. Both write and read the same JSON.
+%
+% EXAMPLE
+%
+%   >> json_codec()
+%   ans =
+%
+%   native
+%
+%   >> json_codec('java');
+%
+% See also json_dump json_load
+  persistent current
+  if nargin > 0 || isempty(current)
+    if nargin == 0
+      name = 'auto';
+    end
+    switch name
+      case 'auto'
+        if native_available_()
+          current = 'native';
+        else
+          current = 'java';
+        end
+      case 'native'
+        if ~native_available_()
+          error('json:codec', 'jsonencode and jsondecode are not available');
+        end
+        current = 'native';
+      case 'java'
+        current = 'java';
+      otherwise
+        error('json:codec', 'Unknown codec %s', name);
+    end
+  end
+  codec = current;
+end
+
+function available = native_available_()
+%NATIVE_AVAILABLE_ Whether jsonencode and jsondecode exist.
+  available = exist('jsonencode') > 0 && exist('jsondecode') > 0;
+end
@@ -1,14 +1,16 @@
-function str = json_dump(value, varargin)
+function [str, buffers] = json_dump(value, varargin)
 %DUMP Encode matlab value into a JSON string.
 %
 % SYNOPSIS
 %
 %   str = json.dump(value)
 %   str = json.dump(..., optionName, optionValue, ...)
+%   [str, buffers] = json.dump(..., 'Buffers', true)
 %
 % The function converts a matlab value to a JSON string. A value can be any
 % of a double array, a logical array, a char array, a cell array, or a
-% struct array. Numeric values other than double are converted to double.
+% struct array. Numeric and logical arrays keep their class, which is sent
+% along as the equivalent numpy dtype; logical arrays are packed to bits.
 % A struct array is mapped to a JSON object. However, since a JSON object
 % is unordered, the order of field names are not preserved.
 %
@@ -19,6 +21,14 @@ function str = json_dump(value, varargin)
 %   'ColMajor'    Represent matrix in column-major order. Default false.
 %   'indent'      Pretty-print the output string with indentation.  Default
 %                 []
+%   'Buffers'     Instead of base64-encoding numeric arrays, return their raw
+%                 bytes in the cell array BUFFERS and refer to them by
+%                 (0-based) index in the JSON string. Default false.
+%   'SharedDir'   Write the raw bytes of arrays of at least 'SharedBytes'
+%                 bytes to a new file in this directory (on a tmpfs, such
+%                 as /dev/shm), and refer to them by file name, offset and
+%                 number of bytes in the JSON string. Default ''.
+%   'SharedBytes' See 'SharedDir'. Default 1048576.
 %
 % EXAMPLE
 %
@@ -62,10 +72,20 @@ function str = json_dump(value, varargin)
 % are mapped to the same representation. For example, [1,2] and {1,2} are
 % mapped to the same json string '[1,2]'.
 %
-% See also json.load json.write
-  json_startup('WarnOnAddpath', true);
+% The value is written by jsonencode where available (see json_codec), and
+% element by element through org.json otherwise, or with 'indent'.
+%
+% See also json.load json.write json_codec
   options = get_options_(varargin{:});
+  buffer_store_('reset');
+  if isempty(options.indent) && strcmp(json_codec(), 'native')
+    str = jsonencode(prepare_(value, options));
+    buffers = buffer_store_('get');
+    return
+  end
+  java_startup_();
   obj = dump_data_(value, options);
+  buffers = buffer_store_('get');
   if isempty(options.indent)
       str = char(obj.toString());
   else
@@ -77,7 +97,10 @@ function options = get_options_(varargin)
 %GET_OPTIONS_
   options = struct(...
     'ColMajor', false,...
-    'indent', [] ...
+    'indent', [],...
+    'Buffers', false,...
+    'SharedDir', '',...
+    'SharedBytes', 1048576 ...
     );
   for i = 1:2:numel(varargin)
     switch varargin{i}
@@ -85,6 +108,12 @@ function options = get_options_(varargin)
         options.ColMajor = logical(varargin{i+1});
       case 'indent'
         options.indent = varargin{i+1};
+      case 'Buffers'
+        options.Buffers = logical(varargin{i+1});
+      case 'SharedDir'
+        options.SharedDir = varargin{i+1};
+      case 'SharedBytes'
+        options.SharedBytes = varargin{i+1};
       otherwise
         error('Unknown option to json.dump')
     end
@@ -101,19 +130,8 @@ function obj = dump_data_(value, options)
   elseif ~isscalar(value)
     obj = javaObject('org.json.JSONArray');
 
-    if isnumeric(value)
-        % encode arrays as a struct
-        double_struct = struct;
-        double_struct.ndarray = 1;
-        value = double(value);
-        if isreal(value) 
-          double_struct.data = base64encode(typecast(value(:), 'uint8'));
-        else
-          double_struct.real = base64encode(typecast(real(value(:)), 'uint8'));
-          double_struct.imag = base64encode(typecast(imag(value(:)), 'uint8'));
-        end
-        double_struct.shape = base64encode(typecast(size(value), 'uint8'));
-        obj = dump_data_(double_struct, options);
+    if isnumeric(value) || islogical(value)
+        obj = dump_data_(array_struct_(value, options), options);
     elseif ndims(value) > 2
       split_value = num2cell(value, 1:ndims(value)-1);
       for i = 1:numel(split_value)
@@ -168,6 +186,182 @@ function obj = dump_data_(value, options)
   end
 end
 
+function obj = prepare_(value, options)
+%PREPARE_ Turn a value into one that jsonencode writes the way dump_data_
+%writes the value: arrays become structs that keep their element type, and
+%cell arrays are nested the same way.
+  if ischar(value) && (isvector(value) || isempty(value))
+    obj = value(:)';
+  elseif isempty(value) && isnumeric(value)
+    % jsonencode writes NaN as null
+    obj = NaN;
+  elseif ~isscalar(value)
+    if isnumeric(value) || islogical(value)
+      obj = array_struct_(value, options);
+    elseif ndims(value) > 2
+      split_value = num2cell(value, 1:ndims(value)-1);
+      obj = prepare_cell_(split_value(:)', options);
+    elseif options.ColMajor && iscolumn(value) || ...
+        ~options.ColMajor && isrow(value)
+      if ~iscell(value)
+        value = num2cell(value);
+      end
+      obj = prepare_cell_(value(:)', options);
+    else
+      value = num2cell(value, 2 - options.ColMajor);
+      obj = prepare_cell_(value(:)', options);
+      if all(cellfun(@isscalar, value))
+        % A one-element row is written as an array of one element
+        obj = cellfun(@(element) {element}, obj, 'UniformOutput', false);
+      end
+    end
+  elseif iscell(value)
+    obj = {prepare_(value{1}, options)};
+  elseif isnumeric(value)
+    if isreal(value)
+      obj = full(value);
+    else
+      obj = struct('real', real(value), 'imag', imag(value));
+    end
+  elseif islogical(value)
+    obj = full(value);
+  elseif isstruct(value)
+    obj = struct;
+    keys = fieldnames(value);
+    for i = 1:length(keys)
+      try
+          obj.(keys{i}) = prepare_(value.(keys{i}), options);
+      catch ME
+          obj.(keys{i}) = ME.message;
+      end
+    end
+  else
+    error('json:typeError', 'Unsupported data type: %s', class(value));
+  end
+end
+
+function obj = prepare_cell_(value, options)
+%PREPARE_CELL_ Prepare the elements of a row cell array, which jsonencode
+%writes as a JSON array. Strings and real scalars are written as they are.
+  if iscellstr(value) && all(cellfun('size', value, 1) <= 1)
+    obj = value;
+  elseif all(cellfun('prodofsize', value) == 1) && all(cellfun('isreal', value)) ...
+      && all(cellfun(@(v) isnumeric(v) || islogical(v), value))
+    obj = value;
+  else
+    obj = cellfun(@(v) prepare_(v, options), value, 'UniformOutput', false);
+  end
+end
+
+function obj = array_struct_(value, options)
+%ARRAY_STRUCT_ Numeric or logical array as a struct that keeps its element
+%type and shape.
+  obj = struct;
+  obj.ndarray = 1;
+  obj.dtype = numpy_dtype_(value);
+  if islogical(value)
+    obj.data = encode_bytes_(pack_bits_(value(:)), options);
+  elseif isreal(value)
+    obj.data = encode_bytes_(typecast(value(:), 'uint8'), options);
+  else
+    obj.real = encode_bytes_(typecast(real(value(:)), 'uint8'), options);
+    obj.imag = encode_bytes_(typecast(imag(value(:)), 'uint8'), options);
+  end
+  obj.shape = base64encode(typecast(size(value), 'uint8'));
+end
+
+function java_startup_()
+%JAVA_STARTUP_ Put json.jar on the Java class path, once.
+  persistent started
+  if isempty(started)
+    json_startup('WarnOnAddpath', true);
+    started = true;
+  end
+end
+
+function dtype = numpy_dtype_(value)
+%NUMPY_DTYPE_ Name of the numpy dtype matching the class of an array.
+  switch class(value)
+    case 'double'
+      dtype = 'float64';
+    case 'single'
+      dtype = 'float32';
+    case 'logical'
+      dtype = 'bool';
+    otherwise
+      dtype = class(value);
+  end
+end
+
+function bytes = pack_bits_(bits)
+%PACK_BITS_ Pack a logical vector into bytes, least significant bit first.
+  nbytes = ceil(numel(bits) / 8);
+  bits(end+1:nbytes*8) = false;
+  weights = 2 .^ (0:7);
+  bytes = uint8(weights * reshape(double(bits), 8, nbytes));
+end
+
+function data = encode_bytes_(bytes, options)
+%ENCODE_BYTES_ Either base64-encode bytes or stash them as a raw buffer.
+  if ~isempty(options.SharedDir) && numel(bytes) >= options.SharedBytes
+    data = write_shared_(bytes, options.SharedDir);
+    if ~isempty(data)
+      return
+    end
+  end
+  if options.Buffers
+    data = buffer_store_('add', bytes);
+  else
+    data = base64encode(bytes);
+  end
+end
+
+function data = write_shared_(bytes, directory)
+%WRITE_SHARED_ Write bytes to a new file in directory, or return [] if it
+%can't be created. A file that can't be written whole is removed, and the
+%error raised.
+  data = [];
+  filename = tempname(directory);
+  fid = fopen(filename, 'w');
+  if fid < 0
+    return
+  end
+  try
+    count = fwrite(fid, bytes, 'uint8');
+    status = fclose(fid);
+    fid = -1;
+    if count ~= numel(bytes) || status ~= 0
+      error('json:sharedWrite', 'Wrote %d of %d bytes to %s', count, ...
+            numel(bytes), filename);
+    end
+  catch err
+    if fid >= 0
+      fclose(fid);
+    end
+    delete(filename);
+    rethrow(err);
+  end
+  data = struct('file', filename, 'offset', 0, 'nbytes', numel(bytes));
+end
+
+function out = buffer_store_(action, bytes)
+%BUFFER_STORE_ Collect the raw buffers referred to by the current dump.
+  persistent buffers
+  if isempty(buffers)
+    buffers = {};
+  end
+  switch action
+    case 'reset'
+      buffers = {};
+    case 'add'
+      buffers{end+1} = bytes(:)';
+      out = numel(buffers) - 1;
+    case 'get'
+      out = buffers;
+      buffers = {};
+  end
+end
+
 
 function y = base64encode(x, eol)
 %BASE64ENCODE Perform base64 encoding on a string.
@@ -21,6 +21,13 @@ function value = json_load(str, varargin)
 %
 %   'ColMajor'    Represent matrix in column-major order. Default false.
 %
+%   'Buffers'     Cell array of uint8 vectors that arrays in the JSON string
+%                 refer to by (0-based) index, as sent by the binary
+%                 protocol. Default {}.
+%
+% Arrays may also refer to a file, by name, offset and number of bytes, from
+% which they are read (see the 'SharedDir' option of json_dump).
+%
 % EXAMPLE
 %
 %   >> value = json.load('{"char":"hello","matrix":[[1,3],[4,2]]}')
@@ -55,10 +62,18 @@ function value = json_load(str, varargin)
 % either [1, 2, 3] or {{1}, {2}, {3}} depending on 'MergeCell' option, but
 % cannot produce {1, 2, 3}.
 %
-% See also json.dump json.read
+% The string is parsed by jsondecode where available (see json_codec), and
+% through org.json otherwise, or with the 'MergeCell' or 'ColMajor' options.
+% Either way, the value is the same.
+%
+% See also json.dump json.read json_codec
 
-  json_startup('WarnOnAddpath', true);
   options = get_options_(varargin{:});
+  if options.MergeCell && ~options.ColMajor && strcmp(json_codec(), 'native')
+    value = restore_(jsondecode(str), options);
+    return
+  end
+  java_startup_();
   singleton = false;
 
   str = strtrim(str);
@@ -80,7 +95,8 @@ function options = get_options_(varargin)
 %GET_OPTIONS_
   options = struct(...
     'MergeCell', true,...
-    'ColMajor', false...
+    'ColMajor', false,...
+    'Buffers', {{}}...
     );
   for i = 1:2:numel(varargin)
     switch varargin{i}
@@ -88,6 +104,8 @@ function options = get_options_(varargin)
         options.MergeCell = logical(varargin{i+1});
       case 'ColMajor'
         options.ColMajor = logical(varargin{i+1});
+      case 'Buffers'
+        options.Buffers = varargin{i+1};
     end
   end
 end
@@ -122,20 +140,7 @@ function value = parse_data_(node, options)
       value.(safe_field) = parse_data_(node.get(javaObject('java.lang.String', key)), ...
                                        options);    
     end
-    % Check if the struct just decoded represents an array or complex number
-    if isfield(value,'ndarray') && isfield(value, 'shape')
-      if isfield(value, 'data')
-          arr = typecast(base64decode(value.data), 'double');
-      else
-          r = typecast(base64decode(value.real), 'double');
-          im = typecast(base64decode(value.imag), 'double');
-          arr = complex(r, im);
-      end
-      value = reshape(arr, value.shape);
-    elseif isfield(value,'real') && isfield(value, 'imag')
-      complex_value = complex(value.real, value.imag);
-      value = complex_value;
-    end
+    value = array_value_(value, options);
   % In MATLAB, nested classes end up with a $ in the name, in Octave it's a .
   elseif isa(node, 'org.json.JSONObject$Null') || isa(node, 'org.json.JSONObject.Null')
     value = [];
@@ -144,6 +149,119 @@ function value = parse_data_(node, options)
   end
 end
 
+function value = restore_(value, options)
+%RESTORE_ Make a value decoded by jsondecode the same as parse_data_ makes
+%it. jsondecode returns JSON arrays as columns, and merges a JSON array of
+%one array of numbers into a row, which parse_data_ leaves in a cell.
+  if isstruct(value) && isscalar(value)
+    fields = fieldnames(value);
+    for i = 1:numel(fields)
+      value.(fields{i}) = restore_(value.(fields{i}), options);
+    end
+    value = array_value_(value, options);
+  elseif isstruct(value) || iscell(value)
+    if isstruct(value)
+      value = num2cell(value);
+    end
+    value = merge_cell_(cellfun(@(v) restore_(v, options), value(:)', ...
+                                'UniformOutput', false), options);
+  elseif isnumeric(value) || islogical(value)
+    if iscolumn(value) && ~isscalar(value)
+      value = value.';
+    elseif ndims(value) == 2 && size(value, 1) == 1 && size(value, 2) > 1
+      value = {value};
+    end
+  end
+end
+
+function value = array_value_(value, options)
+%ARRAY_VALUE_ The array or complex number that a decoded struct stands for,
+%if it stands for one.
+  if isfield(value,'ndarray') && isfield(value, 'shape')
+    cls = 'double';
+    if isfield(value, 'dtype')
+      cls = matlab_class_(value.dtype);
+    end
+    if isfield(value, 'data') && strcmp(cls, 'logical')
+        arr = unpack_bits_(array_bytes_(value.data, options), prod(value.shape));
+    elseif isfield(value, 'data')
+        arr = array_values_(value.data, options, cls);
+    else
+        r = array_values_(value.real, options, cls);
+        im = array_values_(value.imag, options, cls);
+        arr = complex(r, im);
+    end
+    value = reshape(arr, value.shape);
+  elseif isfield(value,'real') && isfield(value, 'imag')
+    value = complex(value.real, value.imag);
+  end
+end
+
+function java_startup_()
+%JAVA_STARTUP_ Put json.jar on the Java class path, once.
+  persistent started
+  if isempty(started)
+    json_startup('WarnOnAddpath', true);
+    started = true;
+  end
+end
+
+function bytes = array_bytes_(data, options)
+%ARRAY_BYTES_ Raw bytes of an array, either base64 text or a buffer index.
+  if ischar(data)
+    bytes = base64decode(data);
+  elseif isstruct(data)
+    bytes = read_shared_(data, 'uint8');
+  else
+    bytes = options.Buffers{data + 1};
+  end
+end
+
+function values = array_values_(data, options, cls)
+%ARRAY_VALUES_ Elements of an array, of class cls.
+  if isstruct(data)
+    % Read them as they are, rather than as bytes to typecast
+    values = read_shared_(data, cls);
+  else
+    values = typecast(array_bytes_(data, options), cls);
+  end
+end
+
+function values = read_shared_(data, cls)
+%READ_SHARED_ Read an array from a file written by the client, given its
+%name, the offset and the number of bytes.
+  fid = fopen(data.file, 'r', 'l');
+  if fid < 0
+    error('json:fileError', 'Could not open %s', data.file);
+  end
+  fseek(fid, data.offset, 'bof');
+  element_bytes = numel(typecast(zeros(1, cls), 'uint8'));
+  values = fread(fid, [1, data.nbytes / element_bytes], [cls '=>' cls]);
+  fclose(fid);
+end
+
+function cls = matlab_class_(dtype)
+%MATLAB_CLASS_ Name of the matlab class matching a numpy dtype.
+  switch dtype
+    case 'float64'
+      cls = 'double';
+    case 'float32'
+      cls = 'single';
+    case 'bool'
+      cls = 'logical';
+    otherwise
+      cls = dtype;
+  end
+end
+
+function bits = unpack_bits_(bytes, count)
+%UNPACK_BITS_ Unpack bytes into a logical vector, least significant bit first.
+  bytes = repmat(bytes(:)', 8, 1);
+  positions = repmat((1:8)', 1, size(bytes, 2));
+  bits = logical(bitget(bytes, positions));
+  bits = bits(1:count);
+end
+
 function value = merge_cell_(value, options)
 %MERGE_CELL_
   if isempty(value) || all(cellfun(@isempty, value))
@@ -1,23 +1,82 @@
-function fig_files = make_figs(figdir)
+function figs = make_figs(format, dpi)
+% MAKE_FIGS: Returns the figures changed since the last call, as image files
+%
+% figs = make_figs(format, dpi);
+%
+%   Renders every open figure that was created or changed since it was last
+%   rendered, in the given format ('png', 'jpeg' or 'svg', default 'png')
+%   and resolution (dots per inch, default 150). Returns a cell array with
+%   the contents of each image file, as uint8 row vectors.
+%
+%   A figure counts as changed when the signature of its graphics objects
+%   differs from the one stored in its appdata when it was last rendered.
+%   Hidden figures are closed once rendered, visible ones are left open and
+%   only rendered again when they change.
+
+if nargin < 1
+    format = 'png';
+end
+if nargin < 2
+    dpi = 150;
+end
+
 % Get all the figures that are currently open (presumably from a cell
 % that was just executed):
 figHandles = get(0, 'children');
 
-fig_files = {};
+figs = {};
 
 for fig=1:length(figHandles)
     h = figHandles(fig);
-    % We will put all of these in the temp dir with an identifying root, so
-    % that we can grab all of them into the cell (and they will be deleted
-    % immediately after being rendered).
-    filename = fullfile(figdir, ['MatlabFig', sprintf('%03d', fig)]);
-    saveas(h, [filename, '.png']);
-    % Once you've saved it, close it, so it doesn't get dragged into the
-    % scope of other cells
+    signature = signature_(h);
+    if isequal(getappdata(h, 'pymat_signature'), signature)
+        continue
+    end
+    figs{end+1} = render_(h, format, dpi);
+    % Once you've rendered a hidden figure, close it, so it doesn't get
+    % dragged into the scope of other cells
     if (strcmp(get(h, 'visible'), 'off'))
         close(h);
+    else
+        setappdata(h, 'pymat_signature', signature);
     end
-    fig_files{fig} = [filename '.png'];
 end
 
 end %function
+
+
+function data = render_(h, format, dpi)
+% Print the figure to a temporary file and read the file back
+device = format;
+if strcmp(format, 'jpeg') && exist('OCTAVE_VERSION', 'builtin')
+    device = 'jpg';
+end
+filename = [tempname() '.' format];
+print(h, ['-d' device], sprintf('-r%d', dpi), filename);
+FID = fopen(filename, 'r');
+data = fread(FID, [1, inf], 'uint8=>uint8');
+fclose(FID);
+delete(filename);
+end %function
+
+
+function signature = signature_(h)
+% The number of graphics objects in the figure, and a checksum of their data
+objs = findall(h);
+props = {'XData', 'YData', 'ZData', 'CData', 'String', 'Position', 'Color'};
+checksum = 0;
+for i = 1:numel(objs)
+    for j = 1:numel(props)
+        if isprop(objs(i), props{j})
+            value = get(objs(i), props{j});
+            if isnumeric(value) || ischar(value) || islogical(value)
+                value = double(value(:));
+                % NaN never equals itself, which would defeat the comparison
+                value(~isfinite(value)) = 0;
+                checksum = checksum + sum(value .* (1:numel(value))');
+            end
+        end
+    end
+end
+signature = [numel(objs), checksum];
+end %function
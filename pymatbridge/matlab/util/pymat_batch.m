@@ -0,0 +1,33 @@
+function [response, results] = pymat_batch(req)
+% PYMAT_BATCH: Run a list of requests in order, in a single round trip
+%
+% [response, results] = pymat_batch(req);
+%
+%   req.ops is a list of requests as understood by pymat_request. They are
+%   run one after the other, stopping at the first one that fails. results
+%   is a cell array with the response to each request that was run, and
+%   response has the fields:
+%       success: Whether all requests succeeded.
+%       failed: The (0-based) index of the request that failed, or -1.
+
+ops = req.ops;
+if isstruct(ops)
+    % The JSON decoder merges requests with the same fields into a struct
+    % array
+    ops = num2cell(ops);
+end
+
+response.success = true;
+response.failed = -1;
+results = {};
+
+for i = 1:numel(ops)
+    results{i} = pymat_request(ops{i});
+    if ~results{i}.success
+        response.success = false;
+        response.failed = i - 1;
+        break;
+    end
+end
+
+end %function
@@ -0,0 +1,145 @@
+function out = pymat_blobs(cmd, varargin)
+% PYMAT_BLOBS: Keeps the big arguments sent by the client, by content hash
+%
+% The client sends a big array argument once, as a struct with fields
+% matlabblob (a hash of its content) and value, and then only as a struct
+% with the matlabblob field, as long as the array doesn't change (see
+% pymat_resolve).
+%
+% missing = pymat_blobs('missing', req);
+%
+%   Called as each request arrives. Returns the cell array of the hashes
+%   that req refers to without sending the value, but that are no longer
+%   kept, so that the client can send them again.
+%
+% pymat_blobs('put', key, value);
+% value = pymat_blobs('get', key);
+%
+%   Keep a value, and get it back. When the values kept take more than the
+%   budget, the least recently used ones are dropped, except for those of
+%   the current request.
+%
+% pymat_blobs('budget', bytes);
+%
+%   Sets the budget, 64 MB by default.
+%
+% stats = pymat_blobs('stats');
+%
+%   Returns a struct with fields count and bytes (of the values kept),
+%   budget, hits and misses (references to values that were kept, or not).
+%
+% pymat_blobs('clear');
+
+persistent keys values sizes used tick budget hits misses
+if isempty(tick)
+    keys = {};
+    values = {};
+    sizes = [];
+    used = [];
+    tick = 0;
+    budget = 64 * 2^20;
+    hits = 0;
+    misses = 0;
+end
+
+out = [];
+switch(cmd)
+    case {'missing'}
+        tick = tick + 1;
+        [refs, sent] = find_blobs_(varargin{1});
+        out = {};
+        for k = 1:numel(refs)
+            i = find(strcmp(keys, refs{k}), 1);
+            if ~isempty(i)
+                used(i) = tick;
+                hits = hits + 1;
+            elseif ~any(strcmp(sent, refs{k}))
+                out{end+1} = refs{k};
+                misses = misses + 1;
+            end
+        end
+
+    case {'put'}
+        key = varargin{1};
+        value = varargin{2};
+        i = find(strcmp(keys, key), 1);
+        if isempty(i)
+            i = numel(keys) + 1;
+            keys{i} = key;
+        end
+        info = whos('value');
+        values{i} = value;
+        sizes(i) = info.bytes;
+        used(i) = tick;
+
+    case {'get'}
+        i = find(strcmp(keys, varargin{1}), 1);
+        if isempty(i)
+            error('pymat_blobs: argument %s is no longer kept', varargin{1});
+        end
+        used(i) = tick;
+        out = values{i};
+
+    case {'budget'}
+        budget = varargin{1};
+
+    case {'stats'}
+        out = struct('count', numel(keys), 'bytes', sum(sizes), ...
+                     'budget', budget, 'hits', hits, 'misses', misses);
+
+    case {'clear'}
+        keys = {};
+        values = {};
+        sizes = [];
+        used = [];
+        hits = 0;
+        misses = 0;
+
+    otherwise
+        error('pymat_blobs: unknown command %s', cmd);
+end
+
+% Drop the least recently used values that don't fit in the budget
+while sum(sizes) > budget
+    [oldest, i] = min(used);
+    if oldest >= tick
+        break
+    end
+    keys(i) = [];
+    values(i) = [];
+    sizes(i) = [];
+    used(i) = [];
+end
+
+end %function
+
+
+function [refs, sent] = find_blobs_(value)
+% The hashes of the values referred to, and of those sent, in a request
+refs = {};
+sent = {};
+if isstruct(value)
+    if isscalar(value) && isfield(value, 'matlabblob')
+        if isfield(value, 'value')
+            sent = {value.matlabblob};
+        else
+            refs = {value.matlabblob};
+        end
+        return
+    end
+    fields = fieldnames(value);
+    for i = 1:numel(value)
+        for j = 1:numel(fields)
+            [r, s] = find_blobs_(value(i).(fields{j}));
+            refs = [refs, r];
+            sent = [sent, s];
+        end
+    end
+elseif iscell(value)
+    for i = 1:numel(value)
+        [r, s] = find_blobs_(value{i});
+        refs = [refs, r];
+        sent = [sent, s];
+    end
+end
+end %function
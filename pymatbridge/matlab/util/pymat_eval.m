@@ -1,7 +1,7 @@
-function json_response = pymat_eval(req);
-% PYMAT_EVAL: Returns a json object of the result of calling the function
+function response = pymat_eval(req);
+% PYMAT_EVAL: Returns a struct with the result of calling the function
 %
-% json_response = pymat_eval(req);
+% response = pymat_eval(req);
 %
 %   This allows you to run any matlab code. req should be a struct with the
 %   following fields:
@@ -10,29 +10,58 @@ function json_response = pymat_eval(req);
 %       func_args: An array of arguments to send to the function.
 %       nargout: An int specifying how many output arguments are expected.
 %
-%   Should return a json object containing the result.
+%   and optionally the following logical fields:
+%       capture: Capture stdout with diary and return it (default true).
+%       figures: Return the figures created or changed by the call (see
+%           make_figs, default true).
+%       rehash: Rehash the path before calling the function, even if
+%           pymat_path doesn't find it necessary (default false).
+%       ref: Keep the outputs in the base workspace, and return references
+%           to them (see pymat_refs) instead of their values (default false).
+%
+%   and the following options for the figures:
+%       figure_format: 'png' (default), 'jpeg' or 'svg'.
+%       figure_dpi: Resolution in dots per inch (default 150).
+%
+%   and the following options for the output:
+%       stream: An ID for the request, to stream its output and progress
+%           (see pymat_stream) while it runs.
+%       max_stdout: The number of bytes of captured output to return. Output
+%           beyond that is dropped from the start, and the number of bytes
+%           dropped is returned as content.stdout_dropped.
+%
+%   Should return a struct containing the result, which the server then
+%   serializes according to the negotiated protocol.
 %
 % Based on Max Jaderberg's web_feval
 
+capture = get_option_(req, 'capture');
+figures = get_option_(req, 'figures');
+
 response.success = true;
 response.content = '';
 response.result = '';
 response.stack = {};
 
-close all hidden;
-
 try
-	% tempname is less likely to get bonked by another process.
-	diary_file = [tempname() '_diary.txt'];
-	diary(diary_file);
-		
-	% Add function path to current path
-	if req.dname
-        addpath(req.dname);
+    if capture
+	    % tempname is less likely to get bonked by another process.
+	    diary_file = [tempname() '_diary.txt'];
+	    diary(diary_file);
+    else
+        diary_file = '';
     end
 
-    % force a rehash of user functions
-    rehash
+    stream_id = get_value_(req, 'stream', '');
+    if ~isempty(stream_id)
+        pymat_stream('begin', stream_id, diary_file);
+    end
+		
+	% Add function path to current path, and rehash if the function changed
+    force_rehash = isfield(req, 'rehash') && req.rehash;
+    t = tic;
+    pymat_path('prepare', req.dname, req.func_name, force_rehash);
+    pymat_timing('add', 'path', toc(t));
 
     if iscell(req.func_args)
       func_args = req.func_args;
@@ -41,7 +70,16 @@ try
       % everything into an array, which we don't want
       func_args = num2cell(req.func_args, 1);
     end
+    func_args = pymat_resolve(func_args);
+    t = tic;
     [resp{1:req.nargout}] = feval(req.func_name, func_args{:});
+    pymat_timing('add', 'eval', toc(t));
+
+    if get_value_(req, 'ref', false)
+        for i = 1:numel(resp)
+            resp{i} = pymat_refs('store', resp{i});
+        end
+    end
 
     if req.nargout == 1
         response.result = resp{1};
@@ -49,32 +87,50 @@ try
         response.result = resp;
     end
 
-	diary('off');
+    response.content.figures = {};
+    response.content.stdout = '';
 
-	datadir = fullfile(tempdir(),'MatlabData');
-	response.content.datadir = [datadir, filesep()];
-	if ~exist(datadir, 'dir')
-        mkdir(datadir);
+    if capture
+	    diary('off');
+    end
+    pymat_stream('end');
+
+    if figures
+        t = tic;
+	    response.content.figures = make_figs(...
+            get_value_(req, 'figure_format', 'png'), ...
+            get_value_(req, 'figure_dpi', 150));
+        pymat_timing('add', 'figures', toc(t));
     end
 
-	fig_files = make_figs(datadir);
-	response.content.figures = fig_files;
-
-	% this will not work on Windows:
-	%[ignore_status, stdout] = system(['cat ' diary_file]);
-	% cf. http://rosettacode.org/wiki/Read_entire_file#MATLAB_.2F_Octave
-	FID = fopen(diary_file,'r');
-	if (FID > 0)
-		[stdout,count] = fread(FID, [1,inf], 'uint8=>char');
-		fclose(FID);
-		response.content.stdout = stdout;
-	else
-		response.success = false;
-		response.content.stdout = sprintf('could not open %s for read',diary_file);
-	end
-	delete(diary_file)
+    if capture
+	    % this will not work on Windows:
+	    %[ignore_status, stdout] = system(['cat ' diary_file]);
+	    % cf. http://rosettacode.org/wiki/Read_entire_file#MATLAB_.2F_Octave
+	    t = tic;
+	    FID = fopen(diary_file,'r');
+	    if (FID > 0)
+		    % Only read the end of the output if it is capped
+		    max_stdout = get_value_(req, 'max_stdout', inf);
+		    fseek(FID, 0, 'eof');
+		    dropped = max(ftell(FID) - max_stdout, 0);
+		    fseek(FID, dropped, 'bof');
+		    [stdout,count] = fread(FID, [1,inf], 'uint8=>char');
+		    fclose(FID);
+		    response.content.stdout = stdout;
+		    if dropped
+		        response.content.stdout_dropped = dropped;
+		    end
+	    else
+		    response.success = false;
+		    response.content.stdout = sprintf('could not open %s for read',diary_file);
+	    end
+	    delete(diary_file)
+	    pymat_timing('add', 'stdout', toc(t));
+    end
 catch ME
 	diary('off');
+	pymat_stream('end');
 	response.success = false;
 	response.content.stdout = ME.message;
 
@@ -108,9 +164,14 @@ catch ME
     response.stack = stack;
   end
 
-  % Strip off the last two frames -- these correspond to pymat_eval and
-  % matlabserver, which we don't want to expose.
-  response.stack = response.stack(1:end-2, :);
+  % Strip off pymat_eval and the server frames above it (matlabserver,
+  % pymat_request, pymat_batch), which we don't want to expose.
+  if ~isempty(response.stack)
+    own_frame = find(strcmp({response.stack.name}, 'pymat_eval'), 1);
+    if ~isempty(own_frame)
+      response.stack = response.stack(1:own_frame-1, :);
+    end
+  end
 
   % FIXME: The stack is returned as a nx1 struct array, and in Octave json_dump
   % throws an error trying to serialize it. Let's just transpose it for now.
@@ -124,6 +185,19 @@ catch ME
   end
 end
 
-json_response = json_dump(response);
+end %function
 
+
+function value = get_option_(req, name)
+% Optional logical request fields default to true
+value = ~isfield(req, name) || req.(name);
+end %function
+
+
+function value = get_value_(req, name, default)
+if isfield(req, name)
+    value = req.(name);
+else
+    value = default;
+end
 end %function
@@ -0,0 +1,40 @@
+function names = pymat_functions(name)
+% PYMAT_FUNCTIONS: Lists the functions that can be called
+%
+% names = pymat_functions();
+%
+%   Returns the sorted cell array of the names of the m-files, p-files and
+%   mex files in the current directory and on the path, along with the
+%   builtins in Octave. Functions of classes and packages are left out.
+%
+% found = pymat_functions(name);
+%
+%   Returns whether name can be called, for names missing from the list
+%   (e.g. functions created since). exist tells about the first thing of
+%   that name it finds, which is the folder for a mex file inside a folder
+%   of the same name, so which is asked as well.
+
+if nargin > 0
+    names = any(exist(name) == [2, 3, 5, 6]) || ~isempty(which(name));
+    return
+end
+
+dirs = [{pwd}, regexp(path, pathsep, 'split')];
+exts = {'*.m', '*.p', ['*.' mexext]};
+names = {};
+for i = 1:numel(dirs)
+    for j = 1:numel(exts)
+        files = dir(fullfile(dirs{i}, exts{j}));
+        names = [names, regexprep({files.name}, '\.\w+$', '')];
+    end
+end
+
+if exist('OCTAVE_VERSION', 'builtin')
+    % Matlab can't even parse names that start with an underscore
+    builtins = feval('__list_functions__');
+    names = [names, builtins(:)'];
+end
+
+names = unique(names);
+
+end %function
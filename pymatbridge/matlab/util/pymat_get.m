@@ -0,0 +1,114 @@
+function response = pymat_get(req)
+% PYMAT_GET: Returns a struct with the value of a workspace variable
+%
+% response = pymat_get(req);
+%
+%   A lean alternative to calling evalin through pymat_eval: stdout is not
+%   captured, figures are left alone and the path is not touched. req should
+%   be a struct with the following fields:
+%       varname: The name of the variable (or an expression) to evaluate in
+%           the base workspace.
+%   and optionally:
+%       index: Return only part of the value, indexed like a numpy array
+%           (see index_ below).
+%       range: Return only the elements from range(1) to range(2), as a
+%           0-based range with the end excluded, in linear indexing.
+%       ref: Keep a copy of the value in the base workspace, and return a
+%           reference to it (see pymat_refs) instead (default false).
+%       chunk_bytes: If the value is a numeric or logical array bigger than
+%           this (in bytes), keep a copy in the base workspace and return a
+%           reference to it with the extra fields chunked (true) and complex,
+%           for the client to get it in chunks with range.
+
+response.success = true;
+response.content.stdout = '';
+response.result = '';
+
+try
+    response.result = evalin('base', req.varname);
+    if isfield(req, 'index')
+        response.result = index_(response.result, req.index);
+    end
+    if isfield(req, 'range')
+        response.result = response.result(req.range(1)+1:req.range(2));
+    end
+    if isfield(req, 'ref') && req.ref
+        response.result = pymat_refs('store', response.result);
+    elseif isfield(req, 'chunk_bytes') && ...
+            too_big_(response.result, req.chunk_bytes)
+        value = response.result;
+        response.result = pymat_refs('store', value);
+        response.result.chunked = true;
+        response.result.complex = ~isreal(value);
+    end
+catch ME
+    response.success = false;
+    response.content.stdout = ME.message;
+end
+
+end %function
+
+
+function value = index_(value, index)
+% Index value the way numpy would. index has a string per dimension, either
+% 'start:stop:step' (0-based, stop excluded, and any of them may be left
+% out), or a comma separated list of 0-based indices. Negative indices
+% count from the end.
+if ischar(index)
+    index = {index};
+end
+% Unlike numpy, Matlab would merge the dimensions that aren't indexed into
+% the last one that is
+subs = repmat({':'}, 1, max(numel(index), ndims(value)));
+sz = size(value);
+sz(end+1:numel(subs)) = 1;
+for d = 1:numel(index)
+    n = sz(d);
+    spec = index{d};
+    if any(spec == ':')
+        bounds = str2double(regexp(spec, ':', 'split'));
+        step = bounds(3);
+        if isnan(step)
+            step = 1;
+        end
+        if step > 0
+            start = clamp_(bounds(1), n, 0, n, 0);
+            stop = clamp_(bounds(2), n, 0, n, n);
+            subs{d} = start+1:step:stop;
+        else
+            start = clamp_(bounds(1), n, -1, n-1, n-1);
+            stop = clamp_(bounds(2), n, -1, n-1, -1);
+            subs{d} = start+1:step:stop+2;
+        end
+    else
+        k = str2double(regexp(spec, ',', 'split'));
+        k = k(~isnan(k));
+        k(k < 0) = k(k < 0) + n;
+        subs{d} = k + 1;
+    end
+end
+value = subsref(value, struct('type', '()', 'subs', {subs}));
+end %function
+
+
+function big = too_big_(value, limit)
+% Whether a value should be sent in chunks
+big = false;
+if (isnumeric(value) || islogical(value)) && ~issparse(value)
+    info = whos('value');
+    big = info.bytes > limit;
+end
+end %function
+
+
+function x = clamp_(x, n, lo, hi, default)
+% Bound a slice like python does
+if isnan(x)
+    x = default;
+    return
+end
+if x < 0
+    x = x + n;
+end
+x = min(max(x, lo), hi);
+end %function
@@ -0,0 +1,124 @@
+function out = pymat_path(cmd, varargin)
+% PYMAT_PATH: Adds directories to the path, and rehashes it only when needed
+%
+% rehashed = pymat_path('prepare', dname, func_name, force);
+%
+%   Adds dname to the runtime path, unless it was added before and the path
+%   hasn't changed since. Then rehashes the path if force is true, or if the
+%   m-file that func_name resolves to may be out of date:
+%       - its modification time changed since the last call,
+%       - it is in dname and wasn't seen before (unless dname was just added,
+%         which scans it anyway),
+%       - func_name can't be found.
+%   dname may be empty, in which case func_name is resolved with which.
+%
+% info = pymat_path('which', dname, func_name);
+%
+%   Returns a struct with the m-file that func_name resolves to (file, as
+%   for prepare) and its modification time (mtime, -1 if it isn't a file,
+%   e.g. for builtins).
+%
+% stats = pymat_path('stats');
+%
+%   Returns a struct with the number of calls to prepare (calls), the number
+%   of rehashes (rehashes) and the number of directories added to the path
+%   (dirs).
+%
+% pymat_path('reset');
+%
+%   Forgets the directories and files seen so far, and resets the counters.
+
+persistent dirs files mtimes last_path calls rehashes
+if isempty(calls)
+    [dirs, files, mtimes, last_path, calls, rehashes] = reset_();
+end
+
+switch(cmd)
+    case {'prepare'}
+        dname = varargin{1};
+        func_name = varargin{2};
+        force = varargin{3};
+        calls = calls + 1;
+
+        % Comparing the path string is cheap, unlike asking the filesystem
+        if ~strcmp(path, last_path)
+            dirs = {};
+        end
+        added = false;
+        if ~isempty(dname) && ~any(strcmp(dirs, dname))
+            addpath(dname);
+            dirs{end+1} = dname;
+            added = true;
+        end
+        last_path = path;
+
+        file = file_(dname, func_name);
+        mtime = mtime_(file);
+        seen = find(strcmp(files, file), 1);
+        if isempty(file)
+            % Octave's which gives no file for builtins either
+            stale = ~exist(func_name);
+        elseif isempty(seen)
+            stale = ~isempty(dname);
+            files{end+1} = file;
+            mtimes(end+1) = mtime;
+        else
+            stale = mtimes(seen) ~= mtime;
+            mtimes(seen) = mtime;
+        end
+
+        out = force || (stale && ~added);
+        if out
+            rehash;
+            rehashes = rehashes + 1;
+        end
+
+    case {'which'}
+        file = file_(varargin{1}, varargin{2});
+        out = struct('file', file, 'mtime', mtime_(file));
+
+    case {'stats'}
+        out = struct('calls', calls, 'rehashes', rehashes, ...
+                     'dirs', numel(dirs));
+
+    case {'reset'}
+        [dirs, files, mtimes, last_path, calls, rehashes] = reset_();
+        out = true;
+
+    otherwise
+        error('pymat_path: unknown command %s', cmd);
+end
+
+end %function
+
+
+function [dirs, files, mtimes, last_path, calls, rehashes] = reset_()
+dirs = {};
+files = {};
+mtimes = [];
+last_path = '';
+calls = 0;
+rehashes = 0;
+end %function
+
+
+function file = file_(dname, func_name)
+% The m-file that func_name resolves to
+if isempty(dname)
+    file = which(func_name);
+else
+    file = fullfile(dname, [func_name '.m']);
+end
+end %function
+
+
+function mtime = mtime_(file)
+% Modification time of a file, or -1 if it isn't a file (e.g. a builtin)
+mtime = -1;
+if ~isempty(file)
+    info = dir(file);
+    if numel(info) == 1 && ~info.isdir
+        mtime = info.datenum;
+    end
+end
+end %function
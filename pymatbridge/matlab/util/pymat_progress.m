@@ -0,0 +1,13 @@
+function sent = pymat_progress(data)
+% PYMAT_PROGRESS: Reports progress to the client while a function runs
+%
+% sent = pymat_progress(data);
+%
+%   Sends data (anything that json_dump can serialize, e.g. a fraction done,
+%   or a struct with a message and a count) to the client, which receives it
+%   as a 'progress' record if it asked for the call to be streamed.
+%   Otherwise this does nothing. Returns whether the record was sent.
+
+sent = pymat_stream('publish', 'progress', data);
+
+end %function
@@ -0,0 +1,53 @@
+function out = pymat_refs(cmd, varargin)
+% PYMAT_REFS: Keeps values in the base workspace for the client to refer to
+%
+% ref = pymat_refs('store', value);
+%
+%   Assigns value to a new variable of the base workspace, and returns a
+%   struct describing it, with fields matlabref (the name of the variable),
+%   class and size. The client sends {'matlabref': name} back to use it
+%   (see pymat_resolve).
+%
+% pymat_refs('release', names);
+%
+%   Clears the variables named in the cell array names, once the client has
+%   no use for them anymore.
+%
+% n = pymat_refs('count');
+%
+%   Returns the number of variables currently kept.
+
+persistent counter
+if isempty(counter)
+    counter = 0;
+end
+
+switch(cmd)
+    case {'store'}
+        value = varargin{1};
+        counter = counter + 1;
+        name = sprintf('pymatref_%d', counter);
+        assignin('base', name, value);
+        out = struct('matlabref', name, 'class', class(value), ...
+                     'size', size(value));
+
+    case {'release'}
+        names = varargin{1};
+        if ischar(names)
+            names = {names};
+        end
+        % Only ever clear variables that were created here
+        names = names(~cellfun(@isempty, regexp(names, '^pymatref_\d+$')));
+        if ~isempty(names)
+            evalin('base', ['clear ', sprintf('%s ', names{:})]);
+        end
+        out = numel(names);
+
+    case {'count'}
+        out = numel(evalin('base', 'who(''pymatref_*'')'));
+
+    otherwise
+        error('pymat_refs: unknown command %s', cmd);
+end
+
+end %function
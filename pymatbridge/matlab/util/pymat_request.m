@@ -0,0 +1,47 @@
+function response = pymat_request(req)
+% PYMAT_REQUEST: Returns a struct with the response to a single request
+%
+% response = pymat_request(req);
+%
+%   Dispatches on req.cmd:
+%       eval: Call a function through pymat_eval.
+%       call: Like eval, but without capturing stdout or exporting figures,
+%           unless the request asks for it.
+%       get: Get a workspace variable through pymat_get.
+%       set: Set a workspace variable through pymat_set.
+%       whos: Describe workspace variables through pymat_whos.
+
+switch(req.cmd)
+    case {'eval'}
+        response = pymat_eval(req);
+
+    case {'call'}
+        response = pymat_eval(lean_defaults_(req));
+
+    case {'get'}
+        response = pymat_get(req);
+
+    case {'set'}
+        response = pymat_set(req);
+
+    case {'whos'}
+        response = pymat_whos(req);
+
+    otherwise
+        response.success = false;
+        response.content.stdout = sprintf('Unknown command: %s', req.cmd);
+        response.result = '';
+end
+
+end %function
+
+
+function req = lean_defaults_(req)
+% Don't capture output or export figures unless the request says so
+options = {'capture', 'figures'};
+for i = 1:numel(options)
+    if ~isfield(req, options{i})
+        req.(options{i}) = false;
+    end
+end
+end %function
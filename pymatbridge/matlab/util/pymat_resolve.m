@@ -0,0 +1,38 @@
+function value = pymat_resolve(value)
+% PYMAT_RESOLVE: Replaces references to workspace variables by their values
+%
+% value = pymat_resolve(value);
+%
+%   Walks through cell arrays and structs, and replaces each struct with a
+%   matlabref field (see pymat_refs) by the value of the variable it names,
+%   and each struct with a matlabblob field by the argument it sent before,
+%   or along with it (see pymat_blobs). Other values are returned as they
+%   are.
+
+if isstruct(value)
+    if isscalar(value) && isfield(value, 'matlabref')
+        value = evalin('base', value.matlabref);
+        return
+    end
+    if isscalar(value) && isfield(value, 'matlabblob')
+        if isfield(value, 'value')
+            pymat_blobs('put', value.matlabblob, value.value);
+            value = value.value;
+        else
+            value = pymat_blobs('get', value.matlabblob);
+        end
+        return
+    end
+    fields = fieldnames(value);
+    for i = 1:numel(value)
+        for j = 1:numel(fields)
+            value(i).(fields{j}) = pymat_resolve(value(i).(fields{j}));
+        end
+    end
+elseif iscell(value)
+    for i = 1:numel(value)
+        value{i} = pymat_resolve(value{i});
+    end
+end
+
+end %function
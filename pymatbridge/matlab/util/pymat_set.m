@@ -0,0 +1,61 @@
+function response = pymat_set(req)
+% PYMAT_SET: Assigns a value to a variable in the base workspace
+%
+% response = pymat_set(req);
+%
+%   A lean alternative to calling assignin through pymat_eval: stdout is not
+%   captured, figures are left alone and the path is not touched. req should
+%   be a struct with the following fields:
+%       varname: The name of the variable to assign.
+%       value: The value to assign to it, which may hold references to
+%           other variables (see pymat_resolve).
+%
+%   Big arrays are sent in chunks. The first request has, instead of value,
+%   the fields shape, dtype (a numpy dtype name) and complex, to preallocate
+%   the array. The following ones have a value and a range, the 0-based
+%   range (end excluded) of elements of the array that the value fills, in
+%   linear indexing.
+
+response.success = true;
+response.content.stdout = '';
+response.result = '';
+
+try
+    if isfield(req, 'shape')
+        assignin('base', req.varname, zeros_(req.shape, req.dtype, req.complex));
+    elseif isfield(req, 'range')
+        if ~isvarname(req.varname)
+            error('Invalid variable name: %s', req.varname);
+        end
+        % Filling the array in the base workspace doesn't copy it
+        assignin('base', 'pymat_chunk', req.value);
+        evalin('base', sprintf('%s(%d:%d) = pymat_chunk(:); clear pymat_chunk;', ...
+                               req.varname, req.range(1)+1, req.range(2)));
+    else
+        assignin('base', req.varname, pymat_resolve(req.value));
+    end
+catch ME
+    response.success = false;
+    response.content.stdout = ME.message;
+end
+
+end %function
+
+
+function value = zeros_(shape, dtype, is_complex)
+% An array of zeros of the Matlab class matching a numpy dtype
+shape = shape(:)';
+switch dtype
+    case 'float64'
+        value = zeros(shape, 'double');
+    case 'float32'
+        value = zeros(shape, 'single');
+    case 'bool'
+        value = false(shape);
+    otherwise
+        value = zeros(shape, dtype);
+end
+if is_complex
+    value = complex(value, value);
+end
+end %function
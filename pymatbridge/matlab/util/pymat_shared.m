@@ -0,0 +1,115 @@
+function out = pymat_shared(cmd, varargin)
+% PYMAT_SHARED: Keeps workspace variables in step with files shared with the client
+%
+% pymat_shared('attach', name, file, dtype, shape);
+%
+%   Registers the file that holds the elements of variable name (in column
+%   major order, of the numpy dtype dtype), which the client maps as an
+%   array of the given shape, and loads it.
+%
+% pymat_shared('load', names);
+%
+%   Assigns the current contents of their files to the variables named in
+%   the cell array names, after the client changed them.
+%
+% pymat_shared('store', name);
+%
+%   Writes the value of the variable to its file, for the client to see.
+%   The variable must still have the class and number of elements it was
+%   attached with.
+%
+% pymat_shared('detach', name);
+%
+%   Stops keeping the variable in step with its file (the variable stays).
+%
+% The files are read and written whole with fread and fwrite, which Octave
+% has too, unlike memmapfile. A variable can't alias a mapped file either
+% way: the Data of a memmapfile is copied as soon as it is assigned to one.
+% So each load and store copies the array once, in memory on a tmpfs such as
+% /dev/shm, which is still cheaper than encoding it and sending it over the
+% socket.
+
+persistent shares
+if isempty(shares)
+    shares = struct();
+    % Keep the registry when user code runs 'clear all'
+    mlock;
+end
+
+out = true;
+switch(cmd)
+    case {'attach'}
+        [name, file, dtype, shape] = varargin{:};
+        shares.(name) = struct('file', file, 'class', matlab_class_(dtype), ...
+                               'shape', shape(:)');
+        load_(name, shares.(name));
+
+    case {'load'}
+        names = varargin{1};
+        if ischar(names)
+            names = {names};
+        end
+        for i = 1:numel(names)
+            if ~isfield(shares, names{i})
+                error('pymat_shared: %s is not shared', names{i});
+            end
+            load_(names{i}, shares.(names{i}));
+        end
+
+    case {'store'}
+        name = varargin{1};
+        share = shares.(name);
+        value = evalin('base', name);
+        if ~isa(value, share.class) || numel(value) ~= prod(share.shape)
+            error('pymat_shared: %s is no longer a %s array with %d elements', ...
+                  name, share.class, prod(share.shape));
+        end
+        fid = fopen(share.file, 'r+', 'l');
+        if strcmp(share.class, 'logical')
+            fwrite(fid, value, 'uint8');
+        else
+            fwrite(fid, value, share.class);
+        end
+        fclose(fid);
+
+    case {'detach'}
+        name = varargin{1};
+        if isfield(shares, name)
+            shares = rmfield(shares, name);
+        end
+
+    otherwise
+        error('pymat_shared: unknown command %s', cmd);
+end
+
+end %function
+
+
+function load_(name, share)
+fid = fopen(share.file, 'r', 'l');
+if fid < 0
+    error('pymat_shared: could not open %s', share.file);
+end
+count = [1, prod(share.shape)];
+if strcmp(share.class, 'logical')
+    value = logical(fread(fid, count, 'uint8=>uint8'));
+else
+    value = fread(fid, count, [share.class '=>' share.class]);
+end
+fclose(fid);
+assignin('base', name, reshape(value, share.shape));
+end %function
+
+
+function cls = matlab_class_(dtype)
+switch dtype
+    case 'float64'
+        cls = 'double';
+    case 'float32'
+        cls = 'single';
+    case 'bool'
+        cls = 'logical';
+    otherwise
+        cls = dtype;
+end
+end %function
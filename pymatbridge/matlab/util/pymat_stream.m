@@ -0,0 +1,90 @@
+function out = pymat_stream(cmd, varargin)
+% PYMAT_STREAM: Streams the output and progress of a request to the client
+%
+% pymat_stream('init', enabled);
+%
+%   Called by the server once, with whether the messenger has a stream
+%   socket.
+%
+% pymat_stream('begin', id, diary_file);
+%
+%   Starts streaming for the request tagged id. If diary_file is not empty,
+%   new output written to it is sent every half second, by a timer (which
+%   Octave doesn't have: there the output is only sent by 'end').
+%
+% sent = pymat_stream('publish', kind, data);
+%
+%   Sends a record {id, kind, data} to the client, if a request is being
+%   streamed. Returns whether the record was sent.
+%
+% pymat_stream('end');
+%
+%   Sends the remaining output and an 'end' record, and stops streaming.
+
+persistent enabled id diary_file offset poll_timer
+if isempty(enabled)
+    enabled = false;
+    id = '';
+end
+
+out = false;
+switch(cmd)
+    case {'init'}
+        enabled = varargin{1};
+        % Keep the state when user code runs 'clear all'
+        mlock;
+
+    case {'begin'}
+        if ~enabled
+            return
+        end
+        id = varargin{1};
+        diary_file = varargin{2};
+        offset = 0;
+        if ~isempty(diary_file) && exist('timer')
+            poll_timer = timer('Period', 0.5, ...
+                               'ExecutionMode', 'fixedSpacing', ...
+                               'BusyMode', 'drop', ...
+                               'TimerFcn', @(varargin) pymat_stream('flush'));
+            start(poll_timer);
+        end
+
+    case {'publish'}
+        if ~isempty(id)
+            record = struct('id', id, 'kind', varargin{1}, 'data', []);
+            record.data = varargin{2};
+            out = messenger('publish', json_dump(record));
+        end
+
+    case {'flush'}
+        if ~isempty(id) && ~isempty(diary_file)
+            FID = fopen(diary_file, 'r');
+            if (FID > 0)
+                fseek(FID, offset, 'bof');
+                [chunk, count] = fread(FID, [1, inf], 'uint8=>char');
+                fclose(FID);
+                offset = offset + count;
+                if count > 0
+                    pymat_stream('publish', 'stdout', chunk);
+                end
+            end
+        end
+
+    case {'end'}
+        if isempty(id)
+            return
+        end
+        if ~isempty(poll_timer)
+            stop(poll_timer);
+            delete(poll_timer);
+            poll_timer = [];
+        end
+        pymat_stream('flush');
+        out = pymat_stream('publish', 'end', []);
+        id = '';
+
+    otherwise
+        error('pymat_stream: unknown command %s', cmd);
+end
+
+end %function
@@ -0,0 +1,73 @@
+function out = pymat_timing(cmd, varargin)
+% PYMAT_TIMING: Times the phases of a request
+%
+% pymat_timing('start');
+%
+%   Starts timing a request, as it arrives.
+%
+% pymat_timing('add', phase, seconds);
+%
+%   Adds to the time spent in a phase of the request, e.g.:
+%       t = tic;
+%       ...
+%       pymat_timing('add', 'eval', toc(t));
+%
+% timing = pymat_timing('stop');
+%
+%   Returns a struct with the seconds spent in each phase, along with the
+%   fields total (seconds since the start), cpu (CPU seconds since the
+%   start) and memory (the resident memory of the process in bytes, or -1
+%   where unknown).
+
+persistent phases started cpu_started
+if isempty(phases)
+    phases = struct();
+    started = tic;
+    cpu_started = cputime;
+end
+
+out = [];
+switch(cmd)
+    case {'start'}
+        phases = struct();
+        started = tic;
+        cpu_started = cputime;
+
+    case {'add'}
+        phase = varargin{1};
+        if isfield(phases, phase)
+            phases.(phase) = phases.(phase) + varargin{2};
+        else
+            phases.(phase) = varargin{2};
+        end
+
+    case {'stop'}
+        out = phases;
+        out.total = toc(started);
+        out.cpu = cputime - cpu_started;
+        out.memory = memory_();
+
+    otherwise
+        error('pymat_timing: unknown command %s', cmd);
+end
+
+end %function
+
+
+function bytes = memory_()
+% Resident memory of the process
+bytes = -1;
+try
+    if ispc
+        info = memory();
+        bytes = info.MemUsedMATLAB;
+    else
+        status = fileread('/proc/self/status');
+        kb = regexp(status, 'VmRSS:\s*(\d+)', 'tokens', 'once');
+        if ~isempty(kb)
+            bytes = str2double(kb{1}) * 1024;
+        end
+    end
+catch
+end
+end %function
@@ -0,0 +1,49 @@
+function response = pymat_whos(req)
+% PYMAT_WHOS: Returns a struct with the metadata of workspace variables
+%
+% response = pymat_whos(req);
+%
+%   Describes variables of the base workspace without sending their values,
+%   so that clients can tell how big they are before getting them. req may
+%   have the following field:
+%       varname: The name of a variable, or a pattern with wildcards (*).
+%           Default is all the variables.
+%
+%   response.result is a struct array with the fields name, class, size,
+%   bytes, complex and sparse of each variable.
+
+response.success = true;
+response.content.stdout = '';
+response.result = {};
+
+pattern = '';
+if isfield(req, 'varname')
+    pattern = req.varname;
+end
+if ~isempty(pattern) && isempty(regexp(pattern, '^[A-Za-z*][\w*]*$', 'once'))
+    response.success = false;
+    response.content.stdout = sprintf('Invalid variable name: %s', pattern);
+    return
+end
+
+try
+    if isempty(pattern)
+        info = evalin('base', 'whos');
+    else
+        info = evalin('base', sprintf('whos(''%s'')', pattern));
+    end
+    fields = {'name', 'class', 'size', 'bytes', 'complex', 'sparse'};
+    for i = 1:numel(info)
+        for j = 1:numel(fields)
+            result(i).(fields{j}) = info(i).(fields{j});
+        end
+    end
+    if numel(info)
+        response.result = result;
+    end
+catch ME
+    response.success = false;
+    response.content.stdout = ME.message;
+end
+
+end %function
@@ -7,8 +7,6 @@ Magic command interface for interactive work with Matlab(R) via the pymatbridge
 
 """
 
-from shutil import rmtree
-
 import numpy as np
 import IPython
 
@@ -23,6 +21,12 @@ import pymatbridge as pymat
 from .compat import text_type
 
 
+# Mime types of the figure formats
+FIGURE_MIME_TYPES = {'png': 'image/png',
+                     'jpeg': 'image/jpeg',
+                     'svg': 'image/svg+xml'}
+
+
 class MatlabInterperterError(RuntimeError):
     """
     Some error occurs while matlab is running
@@ -79,11 +83,11 @@ class MatlabMagics(Magics):
         self.Matlab.start()
         self.pyconverter = pyconverter
 
-    def eval(self, line):
+    def eval(self, line, **kwargs):
         """
         Parse and evaluate a single line of matlab
         """
-        run_dict = self.Matlab.run_code(line)
+        run_dict = self.Matlab.run_code(line, **kwargs)
 
         if not run_dict['success']:
             raise MatlabInterperterError(line, run_dict['content']['stdout'])
@@ -104,7 +108,7 @@ class MatlabMagics(Magics):
     @magic_arguments()
     @argument(
         '-i', '--input', action='append',
-        help='Names of input variable from shell.user_ns to be assigned to Matlab variables of the same names after calling self.pyconverter. Multiple names can be passed separated only by commas with no whitespace.'
+        help='Names of input variable from shell.user_ns to be assigned to Matlab variables of the same names after calling self.pyconverter. Multiple names can be passed separated only by commas with no whitespace. Big inputs are sent again on every run, unless blob_bytes is set on the session (see the README).'
         )
 
     @argument(
@@ -127,6 +131,17 @@ class MatlabMagics(Magics):
         help='Show plots in a graphical user interface'
     )
 
+    @argument(
+        '-f', '--format', action='store', default='png',
+        choices=sorted(FIGURE_MIME_TYPES),
+        help='Format of the plots: png (default), jpeg or svg.'
+    )
+
+    @argument(
+        '-r', '--resolution', action='store', type=int, default=150,
+        help='Resolution of the plots, in dots per inch. Plots have the size given by --size at the default of 150.'
+    )
+
     @argument(
         'code',
         nargs='*',
@@ -155,11 +170,14 @@ class MatlabMagics(Magics):
                     val = self.shell.user_ns[input]
                 # The _Session.set_variable function which this calls
                 # should correctly detect numpy arrays and serialize them
-                # as json correctly.
+                # as json correctly. With blob_bytes set on the session
+                # (off by default), big arrays that didn't change since they
+                # were last sent are sent as their hash only.
                 self.set_matlab_var(input, val)
 
         try:
-            result_dict = self.eval(code)
+            result_dict = self.eval(code, figure_format=args.format,
+                                    figure_dpi=args.resolution)
         except MatlabInterperterError:
             raise
         except:
@@ -171,31 +189,24 @@ class MatlabMagics(Magics):
             ]))
 
         text_output = result_dict['content']['stdout']
-        # Figures get saved by matlab in reverse order...
-        imgfiles = result_dict['content']['figures'][::-1]
-        data_dir = result_dict['content']['datadir']
+        # Figures get rendered by matlab in reverse order...
+        images = result_dict['content']['figures'][::-1]
+        mime_type = FIGURE_MIME_TYPES[args.format]
 
         display_data = []
         if text_output and not args.silent:
             display_data.append(('MatlabMagic.matlab',
                                  {'text/plain': text_output}))
 
-        for imgf in imgfiles:
-            if len(imgf):
-                # Store the path to the directory so that you can delete it
-                # later on:
-                with open(imgf, 'rb') as fid:
-                    image = fid.read()
-                display_data.append(('MatlabMagic.matlab',
-                                     {'image/png': image}))
+        for image in images:
+            image = np.asarray(image, dtype=np.uint8).tobytes()
+            if mime_type == 'image/svg+xml':
+                image = image.decode('utf-8')
+            display_data.append(('MatlabMagic.matlab', {mime_type: image}))
 
         for disp_d in display_data:
             publish_display_data(source=disp_d[0], data=disp_d[1])
 
-        # Delete the temporary data files created by matlab:
-        if len(data_dir):
-            rmtree(data_dir)
-
         if args.output:
             for output in ','.join(args.output).split(','):
                 self.shell.push({output:self.Matlab.get_variable(output)})
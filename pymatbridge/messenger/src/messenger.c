@@ -4,21 +4,41 @@
 #include "mex.h"
 #include "zmq.h"
 
-/* Set a 200MB receiver buffer size */
-#define BUFLEN 200000000
+/* Bumped whenever the set of commands understood by the messenger changes.
+ * Version 1 added multipart messages (binary array frames).
+ * Version 2 dropped the fixed receive buffer and added 'listen' as uint8.
+ * Version 3 added the stream socket and 'publish'.
+ * Version 4 made the stream socket optional: 'init' carries on without it
+ * when it can't be bound, and tells whether it was as a second output. */
+#define MESSENGER_VERSION 4
 
 /* The variable cannot be named socket on windows */
-void *ctx, *socket_ptr;
+void *ctx, *socket_ptr, *stream_ptr = NULL;
 static int initialized = 0;
 
-/* Initialize a ZMQ server */
-int initialize(char *socket_addr) {
-    int rc;
+/* Initialize a ZMQ server, and optionally a PUSH socket to stream output
+ * and progress to the client while a request runs. The stream is only a
+ * convenience: if its socket can't be bound (e.g. its port is taken), the
+ * server runs without it, and stream_ptr stays NULL */
+int initialize(char *socket_addr, char *stream_addr) {
+    int rc, linger = 0;
     mexLock();
     ctx = zmq_ctx_new();
     socket_ptr = zmq_socket(ctx, ZMQ_REP);
     rc = zmq_bind(socket_ptr, socket_addr);
 
+    if (!rc && stream_addr) {
+        stream_ptr = zmq_socket(ctx, ZMQ_PUSH);
+        /* Don't hold up the exit for stream messages nobody reads */
+        zmq_setsockopt(stream_ptr, ZMQ_LINGER, &linger, sizeof(linger));
+        if (zmq_bind(stream_ptr, stream_addr)) {
+            mexPrintf("Stream socket creation failed, not streaming: %s\n",
+                      zmq_strerror(zmq_errno()));
+            zmq_close(stream_ptr);
+            stream_ptr = NULL;
+        }
+    }
+
     if (!rc) {
         initialized = 1;
         return 0;
@@ -45,19 +65,141 @@ void cleanup (void) {
     zmq_send(socket_ptr, "exit", 4, 0);
 
     zmq_close(socket_ptr);
+    if (stream_ptr) {
+        zmq_close(stream_ptr);
+    }
     mexPrintf("Socket closed\n");
     zmq_term(ctx);
     mexPrintf("Context terminated\n");
 }
 
 
+/* Copy the contents of a message into a new MATLAB array of exactly the
+ * same size, either as a char row vector or as raw uint8 bytes. Requests
+ * are ASCII JSON, so each byte maps to one character */
+mxArray *messageToArray(zmq_msg_t *msg, int as_bytes) {
+    size_t len = zmq_msg_size(msg);
+    const unsigned char *data = zmq_msg_data(msg);
+    mxArray *arr;
+
+    if (as_bytes) {
+        arr = mxCreateNumericMatrix(1, len, mxUINT8_CLASS, mxREAL);
+        memcpy(mxGetData(arr), data, len);
+    } else {
+        mwSize dims[2];
+        mxChar *chars;
+        size_t i;
+
+        dims[0] = 1;
+        dims[1] = len;
+        arr = mxCreateCharArray(2, dims);
+        chars = mxGetChars(arr);
+        for (i = 0; i < len; i++) {
+            chars[i] = (mxChar) data[i];
+        }
+    }
+    return arr;
+}
+
+
+/* Receive one frame into a MATLAB array, raising a MATLAB error on failure */
+mxArray *receiveFrame(int as_bytes) {
+    zmq_msg_t part;
+    mxArray *arr;
+    char errmsg[256];
+
+    zmq_msg_init(&part);
+    if (zmq_msg_recv(&part, socket_ptr, 0) == -1) {
+        zmq_msg_close(&part);
+        sprintf(errmsg, "Failed to receive a message due to ZMQ error %s",
+                zmq_strerror(errno));
+        mexErrMsgTxt(errmsg);
+    }
+    arr = messageToArray(&part, as_bytes);
+    zmq_msg_close(&part);
+    return arr;
+}
+
+
+/* Receive the remaining frames of a multipart message as uint8 arrays
+ * collected in a cell array */
+mxArray *receiveFrames(void) {
+    mxArray **frames = NULL;
+    mxArray *cell;
+    size_t nframes = 0, i;
+    int more;
+    size_t more_size = sizeof(more);
+
+    zmq_getsockopt(socket_ptr, ZMQ_RCVMORE, &more, &more_size);
+    while (more) {
+        frames = mxRealloc(frames, (nframes + 1) * sizeof(mxArray *));
+        frames[nframes++] = receiveFrame(1);
+        zmq_getsockopt(socket_ptr, ZMQ_RCVMORE, &more, &more_size);
+    }
+
+    cell = mxCreateCellMatrix(1, nframes);
+    for (i = 0; i < nframes; i++) {
+        mxSetCell(cell, i, frames[i]);
+    }
+    mxFree(frames);
+    return cell;
+}
+
+
+/* Send a char array as text. Plain ASCII (the usual case for JSON) is
+ * narrowed straight into the outgoing message; anything else goes through
+ * mxArrayToString for the multibyte conversion */
+int sendString(void *sock, const mxArray *frame, int flags) {
+    size_t len = mxGetNumberOfElements(frame), i;
+    const mxChar *chars = mxGetChars(frame);
+    zmq_msg_t msg;
+    char *data;
+    int rc;
+
+    for (i = 0; i < len; i++) {
+        if (chars[i] > 127) {
+            char *msg_out = mxArrayToString(frame);
+            len = strlen(msg_out);
+            rc = (zmq_send(sock, msg_out, len, flags) != -1);
+            mxFree(msg_out);
+            return rc;
+        }
+    }
+
+    zmq_msg_init_size(&msg, len);
+    data = zmq_msg_data(&msg);
+    for (i = 0; i < len; i++) {
+        data[i] = (char) chars[i];
+    }
+    rc = (zmq_msg_send(&msg, sock, flags) != -1);
+    if (!rc) {
+        zmq_msg_close(&msg);
+    }
+    return rc;
+}
+
+
+/* Send one frame of a (possibly multipart) message. Character arrays are
+ * sent as text, anything else as its raw bytes */
+int sendFrame(void *sock, const mxArray *frame, int flags) {
+    size_t msglen;
+
+    if (mxIsChar(frame)) {
+        return sendString(sock, frame, flags);
+    }
+    /* zmq reports at most INT_MAX bytes sent, so only check for failure */
+    msglen = mxGetNumberOfElements(frame) * mxGetElementSize(frame);
+    return (zmq_send(sock, mxGetData(frame), msglen, flags) != -1);
+}
+
+
 /* Gateway function with Matlab */
 void mexFunction(int nlhs, mxArray *plhs[],
                  int nrhs, const mxArray *prhs[]) {
     char *cmd;
     /* If no input argument, print out the usage */
     if (nrhs == 0) {
-        mexErrMsgTxt("Usage: messenger('init|listen|respond', extra1, extra2, ...)");
+        mexErrMsgTxt("Usage: messenger('init|listen|respond|publish|version', extra1, extra2, ...)");
     }
 
     /* Get the input command */
@@ -65,26 +207,33 @@ void mexFunction(int nlhs, mxArray *plhs[],
         mexErrMsgTxt("Cannot read the command");
     }
 
-    /* Initialize a new server session */
+    /* Initialize a new server session, with messenger('init', socket_addr)
+     * or [ok, streaming] = messenger('init', socket_addr, stream_addr) */
     if (strcmp(cmd, "init") == 0) {
-        char *socket_addr;
+        char *socket_addr, *stream_addr = NULL;
         mxLogical *p;
 
         /* Check if the input format is valid */
-        if (nrhs != 2) {
+        if (nrhs < 2 || nrhs > 3) {
             mexErrMsgTxt("Missing argument: socket address");
         }
         if (!(socket_addr = mxArrayToString(prhs[1]))) {
             mexErrMsgTxt("Cannot read socket address");
         }
+        if (nrhs == 3 && !(stream_addr = mxArrayToString(prhs[2]))) {
+            mexErrMsgTxt("Cannot read stream address");
+        }
 
         plhs[0] = mxCreateLogicalMatrix(1, 1);
         p = mxGetLogicals(plhs[0]);
 
         if (!initialized) {
-            if (!initialize(socket_addr)) {
+            if (!initialize(socket_addr, stream_addr)) {
                 p[0] = 1;
                 mexPrintf("Socket created at: %s\n", socket_addr);
+                if (nlhs > 1) {
+                    plhs[1] = mxCreateLogicalScalar(stream_ptr != NULL);
+                }
             } else {
                 p[0] = 0;
                 mexErrMsgTxt("Socket creation failed.");
@@ -95,53 +244,55 @@ void mexFunction(int nlhs, mxArray *plhs[],
 
         return;
 
-    /* Listen over an existing socket */
+    /* Listen over an existing socket. The message is returned as a string,
+     * or as raw bytes with messenger('listen', 'uint8') */
     } else if (strcmp(cmd, "listen") == 0) {
-        int byte_recvd;
-        char *recv_buffer = mxCalloc(BUFLEN, sizeof(char));
+        int as_bytes = 0;
         zmq_pollitem_t polls[] = {{socket_ptr, 0, ZMQ_POLLIN, 0}};
-        
+
         if (!checkInitialized()) return;
-        
+
+        if (nrhs > 1) {
+            char *format = mxArrayToString(prhs[1]);
+            as_bytes = format && strcmp(format, "uint8") == 0;
+            mxFree(format);
+        }
+
         /* allow MATLAB to draw its graphics every 20ms */
         while (zmq_poll(polls, 1, 20000) == 0) {
             mexEvalString("drawnow");
         }
 
-        byte_recvd = zmq_recv(socket_ptr, recv_buffer, BUFLEN, 0);
+        plhs[0] = receiveFrame(as_bytes);
 
-        /* Check if the received data is complete and correct */
-        if ((byte_recvd > -1) && (byte_recvd <= BUFLEN)) {
-            plhs[0] = mxCreateString(recv_buffer);
-        } else if (byte_recvd > BUFLEN){
-            mexErrMsgTxt("Receiver buffer overflow. Message truncated");
-        } else {
-        	sprintf(recv_buffer, "Failed to receive a message due to ZMQ error %s", strerror(errno));
-            mexErrMsgTxt(recv_buffer);
+        /* Array buffers of the binary protocol follow the header */
+        if (nlhs > 1) {
+            plhs[1] = receiveFrames();
         }
 
         return;
 
-    /* Send a message out */
+    /* Send a message out, with any extra arguments as additional frames */
     } else if (strcmp(cmd, "respond") == 0) {
-        size_t msglen;
-        char *msg_out;
         mxLogical *p;
+        int i, ok = 1;
 
         /* Check if the input format is valid */
-        if (nrhs != 2) {
+        if (nrhs < 2) {
             mexErrMsgTxt("Please provide the message to send");
         }
 
         if (!checkInitialized()) return;
 
-        msglen = mxGetNumberOfElements(prhs[1]);
-        msg_out = mxArrayToString(prhs[1]);
-
         plhs[0] = mxCreateLogicalMatrix(1, 1);
         p = mxGetLogicals(plhs[0]);
 
-        if (msglen == zmq_send(socket_ptr, msg_out, msglen, 0)) {
+        for (i = 1; i < nrhs && ok; i++) {
+            ok = sendFrame(socket_ptr, prhs[i],
+                           (i < nrhs - 1) ? ZMQ_SNDMORE : 0);
+        }
+
+        if (ok) {
             p[0] = 1;
         } else {
             p[0] = 0;
@@ -150,6 +301,32 @@ void mexFunction(int nlhs, mxArray *plhs[],
 
         return;
 
+    /* Send a message over the stream socket, if there is one. This never
+     * blocks: the message is dropped if the client isn't keeping up, and
+     * false is returned */
+    } else if (strcmp(cmd, "publish") == 0) {
+        int i, ok = (stream_ptr != NULL);
+
+        if (nrhs < 2) {
+            mexErrMsgTxt("Please provide the message to publish");
+        }
+
+        if (!checkInitialized()) return;
+
+        for (i = 1; i < nrhs && ok; i++) {
+            ok = sendFrame(stream_ptr, prhs[i], ZMQ_DONTWAIT |
+                           ((i < nrhs - 1) ? ZMQ_SNDMORE : 0));
+        }
+        plhs[0] = mxCreateLogicalScalar(ok);
+
+        return;
+
+    /* Report which commands this build understands */
+    } else if (strcmp(cmd, "version") == 0) {
+        plhs[0] = mxCreateDoubleScalar(MESSENGER_VERSION);
+
+        return;
+
     /* Close the socket and context */
     } else if (strcmp(cmd, "exit") == 0) {
         cleanup();
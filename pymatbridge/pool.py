@@ -0,0 +1,279 @@
+"""
+pymatbridge.pool
+================
+
+A pool of Matlab or Octave sessions, for running independent calls in
+parallel across cores.
+
+Example
+-------
+
+>>> from pymatbridge import SessionPool, Octave
+>>> with SessionPool(4, backend=Octave) as pool:
+...     roots = list(pool.map('sqrt', [1., 4., 9., 16.]))
+>>> roots
+[1.0, 2.0, 3.0, 4.0]
+
+"""
+
+import threading
+from concurrent.futures import Future, as_completed
+
+try:
+    from queue import Empty, Queue
+except ImportError:
+    from Queue import Empty, Queue
+
+import zmq
+
+from .pymatbridge import Matlab, ServerExitError, start_sessions
+
+__all__ = ['SessionPool']
+
+
+class SessionPool(object):
+
+    def __init__(self, n, backend=Matlab, preamble=None, timeout=None,
+                 **kwargs):
+        """
+        A pool of sessions, each served by its own worker thread.
+
+        Parameters
+        ----------
+
+        n : int
+            Number of sessions (and worker threads) in the pool.
+
+        backend : class
+            The session class to start, Matlab (default) or Octave.
+
+        preamble : str or callable, optional
+            Code run in every session when it starts, including sessions that
+            replace dead ones. Either a string of Matlab code, or a callable
+            that takes the session as its only argument.
+
+        timeout : float, optional
+            Seconds to wait for the response to a call before the session is
+            considered dead and replaced. Default is to wait forever. If the
+            replacement fails to start, the pool carries on with the other
+            sessions. Once none is left, the calls waiting in the queue fail
+            with the error of the last replacement.
+
+        kwargs :
+            Passed on to the backend when creating each session.
+        """
+        self.n = n
+        self.backend = backend
+        self.preamble = preamble
+        self.timeout = timeout
+        self.session_kwargs = kwargs
+        self.replaced = 0
+        self._tasks = Queue()
+        self._workers = []
+        # Workers that still have a session
+        self._alive = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """Start the sessions, returning once they are all connected"""
+        sessions = start_sessions([self._new_session(i)
+                                   for i in range(self.n)])
+        ready = [Future() for _ in sessions]
+        self._alive = len(sessions)
+        for i, session in enumerate(sessions):
+            worker = threading.Thread(target=self._work,
+                                      args=(i, session, ready[i]))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        try:
+            for started in ready:
+                started.result()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        """Stop the sessions once the calls submitted so far are done"""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule a call on the first available session
+
+        Parameters
+        ----------
+        func : str or callable
+            A Matlab function name or path to an m-file, called with `args`
+            and `kwargs` the same way as `run_func`. Alternatively, a python
+            callable that is called with the session as its first argument,
+            followed by `args` and `kwargs`.
+
+        Returns
+        -------
+        A concurrent.futures.Future of the response dictionary of run_func,
+        or of the return value of the callable.
+        """
+        if not self._workers:
+            raise ValueError('Pool not started, use start()')
+
+        if callable(func):
+            def call(session):
+                return func(session, *args, **kwargs)
+        else:
+            def call(session):
+                return session.run_func(func, *args, **kwargs)
+        future = Future()
+        with self._lock:
+            if self._alive:
+                self._tasks.put((future, call))
+            else:
+                future.set_exception(RuntimeError('All the sessions of the '
+                                                  'pool failed to restart'))
+        return future
+
+    def map(self, func, *iterables, **kwargs):
+        """Call a Matlab function on every item, in parallel
+
+        Parameters
+        ----------
+        func : str
+            A Matlab function name or path to an m-file.
+        iterables :
+            As many iterables as `func` takes arguments, like the builtin map.
+        chunksize : int, optional
+            Number of calls sent to a session at a time, as a single batch.
+            Larger chunks mean fewer round trips. Default is 1.
+        ordered : bool, optional
+            Whether to yield results in the order of the input (default), or
+            as soon as they are done.
+        nargout : int, optional
+            Desired number of return arguments.
+
+        Returns
+        -------
+        An iterator over the results. Raises RuntimeError with Matlab's error
+        message if any call fails.
+        """
+        chunksize = kwargs.pop('chunksize', 1)
+        ordered = kwargs.pop('ordered', True)
+        calls = list(zip(*iterables))
+        chunks = [calls[i:i + chunksize]
+                  for i in range(0, len(calls), chunksize)]
+        futures = [self.submit(_run_chunk, func, chunk, kwargs)
+                   for chunk in chunks]
+        return self._results(futures if ordered else as_completed(futures))
+
+    @staticmethod
+    def _results(futures):
+        for future in futures:
+            for result in future.result():
+                yield result
+
+    def _new_session(self, i):
+        kwargs = dict(self.session_kwargs)
+        kwargs.setdefault('id', 'python-matlab-bridge-pool-%d' % i)
+        return self.backend(**kwargs)
+
+    def _prepare(self, session):
+        session.timeout = self.timeout
+        if callable(self.preamble):
+            self.preamble(session)
+        elif self.preamble:
+            session.run_code(self.preamble)
+        return session
+
+    def _replace(self, i):
+        """Start and prepare a new session in place of session i"""
+        session = self._new_session(i)
+        try:
+            return self._prepare(session.start())
+        except Exception:
+            session._discard()
+            raise
+
+    def _give_up(self, error):
+        """Retire a worker left without a session. The other workers carry
+        on with the calls in the queue, which only fail once none is left"""
+        with self._lock:
+            self._alive -= 1
+            if self._alive:
+                return
+            stops = 0
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except Empty:
+                    break
+                if task is None:
+                    stops += 1
+                    continue
+                future, _ = task
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+            # Those are for the other workers
+            for _ in range(stops):
+                self._tasks.put(None)
+
+    def _work(self, i, session, started):
+        try:
+            self._prepare(session)
+        except Exception as e:
+            session._discard()
+            self._give_up(e)
+            started.set_exception(e)
+            return
+        started.set_result(session)
+
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, call = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(call(session))
+            except (zmq.ZMQError, ServerExitError) as e:
+                # The session died or timed out: a REQ socket that didn't get
+                # its reply can't be used again, so start a fresh session
+                future.set_exception(e)
+                session._discard()
+                with self._lock:
+                    self.replaced += 1
+                try:
+                    session = self._replace(i)
+                except Exception as e:
+                    self._give_up(e)
+                    return
+            except Exception as e:
+                future.set_exception(e)
+
+        session.stop()
+
+
+def _run_chunk(session, func, chunk, kwargs):
+    """Call `func` on each tuple of arguments of `chunk`, in a single batch"""
+    if len(chunk) == 1:
+        responses = [session.run_func(func, *chunk[0], **kwargs)]
+    else:
+        with session.batch() as batch:
+            pending = [batch.run_func(func, *args, **kwargs) for args in chunk]
+        responses = [p.response if p.executed else None for p in pending]
+    results = []
+    for args, resp in zip(chunk, responses):
+        if resp is None or not resp['success']:
+            message = resp['content']['stdout'] if resp else 'not executed'
+            raise RuntimeError('%s%r failed: %s' % (func, args, message))
+        results.append(resp['result'])
+    return results
@@ -15,7 +15,7 @@ Send 'exit' command to kill the server
 .MATLAB started and connected!
 True
 >>> m.run_code('a=1;')
-{'content': {'stdout': '', 'datadir': '/private/tmp/MatlabData/', 'code': 'a=1;', 'figures': []}, 'success': True}
+{'content': {'stdout': '', 'figures': []}, 'result': '', 'success': True}
 >>> m.get_variable('a')
 1
 
@@ -25,17 +25,31 @@ import atexit
 import os
 import time
 import base64
+import hashlib
 import zmq
 import subprocess
 import sys
 import json
+import operator
 import types
 import weakref
 import random
+import shutil
+import signal
+import tempfile
+import threading
+from collections import deque
+from functools import partial
 from uuid import uuid4
 
-from numpy import ndarray, generic, float64, frombuffer, asfortranarray
+from numpy import (ndarray, generic, float32, float64, uint8, complex64,
+                   frombuffer, asarray, asfortranarray, ascontiguousarray,
+                   empty, zeros, packbits, unpackbits, prod, result_type,
+                   memmap)
+from numpy import dtype as numpy_dtype
 
+from pymatbridge.cache import ResultCache
+from pymatbridge.stats import CallStats
 from pymatbridge.messenger.make import get_messenger_dir
 
 try:
@@ -45,8 +59,94 @@ except ImportError:
         pass
 
 
-def encode_ndarray(obj):
-    """Write a numpy array and its shape to base64 buffers"""
+# The dtype of np.array([1, 2]), which is sent as double unless asked not to
+# (see _Session.default_int_as_double)
+DEFAULT_INT = numpy_dtype(int)
+
+
+def wire_dtype(dtype):
+    """The dtype an array of `dtype` is sent as
+
+    Matlab has no half precision, so float16 is widened to single, nor
+    extended precision, so longdouble is narrowed to double (and the parts
+    of clongdouble along with it). Everything else keeps its element size,
+    in little-endian byte order.
+    """
+    if dtype.kind == 'f' and dtype.itemsize < 4:
+        dtype = float32
+    elif dtype.kind == 'f' and dtype.itemsize > 8:
+        dtype = float64
+    return numpy_dtype(dtype).newbyteorder('<')
+
+
+def matlab_dtype(matlab_class, is_complex=False):
+    """The dtype of a numeric or logical Matlab class"""
+    names = {'double': 'float64', 'single': 'float32', 'logical': 'bool'}
+    dtype = numpy_dtype(names.get(matlab_class, matlab_class))
+    if is_complex:
+        dtype = result_type(dtype, complex64)
+    return dtype
+
+
+def pack_bits(flat):
+    """Pack a flat boolean array into bytes, least significant bit first"""
+    padded = zeros(-(-flat.size // 8) * 8, dtype=uint8)
+    padded[:flat.size] = flat
+    return packbits(padded.reshape(-1, 8)[:, ::-1])
+
+
+def unpack_bits(data, count):
+    """Inverse of pack_bits, for an array of `count` elements"""
+    bits = unpackbits(frombuffer(data, uint8)).reshape(-1, 8)[:, ::-1]
+    return bits.ravel()[:count].astype(bool)
+
+
+class SharedBuffers(list):
+
+    def __init__(self, directory, min_bytes):
+        """Buffers of the binary protocol, except that the big ones are
+        written to files, for a server on the same host to read
+
+        Parameters
+        ----------
+        directory: str
+            Where to write the files, preferably on a tmpfs such as /dev/shm
+        min_bytes: int
+            Buffers of at least this many bytes go to files
+        """
+        super(SharedBuffers, self).__init__()
+        self.directory = directory
+        self.min_bytes = min_bytes
+
+    def share(self, data):
+        """Write an array to a new file, and return how to find it"""
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            data.tofile(f)
+        return {'file': path, 'offset': 0, 'nbytes': data.nbytes}
+
+
+def read_shared(ref):
+    """Map an array written to a file by the server (see SharedBuffers)
+
+    The mapping is copy-on-write, and outlives the file.
+    """
+    return memmap(ref['file'], uint8, mode='c', offset=int(ref['offset']),
+                  shape=(int(ref['nbytes']),))
+
+
+def encode_ndarray(obj, buffers=None):
+    """Write a numpy array and its shape to base64 buffers
+
+    The array keeps its element type (see `wire_dtype`); boolean arrays are
+    packed to one bit per element.
+
+    If `buffers` is a list, the raw bytes are appended to it instead and the
+    index of the new buffer is returned in place of the base64 string. This is
+    used by the binary protocol, which ships each buffer as a separate frame.
+    Big enough arrays are written to a file instead if `buffers` is a
+    `SharedBuffers`.
+    """
     shape = obj.shape
     if len(shape) == 1:
         shape = (1, obj.shape[0])
@@ -56,62 +156,438 @@ def encode_ndarray(obj):
         obj = asfortranarray(obj.T)
     else:
         obj = obj.T
+
+    if obj.dtype.kind == 'b':
+        obj = pack_bits(obj.ravel())
+    else:
+        obj = obj.astype(wire_dtype(obj.dtype), copy=False)
+
+    if isinstance(buffers, SharedBuffers) and obj.nbytes >= buffers.min_bytes:
+        return buffers.share(obj.ravel()), shape
+    if buffers is not None:
+        # For fortran-ordered input this is a view, which ZMQ can send
+        # without another copy
+        buffers.append(obj.ravel())
+        return len(buffers) - 1, shape
+
     try:
-        data = obj.astype(float64).tobytes()
+        data = obj.tobytes()
     except AttributeError:
-        data = obj.astype(float64).tostring()
+        data = obj.tostring()
 
     data = base64.b64encode(data).decode('utf-8')
     return data, shape
 
 
+def blob_key(obj):
+    """A hash of the content of an array, its type and its shape"""
+    key = hashlib.sha1(('%s %s ' % (obj.dtype.str, obj.shape)).encode('ascii'))
+    if obj.flags.f_contiguous and not obj.flags.c_contiguous:
+        key.update(b'F')
+        obj = obj.T
+    key.update(ascontiguousarray(obj).view(uint8).ravel())
+    return key.hexdigest()
+
+
 # JSON encoder extension to handle complex numbers and numpy arrays
 class PymatEncoder(json.JSONEncoder):
 
+    def __init__(self, *args, **kwargs):
+        self.buffers = kwargs.pop('buffers', None)
+        # The keys (see blob_key) of the arrays that the server keeps, and
+        # the size from which arrays are kept (see pymat_blobs)
+        self.blobs = kwargs.pop('blobs', None)
+        self.blob_bytes = kwargs.pop('blob_bytes', None)
+        # Keys already computed, by id() of the array
+        self.blob_keys = kwargs.pop('blob_keys', None) or {}
+        self.default_int_as_double = kwargs.pop('default_int_as_double',
+                                                False)
+        super(PymatEncoder, self).__init__(*args, **kwargs)
+
+    def _is_blob(self, obj):
+        """Whether an array is worth keeping on the server: big enough, and
+        not handed over through a file, which is cheaper than hashing it"""
+        if self.blobs is None or obj.nbytes < self.blob_bytes:
+            return False
+        return not (isinstance(self.buffers, SharedBuffers)
+                    and obj.nbytes >= self.buffers.min_bytes)
+
     def default(self, obj):
-        if isinstance(obj, ndarray) and obj.dtype.kind in 'uif':
-            data, shape = encode_ndarray(obj)
-            return {'ndarray': True, 'shape': shape, 'data': data}
-        elif isinstance(obj, ndarray) and obj.dtype.kind == 'c':
-            real, shape = encode_ndarray(obj.real.copy())
-            imag, _ = encode_ndarray(obj.imag.copy())
-            return {'ndarray': True, 'shape': shape,
-                    'real': real, 'imag': imag}
+        if (isinstance(obj, ndarray) and obj.dtype.kind in 'biufc'
+                and self._is_blob(obj)):
+            key = self.blob_keys.get(id(obj)) or blob_key(obj)
+            if key in self.blobs:
+                return {'matlabblob': key}
+            self.blobs.add(key)
+            return {'matlabblob': key, 'value': self.encode_array(obj)}
+        elif isinstance(obj, ndarray) and obj.dtype.kind in 'biufc':
+            return self.encode_array(obj)
         elif isinstance(obj, ndarray):
             return obj.tolist()
         elif isinstance(obj, complex):
             return {'real': obj.real, 'imag': obj.imag}
         elif isinstance(obj, generic):
             return obj.item()
+        elif isinstance(obj, WorkspaceVariable):
+            return {'matlabref': obj.name}
         # Handle the default case
         return json.JSONEncoder.default(self, obj)
 
+    def encode_array(self, obj):
+        if self.default_int_as_double and obj.dtype == DEFAULT_INT:
+            obj = obj.astype(float64)
+        if obj.dtype.kind == 'b':
+            data, shape = encode_ndarray(obj, self.buffers)
+            return {'ndarray': True, 'shape': shape, 'data': data,
+                    'dtype': 'bool'}
+        elif obj.dtype.kind == 'c':
+            real, shape = encode_ndarray(obj.real.copy(), self.buffers)
+            imag, _ = encode_ndarray(obj.imag.copy(), self.buffers)
+            return {'ndarray': True, 'shape': shape,
+                    'real': real, 'imag': imag,
+                    'dtype': wire_dtype(obj.real.dtype).name}
+        data, shape = encode_ndarray(obj, self.buffers)
+        return {'ndarray': True, 'shape': shape, 'data': data,
+                'dtype': wire_dtype(obj.dtype).name}
+
+
+def decode_arr(data, buffers=None, dtype='float64'):
+    """Extract a numpy array from a base64 buffer
+
+    Integer `data` is an index into `buffers`, the raw frames that came with
+    a binary protocol message, and a dictionary refers to a file (see
+    `read_shared`).
+    """
+    if isinstance(data, int):
+        data = buffers[data]
+    elif isinstance(data, dict):
+        data = read_shared(data)
+    else:
+        data = base64.b64decode(data.encode('utf-8'))
+    if dtype == 'bool':
+        return data
+    return frombuffer(data, numpy_dtype(dtype).newbyteorder('<'))
+
 
-def decode_arr(data):
-    """Extract a numpy array from a base64 buffer"""
-    data = data.encode('utf-8')
-    return frombuffer(base64.b64decode(data), float64)
+def decode_shape(shape):
+    """Array shapes come as a list from python, as base64 from Matlab"""
+    if type(shape) is not list:
+        shape = decode_arr(shape).astype(int)
+    return shape
 
 
 # JSON decoder for arrays and complex numbers
-def decode_pymat(dct):
+def decode_pymat(dct, buffers=None):
     if 'ndarray' in dct and 'data' in dct:
-        value = decode_arr(dct['data'])
-        shape = dct['shape']
-        if type(dct['shape']) is not list:
-            shape = decode_arr(dct['shape']).astype(int)
+        dtype = dct.get('dtype', 'float64')
+        value = decode_arr(dct['data'], buffers, dtype)
+        shape = decode_shape(dct['shape'])
+        if dtype == 'bool':
+            value = unpack_bits(value, int(prod(shape)))
         return value.reshape(shape, order='F')
     elif 'ndarray' in dct and 'imag' in dct:
-        real = decode_arr(dct['real'])
-        imag = decode_arr(dct['imag'])
-        shape = decode_arr(dct['shape']).astype(int)
+        dtype = dct.get('dtype', 'float64')
+        real = decode_arr(dct['real'], buffers, dtype)
+        imag = decode_arr(dct['imag'], buffers, dtype)
+        shape = decode_shape(dct['shape'])
         data = real + 1j * imag
         return data.reshape(shape, order='F')
     elif 'real' in dct and 'imag' in dct:
         return complex(dct['real'], dct['imag'])
     return dct
 
+
+class CacheKeyEncoder(PymatEncoder):
+    """Serializes a request to find its result in a `ResultCache`
+
+    Arrays are replaced by their `blob_key`, and references to workspace
+    variables, whose value could change, can't be serialized.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, ndarray) and obj.dtype.kind in 'biufc':
+            return {'ndarray': blob_key(obj)}
+        elif isinstance(obj, WorkspaceVariable):
+            raise ValueError('Results of calls with workspace variables as '
+                             'arguments are not cached')
+        return super(CacheKeyEncoder, self).default(obj)
+
+
+def encode_message(message, binary=False, buffers=None, blobs=None,
+                   blob_bytes=None, blob_keys=None,
+                   default_int_as_double=False):
+    """Serialize a request into a list of ZMQ frames
+
+    With the JSON protocol this is a single frame of text. With the binary
+    protocol, the first frame is a JSON header in which arrays refer (by
+    index) to the raw little-endian buffers sent as the following frames.
+    These are collected in `buffers`, if given (e.g. a `SharedBuffers`).
+
+    Arrays of at least `blob_bytes` bytes whose key is in the set `blobs`
+    are sent as their key only, and the keys of the others are added to it
+    (see `blob_key`), unless they go to the files of `buffers`. `blob_keys`
+    maps the id() of arrays whose key is already known to it.
+
+    With `default_int_as_double`, arrays of the default integer type
+    (`DEFAULT_INT`) are sent as float64.
+    """
+    if not binary:
+        buffers = None
+    elif buffers is None:
+        buffers = []
+    header = json.dumps(message, cls=PymatEncoder, buffers=buffers,
+                        blobs=blobs, blob_bytes=blob_bytes,
+                        blob_keys=blob_keys,
+                        default_int_as_double=default_int_as_double)
+    return [header.encode('utf-8')] + (buffers or [])
+
+
+def matlab_index(index):
+    """Describe a numpy style index the way pymat_get understands it
+
+    Returns a string per dimension, 'start:stop:step' for a slice or a comma
+    separated list of indices, and the dimensions indexed by an integer,
+    which numpy drops from the result.
+    """
+    if not isinstance(index, tuple):
+        index = (index,)
+    specs, dropped = [], []
+    for dim, item in enumerate(index):
+        if isinstance(item, slice):
+            if item.step == 0:
+                raise ValueError('slice step cannot be zero')
+            specs.append(':'.join('' if i is None else str(operator.index(i))
+                                  for i in (item.start, item.stop, item.step)))
+        elif hasattr(item, '__index__'):
+            specs.append(str(operator.index(item)))
+            dropped.append(dim)
+        else:
+            try:
+                specs.append(','.join(str(operator.index(i)) for i in item))
+            except TypeError:
+                raise TypeError('Indices must be integers, slices or '
+                                'sequences of integers, not %r' % (item,))
+    return specs, dropped
+
+
+def drop_dims(value, dims):
+    """Drop dimensions indexed by an integer from an array that Matlab kept"""
+    if not dims or not isinstance(value, ndarray):
+        return value
+    # Matlab drops trailing singleton dimensions itself
+    shape = list(value.shape) + [1] * (max(dims) + 1 - value.ndim)
+    return value.reshape([n for d, n in enumerate(shape) if d not in dims])
+
+
+def missing_blobs(frames):
+    """The keys of the arrays that the server asks for again, if it does
+
+    The server replies with nothing else to a request that refers to
+    arrays it no longer keeps (see pymat_blobs).
+    """
+    if bytes(memoryview(frames[0])[:len(MISSING_BLOBS)]) != MISSING_BLOBS:
+        return None
+    missing = json.loads(bytes(frames[0]).decode('utf-8'))['missing_blobs']
+    return [missing] if not isinstance(missing, list) else missing
+
+
+def frames_nbytes(frames):
+    """The number of bytes of a message, as sent over a socket"""
+    return sum(memoryview(frame).nbytes for frame in frames)
+
+
+def decode_message(frames):
+    """Deserialize a list of ZMQ frames produced by the server"""
+    buffers = [memoryview(f) for f in frames[1:]]
+    header = bytes(frames[0]).decode('utf-8')
+    return json.loads(header,
+                      object_hook=partial(decode_pymat, buffers=buffers))
+
+
+class ServerExitError(RuntimeError):
+    """The Matlab or Octave process exited while the session was using it"""
+
+
+def pump_output(stream, lines, log_path=None):
+    """Read the output of the server process until it exits
+
+    Keeps the most recent lines in `lines` (a bounded deque), and appends all
+    of them to the file at `log_path`, if given. Reading the output keeps the
+    server from blocking once the pipe buffer is full.
+    """
+    log = open(log_path, 'a') if log_path else None
+    try:
+        for line in iter(stream.readline, b''):
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            lines.append(line)
+            if log:
+                log.write(line + '\n')
+                log.flush()
+    finally:
+        stream.close()
+        if log:
+            log.close()
+
+class WorkspaceVariable(object):
+
+    def __init__(self, session, name):
+        """A variable of the Matlab workspace, fetched on demand
+
+        Index it like a numpy array to get part of the variable: indexing
+        happens in Matlab, and only the part asked for is sent. `info` tells
+        its class, size and number of bytes without sending it at all. Pass
+        it as an argument to run_func to use the variable without sending it.
+
+        Parameters
+        ----------
+        session: Matlab or Octave instance
+            The session whose workspace holds the variable
+        name: str
+            The name of the variable
+        """
+        self.session = session
+        self.name = name
+
+    def get(self):
+        """Fetch the value (a coroutine, with an asyncio session)"""
+        return self.session.get_variable(self.name)
+
+    def info(self):
+        """The `whos` entry of the variable, or None if it doesn't exist"""
+        info = self.session.whos(self.name)
+        return info[0] if info else None
+
+    def __getitem__(self, index):
+        return self.session.get_variable(self.name, index=index)
+
+    def __array__(self, dtype=None, copy=None):
+        return asarray(self.get(), dtype=dtype)
+
+    def __repr__(self):
+        return '<WorkspaceVariable %s>' % self.name
+
+
+class Workspace(object):
+
+    def __init__(self, session):
+        """The variables of a session's workspace, by name (see `_Session.var`)
+        """
+        self.session = session
+
+    def __getitem__(self, name):
+        return WorkspaceVariable(self.session, name)
+
+    def __contains__(self, name):
+        return any(info['name'] == name for info in self.session.whos(name))
+
+    def keys(self):
+        return [info['name'] for info in self.session.whos()]
+
+
+class MatlabRef(WorkspaceVariable):
+
+    def __init__(self, session, name, matlab_class=None, shape=None):
+        """A value kept in the Matlab workspace, rather than sent to Python
+
+        Calls made with ref=True return these instead of the values. Pass one
+        as an argument to run_func (or as the value of set_variable) to use
+        the value without sending it back and forth, and use `get` (or
+        numpy.asarray) to fetch it. The variable is cleared from the
+        workspace once the MatlabRef is garbage collected.
+
+        Parameters
+        ----------
+        session: Matlab or Octave instance
+            The session whose workspace holds the value
+        name: str
+            The name of the workspace variable
+        matlab_class: str, optional
+            The class of the value in Matlab, e.g. 'double'
+        shape: tuple, optional
+            The size of the value in Matlab
+        """
+        super(MatlabRef, self).__init__(session, name)
+        self.matlab_class = matlab_class
+        self.shape = shape
+        # A server started since then has its own variables by that name
+        self.generation = session._generation
+
+    def __repr__(self):
+        shape = 'x'.join(str(n) for n in self.shape or ())
+        return '<MatlabRef %s: %s %s>' % (self.name, shape, self.matlab_class)
+
+    def __del__(self):
+        self.session._release(self.name, self.generation)
+
+
+class SharedArray(WorkspaceVariable):
+
+    def __init__(self, session, name, array, path):
+        """A workspace variable and a numpy array backed by the same file
+
+        Made by `_Session.share`. Change `array` in place and call `sync`
+        for Matlab to see the changes; call `pull` to see the changes made
+        in Matlab in `array`. Pass the SharedArray itself as an argument to
+        run_func, so that nothing is sent.
+
+        Parameters
+        ----------
+        session: Matlab or Octave instance
+            The session whose workspace holds the variable
+        name: str
+            The name of the workspace variable
+        array: numpy.memmap
+            The array mapped from the file
+        path: str
+            The file
+        """
+        super(SharedArray, self).__init__(session, name)
+        self.array = array
+        self.path = path
+
+    def sync(self):
+        """Update the variable in Matlab with the contents of `array`
+
+        This happens right before the next request to the session runs, so
+        it costs no round trip of its own.
+        """
+        self.array.flush()
+        self.session._sync(self.name)
+
+    def pull(self):
+        """Update `array` with the value of the variable in Matlab
+
+        The variable must still have the class and number of elements of
+        the array.
+        """
+        resp = self.session.run_func('pymat_shared', 'store', self.name,
+                                     nargout=0, capture=False)
+        if not resp['success']:
+            raise ValueError(resp['content']['stdout'])
+
+    def close(self):
+        """Stop sharing the variable (it stays in the workspace)"""
+        self.session._unshare(self.name)
+
+    def __repr__(self):
+        return '<SharedArray %s: %s %s>' % (
+            self.name, 'x'.join(str(n) for n in self.array.shape),
+            self.array.dtype)
+
+
 MATLAB_FOLDER = '%s/matlab' % os.path.realpath(os.path.dirname(__file__))
+
+# Keyword arguments of run_func that are options of the server, rather than
+# arguments of the Matlab function
+SERVER_OPTIONS = ('figures', 'figure_format', 'figure_dpi', 'max_stdout',
+                  'ref')
+
+# How the server's reply to a request that refers to arrays it no longer
+# keeps starts (see missing_blobs)
+MISSING_BLOBS = b'{"missing_blobs":'
+
+# Commands whose requests are timed (see pymatbridge.stats)
+TIMED_COMMANDS = ('eval', 'call', 'get', 'set', 'whos', 'batch')
 MESSENGER_FOLDER = '%s/messenger/%s' % (os.path.realpath(os.path.dirname(__file__)), get_messenger_dir())
 
 
@@ -122,6 +598,51 @@ class _Session(object):
     this directly; rather, use the Matlab or Octave subclasses.
     """
 
+    # Number of lines of the server's output kept for server_output()
+    output_lines = 1000
+
+    # Seconds between checks that the server process is still running, while
+    # waiting for a response
+    exit_check_interval = 0.1
+
+    # Arrays bigger than this (in bytes) are sent in chunks of about this size
+    # by set_variable and get_variable
+    chunk_bytes = 32 * 2**20
+
+    # Arrays of at least this many bytes are handed over through files in
+    # /dev/shm rather than sent, when the server runs on the same Linux host
+    # (with ipc sockets) and speaks the binary protocol. None turns this off.
+    shared_bytes = 2**20
+
+    # Array arguments of at least this many bytes are kept by the server, by
+    # content, so that they are only sent again once they change. This pays
+    # off when the server is remote, as hashing an array takes longer than
+    # sending it to the same host. None (default) turns this off.
+    blob_bytes = None
+
+    # Bytes of arguments that the server keeps at most, dropping the least
+    # recently used ones
+    blob_budget = 64 * 2**20
+
+    # A directory in which to keep the help of functions, for their __doc__,
+    # across sessions (e.g. '~/.cache/pymatbridge/docs'). It holds pickles,
+    # so it should only be writable by you. None (default) keeps the help in
+    # memory only.
+    doc_cache_dir = None
+
+    # Whether to time requests, for stats()
+    record_stats = True
+
+    # Whether arrays of numpy's default integer type, such as
+    # np.array([1, 2]), are sent as double, as Matlab's own literals are.
+    # Many Matlab functions (svd, chol, ...) don't take integers. False sends
+    # them as int64; the other integer types always keep their class.
+    default_int_as_double = True
+
+    # Whether the server runs with a JVM. Without one, it needs the builtin
+    # jsonencode and jsondecode (MATLAB R2016b, Octave 7) to serialize.
+    jvm = True
+
     def __init__(self, executable, socket_addr=None,
                  id='python-matlab-bridge', log=False, maxtime=60,
                  platform=None, startup_options=None):
@@ -169,11 +690,42 @@ class _Session(object):
         if socket_addr is None:
             self.socket_addr = "tcp://127.0.0.1" if self.platform == "win32" else "ipc:///tmp/pymatbridge-%s"%str(uuid4())
 
-        if self.log:
-            startup_options += ' > ./pymatbridge/logs/bashlog_%s.txt' % self.id
-
         self.context = None
         self.socket = None
+        self.stream_socket = None
+        self.protocol = 'json'
+        self.streaming = False
+        self.server_timing = False
+        self.process = None
+        self.timeout = None
+        self._output = deque(maxlen=self.output_lines)
+        # Workspace variables of garbage collected MatlabRefs, which are
+        # cleared along with the next request, and the number of times the
+        # server was started, which MatlabRefs of an earlier one don't match
+        self._released = deque()
+        self._generation = 0
+        self.shared_dir = None
+        self._shared_request = None
+        self._shares = {}
+        self._synced = deque()
+        # Keys of the arguments that the server keeps (see blob_key), and
+        # the keys computed for the request being sent, by id() of the array
+        self._blobs = set()
+        self._blob_keys = {}
+        # Results of the calls made with cache=True
+        self.result_cache = ResultCache()
+        self._function_files = {}
+        self._server_version = None
+        # The functions on the path, and names found not to be functions
+        # (see _is_function)
+        self._functions = None
+        self._not_functions = set()
+        self._doc_cache = None
+        # Timings of requests (see stats), and the record of the latest
+        # request, until its reply is decoded
+        self.call_stats = CallStats()
+        self.stats_hook = None
+        self._record = None
         atexit.register(self.stop)
 
     def _program_name(self):  # pragma: no cover
@@ -188,6 +740,9 @@ class _Session(object):
                 "addpath('%s');" % MESSENGER_FOLDER,
                 "warning(old_warning_state);",
                 "clear('old_warning_state');",
+                # json.jar is added to the Java class path before the
+                # messenger starts, since that clears the state of mex files
+                "json_startup;" if self.jvm else "json_codec('native');",
                 "cd('%s');" % os.getcwd()]
 
     def _execute_flag(self):  # pragma: no cover
@@ -196,20 +751,108 @@ class _Session(object):
     def _run_server(self):
         code = self._preamble_code()
         code.extend([
-            "matlabserver('%s')" % self.socket_addr
+            "matlabserver('%s', '%s')" % (self.socket_addr,
+                                          self._stream_address())
         ])
         command = '%s %s %s "%s"' % (self.executable, self.startup_options,
                                      self._execute_flag(), ','.join(code))
-        subprocess.Popen(command, shell=True, stdin=subprocess.PIPE,
-                         stdout=subprocess.PIPE)
+        # The server gets a process group of its own, so that _discard can
+        # kill it along with the shell and launcher scripts around it
+        self.process = subprocess.Popen(command, shell=True,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        preexec_fn=getattr(os, 'setsid',
+                                                           None))
+
+        log_path = None
+        if self.log:
+            log_dir = os.path.join('.', 'pymatbridge', 'logs')
+            if not os.path.isdir(log_dir):
+                os.makedirs(log_dir)
+            log_path = os.path.join(log_dir, 'bashlog_%s.txt' % self.id)
+        self._output = deque(maxlen=self.output_lines)
+        pump = threading.Thread(target=pump_output,
+                                args=(self.process.stdout, self._output,
+                                      log_path))
+        pump.daemon = True
+        pump.start()
+
+    def _stream_address(self):
+        """Address of the socket that streams output, next to the main one"""
+        if self.socket_addr.startswith('ipc://'):
+            return self.socket_addr + '-stream'
+        host, port = self.socket_addr.rsplit(':', 1)
+        return '%s:%d' % (host, int(port) + 1)
+
+    def server_output(self, lines=None):
+        """The latest output of the server process (stdout and stderr)
+
+        Parameters
+        ----------
+        lines : int, optional
+            Number of lines to return, counting from the end. Default is all
+            the lines kept, which are the last `output_lines` ones.
+        """
+        output = list(self._output)
+        if lines is not None:
+            output = output[-lines:] if lines else []
+        return '\n'.join(output)
+
+    def _check_server(self):
+        """Raise ServerExitError if the server process is gone"""
+        if self.process is None or self.process.poll() is None:
+            return
+        # A REQ socket waiting for a reply that will never come is useless
+        self.socket.close(linger=0)
+        self.started = False
+        raise self._server_exit_error()
+
+    def _server_exit_error(self):
+        return ServerExitError("%s exited with code %s. Last output:\n%s"
+                               % (self._program_name(), self.process.returncode,
+                                  self.server_output(20)))
+
+    def _wait_readable(self, timeout=None):
+        """Wait until a reply is ready to be received
+
+        Returns False if `timeout` seconds passed first (None waits forever),
+        and raises ServerExitError as soon as the server process exits.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wait = self.exit_check_interval
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.time(), 0))
+            if self.socket.poll(1000 * wait):
+                return True
+            self._check_server()
+            if deadline is not None and time.time() >= deadline:
+                return False
 
     # Start server/client session and make the connection
-    def start(self):
+    def start(self, wait=True):
+        """Start the server and connect to it
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait until the server is ready (default). With
+            wait=False, return a SessionStartup handle right after launching
+            the server, so that the caller can do other work (or start other
+            sessions) while it boots.
+
+        Returns
+        -------
+        The session itself, or a SessionStartup handle if wait=False.
+        """
         # Setup socket
         self.context = zmq.Context()
         self.socket = self.context.socket(zmq.REQ)
+        self.stream_socket = self.context.socket(zmq.PULL)
         if self.platform == "win32":
-            rndport = random.randrange(49152, 65536)
+            # The stream socket takes the next port
+            rndport = random.randrange(49152, 65535)
             self.socket_addr = self.socket_addr + ":%s"%rndport
 
         # Start the MATLAB server in a new process
@@ -219,33 +862,279 @@ class _Session(object):
 
         # Start the client
         self.socket.connect(self.socket_addr)
+        self.stream_socket.connect(self._stream_address())
+        self._make_shared_dir()
+        self._function_files.clear()
+        self._server_version = None
+        self.refresh_functions()
+        # The names of the previous server mean nothing to this one
+        self._generation += 1
+        self._released.clear()
 
         self.started = True
 
-        # Test if connection is established
-        if self.is_connected():
+        # The connect request is answered as soon as the server is listening
+        self._send_connect()
+        startup = SessionStartup(self)
+        if wait:
+            return startup.result()
+        return startup
+
+    def _send_connect(self):
+        self.socket.send_string(json.dumps(dict(cmd="connect")))
+
+    def _recv_connected(self):
+        return bytes(self.socket.recv()) == b"connected"
+
+    def _finish_start(self, connected):
+        if connected:
             print("%s started and connected!" % self._program_name())
+            self._negotiate_protocol()
             self.set_plot_settings()
             return self
         else:
+            self._discard()
             raise ValueError("%s failed to start" % self._program_name())
 
+    def _discard(self):
+        """Drop a session whose socket can't be trusted anymore
+
+        Kills the server, if it still runs, and closes the sockets, whatever
+        they were waiting for.
+        """
+        if self.process is not None and self.process.poll() is None:
+            if hasattr(os, 'killpg'):
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    self.process.kill()
+            else:
+                self.process.kill()
+            self.process.wait()
+        if self.context is not None:
+            self.context.destroy(linger=0)
+        self._remove_shared_dir()
+        self.started = False
+        self.protocol = 'json'
+        self.streaming = False
+        self.server_timing = False
+
+    def _encode_request(self, request):
+        """Serialize a request, along with the variables to release"""
+        released = []
+        while self._released:
+            released.append(self._released.popleft())
+        if released:
+            request = dict(request, release=released)
+        synced = []
+        while self._synced:
+            name = self._synced.popleft()
+            if name not in synced:
+                synced.append(name)
+        if synced:
+            request = dict(request, sync=synced)
+
+        buffers = None
+        if self.shared_dir is not None and self.protocol == 'binary':
+            # The reply to the previous request was decoded by now, and
+            # arrays mapped from its files don't need them anymore
+            self._remove_shared_request()
+            self._shared_request = tempfile.mkdtemp(dir=self.shared_dir)
+            buffers = SharedBuffers(self._shared_request, self.shared_bytes)
+            # The results of a batch are decoded later, possibly after the
+            # next request, so they are sent as they are
+            if request.get('cmd') != 'batch':
+                request = dict(request, shared=dict(
+                    dir=self._shared_request, min_bytes=self.shared_bytes))
+        if (self.record_stats and self.server_timing
+                and request.get('cmd') in TIMED_COMMANDS):
+            request = dict(request, timing=True)
+
+        # Chunks of big arrays are sent once anyway
+        blobs = None
+        if self.blob_bytes is not None and 'range' not in request:
+            blobs = self._blobs
+        return encode_message(request, binary=self.protocol == 'binary',
+                              buffers=buffers, blobs=blobs,
+                              blob_bytes=self.blob_bytes,
+                              blob_keys=self._blob_keys,
+                              default_int_as_double=self.default_int_as_double)
+
+    def _make_shared_dir(self):
+        """Make a directory for the files of SharedBuffers, if it helps"""
+        if (self.shared_bytes is not None
+                and self.platform.startswith('linux')
+                and self.socket_addr.startswith('ipc://')
+                and os.access('/dev/shm', os.W_OK)):
+            self.shared_dir = tempfile.mkdtemp(prefix='pymatbridge-',
+                                               dir='/dev/shm')
+
+    def _remove_shared_request(self):
+        if self._shared_request is not None:
+            shutil.rmtree(self._shared_request, ignore_errors=True)
+            self._shared_request = None
+
+    def _remove_shared_dir(self):
+        for share in self._shares.values():
+            if os.path.exists(share.path):
+                os.remove(share.path)
+        self._shares.clear()
+        self._remove_shared_request()
+        if self.shared_dir is not None:
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
+            self.shared_dir = None
+
+    def _release(self, name, generation):
+        # Called from __del__, so this must not talk to the server (nor take
+        # a lock): deque.append is atomic
+        if generation == self._generation:
+            self._released.append(name)
+
+    def _make_refs(self, resp):
+        """Turn the result of a request made with ref=True into MatlabRefs"""
+        def make_ref(value):
+            if isinstance(value, list):
+                return [make_ref(item) for item in value]
+            shape = tuple(int(n) for n in asarray(value['size']).ravel())
+            return MatlabRef(self, value['matlabref'], value['class'], shape)
+        if resp['success']:
+            resp = dict(resp, result=make_ref(resp['result']))
+        return resp
+
     def _response(self, **kwargs):
-        req = json.dumps(kwargs, cls=PymatEncoder)
-        self.socket.send_string(req)
-        resp = self.socket.recv_string()
+        self._finish_record()
+        while True:
+            times = [time.time()]
+            frames = self._encode_request(kwargs)
+            times.append(time.time())
+            self.socket.send_multipart(frames, copy=False)
+            times.append(time.time())
+            if not self._wait_readable(self.timeout):
+                raise zmq.Again(zmq.EAGAIN)
+            times.append(time.time())
+            reply = self.socket.recv_multipart(copy=False)
+            times.append(time.time())
+            if not self._forget_blobs(reply):
+                return self._record_reply(kwargs, frames, reply, times)
+
+    def _record_reply(self, request, frames, reply, times):
+        """Start the record of a timed request (see pymatbridge.stats),
+        which is complete once its reply is decoded, and take the timings
+        of the server off the reply
+
+        `times` are those of the start of the request, and of the end of
+        each of its phases until the reply was received.
+        """
+        if (not self.record_stats
+                or request.get('cmd') not in TIMED_COMMANDS):
+            return reply
+        server = {}
+        if self.server_timing:
+            server = json.loads(bytes(reply[-1]).decode('utf-8'))
+            reply = reply[:-1]
+        self._record = dict(cmd=request['cmd'], decode=0.,
+                            bytes_out=frames_nbytes(frames),
+                            bytes_in=frames_nbytes(reply), server=server)
+        for phase, start, end in zip(('encode', 'send', 'wait', 'recv'),
+                                     times, times[1:]):
+            self._record[phase] = end - start
+        return reply
+
+    def _decode(self, frames):
+        """Decode a reply, and complete the record of its request"""
+        start = time.time()
+        resp = decode_message(frames)
+        if self._record is not None:
+            self._record['decode'] += time.time() - start
+            self._finish_record()
         return resp
 
+    def _finish_record(self):
+        record, self._record = self._record, None
+        if record is not None:
+            self.call_stats.add(record)
+            if self.stats_hook is not None:
+                self.stats_hook(record)
+
+    def stats(self, reset=False):
+        """Counts, bytes and timings of the requests so far, by command
+
+        The time of each request is split into phases, on the client
+        (encode, send, wait, recv and decode) and on the server (such as
+        eval or figures). See `pymatbridge.stats` for what they measure.
+        Set `stats_hook` to a callable to also get the record of each
+        request as it completes, e.g. to forward it to a metrics system.
+
+        Parameters
+        ----------
+        reset : bool, optional
+            Whether to start over afterwards.
+
+        Returns
+        -------
+        Dictionary by command (see `CallStats.summary`), e.g.
+        ``stats()['call']['times']['server_eval']['p99']``.
+        """
+        self._finish_record()
+        summary = self.call_stats.summary()
+        if reset:
+            self.call_stats.clear()
+        return summary
+
+    def _forget_blobs(self, frames):
+        """Whether the server asks for arguments again, which are then sent
+        in full with the request"""
+        missing = missing_blobs(frames)
+        if missing:
+            self._blobs.difference_update(missing)
+        return bool(missing)
+
+    def _negotiate_protocol(self):
+        """Agree with the server on how messages are serialized
+
+        The binary protocol needs a messenger mex file that knows about
+        multipart messages. Servers that can't handle it (or don't understand
+        the handshake at all) keep talking plain JSON.
+        """
+        self._blobs.clear()
+        frames = self._response(cmd='handshake', protocol='binary',
+                                stream=self.stream_socket is not None,
+                                blob_budget=self.blob_budget)
+        handshake = self._parse_handshake(frames)
+        self.protocol = handshake['protocol']
+        self.streaming = handshake['stream']
+        self.server_timing = handshake['timing']
+        return self.protocol
+
+    @staticmethod
+    def _parse_handshake(frames):
+        """The protocol, whether output can be streamed, and whether the
+        server times requests"""
+        try:
+            handshake = decode_message(frames)
+        except ValueError:
+            handshake = {}
+        return dict(protocol=handshake.get('protocol', 'json'),
+                    stream=bool(handshake.get('stream', False)),
+                    timing=bool(handshake.get('timing', False)))
+
     # Stop the Matlab server
     def stop(self):
         if not self.started:
+            self._remove_shared_dir()
             return True
 
         # Matlab should respond with "exit" if successful
-        if self._response(cmd='exit') == "exit":
+        if bytes(self._response(cmd='exit')[0]) == b"exit":
             print("%s closed" % self._program_name())
 
+        if self.stream_socket is not None:
+            self.stream_socket.close(linger=0)
+        self._remove_shared_dir()
         self.started = False
+        self.protocol = 'json'
+        self.streaming = False
+        self.server_timing = False
         return True
 
     # To test if the client can talk to the server
@@ -254,28 +1143,41 @@ class _Session(object):
             time.sleep(2)
             return False
 
-        req = json.dumps(dict(cmd="connect"), cls=PymatEncoder)
-        self.socket.send_string(req)
-
-        start_time = time.time()
-        while True:
-            try:
-                resp = self.socket.recv_string(flags=zmq.NOBLOCK)
-                return resp == "connected"
-            except zmq.ZMQError:
-                sys.stdout.write('.')
-                time.sleep(1)
-                if time.time() - start_time > self.maxtime:
-                    print("%s session timed out after %d seconds" % (self._program_name(), self.maxtime))
-                    return False
+        self._send_connect()
+        if self._wait_readable(self.maxtime):
+            return self._recv_connected()
+        print("%s session timed out after %d seconds" % (self._program_name(), self.maxtime))
+        return False
 
     def is_function_processor_working(self):
         result = self.run_func('%s/usrprog/test_sum.m' % MATLAB_FOLDER,
                 {'echo': '%s: Function processor is working!' % self._program_name()})
         return result['success']
 
+    def path_stats(self):
+        """How often the server had to rehash its path
+
+        Returns
+        -------
+        Dictionary with keys 'calls' (function calls that checked the path),
+        'rehashes' (calls that rehashed it) and 'dirs' (directories added to
+        the path).
+        """
+        return self.run_func('pymat_path', 'stats', capture=False)['result']
+
+    def blob_stats(self):
+        """How well the server's cache of big arguments works
+
+        Returns
+        -------
+        Dictionary with keys 'count' and 'bytes' (of the arguments kept),
+        'budget' (see `blob_budget`), 'hits' and 'misses' (arguments sent as
+        their key only, which the server had or not).
+        """
+        return self.run_func('pymat_blobs', 'stats', capture=False)['result']
+
     def _json_response(self, **kwargs):
-        return json.loads(self._response(**kwargs), object_hook=decode_pymat)
+        return self._decode(self._response(**kwargs))
 
     def run_func(self, func_path, *func_args, **kwargs):
         """Run a function in Matlab and return the result.
@@ -288,6 +1190,41 @@ class _Session(object):
             Function args to send to the function.
         nargout: int, optional
             Desired number of return arguments.
+        capture: bool, optional
+            Whether to capture stdout and figures (default). With
+            capture=False the call takes a lean path on the server that
+            skips stdout capture and figure export.
+        figures: bool, optional
+            Whether to return the figures created or changed by the call.
+            Defaults to the value of `capture`.
+        figure_format: str, optional
+            Format of the figures: 'png' (default), 'jpeg' or 'svg'.
+        figure_dpi: int, optional
+            Resolution of the figures, in dots per inch (default 150).
+        max_stdout: int, optional
+            Number of bytes of captured output to return at most. The start
+            of longer output is dropped, and content['stdout_dropped'] tells
+            how many bytes.
+        stream: callable, optional
+            Called with each record streamed by the server while the function
+            runs (see `iter_func`).
+        rehash: bool, optional
+            Whether to rehash the path before the call. By default, the path
+            is only rehashed when the m-file of the function changed since
+            the last call.
+        ref: bool, optional
+            Whether to keep the output in the Matlab workspace and return a
+            `MatlabRef` to it (a list of them if nargout > 1) as the result,
+            instead of its value.
+        cache: bool or ResultCache, optional
+            Whether the function is pure, so that its result can be kept in
+            `result_cache` (or in the ResultCache given), and returned from
+            there by the next call with the same arguments, until the m-file
+            of the function or the version of the server changes (changes to
+            m-files that only the server sees need a `refresh_functions`
+            call). Calls that
+            fail, or have MatlabRefs as arguments or ref=True, are not
+            cached.
         kwargs:
             Keyword arguments are passed to Matlab in the form [key, val] so
             that matlab.plot(x, y, '--', LineWidth=2) would be translated into
@@ -295,12 +1232,195 @@ class _Session(object):
 
         Returns
         -------
-        Result dictionary with keys: 'message', 'result', and 'success'
+        Result dictionary with keys: 'content', 'result', and 'success'.
+        content['figures'] is a list with the contents of the image file of
+        each figure, as arrays of uint8 (use `.tobytes()` to get the bytes).
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        stream = kwargs.pop('stream', None)
+        cache = kwargs.pop('cache', False)
+        if cache is True:
+            cache = self.result_cache
+        key = None
+        if cache:
+            key = self._cache_key(
+                self._func_request(func_path, *func_args, **kwargs))
+        if key is not None:
+            resp = cache.get(key)
+            if resp is not None:
+                return resp
+
+        if stream is not None:
+            for record in self.iter_func(func_path, *func_args, **kwargs):
+                if record['kind'] == 'result':
+                    resp = record['data']
+                    break
+                stream(record)
+        else:
+            resp = self._func_response(
+                self._func_request(func_path, *func_args, **kwargs))
+
+        if key is not None and resp['success']:
+            cache.put(key, resp)
+        return resp
+
+    def _cache_key(self, request):
+        """The key of the result of a function request in result_cache,
+        which changes along with the m-file of the function, or None if the
+        result can't be cached"""
+        if request.get('ref'):
+            return None
+        return self._request_key(request, self._version(),
+                                 self._function_mtime(request['dname'],
+                                                      request['func_name']))
+
+    def _request_key(self, request, version, function_mtime):
+        """The cache key of a function request, given the version of the
+        server and what _function_mtime returns for the function"""
+        request = dict(request, program=self._program_name(),
+                       version=version)
+        request.pop('rehash', None)
+        try:
+            text = json.dumps(request, cls=CacheKeyEncoder, sort_keys=True)
+        except ValueError:
+            return None
+        key = hashlib.sha1(text.encode('utf-8'))
+        key.update(repr(function_mtime).encode('utf-8'))
+        return key.hexdigest()
+
+    def _version(self):
+        """The version of the server program, looked up once per session"""
+        if self._server_version is None:
+            self._server_version = self.run_func('version',
+                                                 capture=False)['result']
+        return self._server_version
+
+    def _function_mtime(self, dname, func_name):
+        """The m-file that a function resolves to, and its modification
+        time (-1 for builtins)
+
+        The server looks the function up once, until `refresh_functions`.
+        The m-files that the client sees too are checked for changes every
+        time; for the others, and for functions that weren't found, the
+        answer of the server stands.
+        """
+        name = (dname, func_name)
+        if name not in self._function_files:
+            self._found_function(name, self.run_func(
+                'pymat_path', 'which', dname, func_name,
+                capture=False)['result'])
+        return self._checked_function_file(name)
+
+    def _found_function(self, name, info):
+        """Keep where the server found a function (see _function_mtime)"""
+        self._function_files[name] = (info['file'] or '', info['mtime'])
+
+    def _checked_function_file(self, name):
+        file, mtime = self._function_files[name]
+        if os.path.isfile(file):
+            return file, os.path.getmtime(file)
+        return file, mtime
+
+    def _func_response(self, request, frames=None):
+        """Decode the reply to a function request"""
+        if frames is None:
+            frames = self._response(**request)
+        resp = self._decode(frames)
+        return self._make_refs(resp) if request.get('ref') else resp
+
+    def iter_func(self, func_path, *func_args, **kwargs):
+        """Run a function in Matlab, streaming its output as it runs
+
+        Takes the same arguments as `run_func`. Yields dictionaries with keys
+        'kind' and 'data', where kind is:
+
+        'stdout'
+            data is a chunk of the captured output. Matlab sends new output
+            every half second. Octave, which has no timers, sends it all
+            when the function returns.
+        'progress'
+            data is the value passed to pymat_progress by the function.
+        'result'
+            data is the result dictionary of `run_func`. This is always the
+            last record.
+
+        If the server can't stream (its messenger predates streaming), only
+        the result is yielded.
         """
         if not self.started:
             raise ValueError('Session not started, use start()')
 
+        request = self._func_request(func_path, *func_args, **kwargs)
+        if not self.streaming:
+            yield dict(kind='result', data=self._func_response(request))
+            return
+
+        request['stream'] = stream_id = uuid4().hex
+        self._finish_record()
+        times = [time.time()]
+        frames = self._encode_request(request)
+        times.append(time.time())
+        self.socket.send_multipart(frames, copy=False)
+        times.append(time.time())
+
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(self.stream_socket, zmq.POLLIN)
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        reply = None
+        ended = False
+        try:
+            # The server sends an 'end' record before the reply, but the two
+            # sockets don't guarantee the order of arrival
+            while not ended:
+                events = dict(poller.poll(1000 * self.exit_check_interval))
+                if self.stream_socket in events:
+                    record = decode_message(
+                        self.stream_socket.recv_multipart(copy=False))
+                    if record.get('id') != stream_id:
+                        continue
+                    ended = record['kind'] == 'end'
+                    if not ended:
+                        yield dict(kind=record['kind'], data=record['data'])
+                if self.socket in events:
+                    times.append(time.time())
+                    reply_frames = self.socket.recv_multipart(copy=False)
+                    times.append(time.time())
+                    if self._forget_blobs(reply_frames):
+                        # The function didn't run
+                        times = [time.time()]
+                        frames = self._encode_request(request)
+                        times.append(time.time())
+                        self.socket.send_multipart(frames, copy=False)
+                        times.append(time.time())
+                        continue
+                    reply = self._func_response(request, self._record_reply(
+                        request, frames, reply_frames, times))
+                    # Don't wait long for an 'end' record that was dropped
+                    deadline = time.time() + 1
+                if not events and reply is None:
+                    self._check_server()
+                if deadline is not None and time.time() > deadline:
+                    if reply is None:
+                        raise zmq.Again(zmq.EAGAIN)
+                    break
+        except GeneratorExit:
+            # Leave the socket ready for the next request when the caller
+            # stops iterating early
+            if reply is None and self._wait_readable(self.timeout):
+                self.socket.recv_multipart(copy=False)
+            raise
+        yield dict(kind='result', data=reply)
+
+    def _func_request(self, func_path, *func_args, **kwargs):
+        """Build the request that run_func sends to the server"""
         nargout = kwargs.pop('nargout', 1)
+        capture = kwargs.pop('capture', True)
+        rehash = kwargs.pop('rehash', False)
+        options = dict((name, kwargs.pop(name)) for name in SERVER_OPTIONS
+                       if name in kwargs)
         func_args += tuple(item for pair in zip(kwargs.keys(), kwargs.values())
                            for item in pair)
         dname = os.path.dirname(func_path)
@@ -308,32 +1428,386 @@ class _Session(object):
         func_name, ext = os.path.splitext(fname)
         if ext and not ext == '.m':
             raise TypeError('Need to give path to .m file')
-        return self._json_response(cmd='eval',
-                                   func_name=func_name,
-                                   func_args=func_args or '',
-                                   dname=dname,
-                                   nargout=nargout)
-
-    def run_code(self, code):
+        return dict(cmd='eval' if capture else 'call',
+                    func_name=func_name,
+                    func_args=func_args or '',
+                    dname=dname,
+                    nargout=nargout,
+                    rehash=rehash,
+                    **options)
+
+    def run_code(self, code, **kwargs):
         """Run some code in Matlab command line provide by a string
 
         Parameters
         ----------
         code : str
             Code to send for evaluation.
+        kwargs:
+            Options of run_func, such as `figures` or `figure_format`.
         """
-        return self.run_func('evalin', 'base', code, nargout=0)
+        return self.run_func('evalin', 'base', code, nargout=0, **kwargs)
 
-    def get_variable(self, varname, default=None):
-        resp = self.run_func('evalin', 'base', varname)
-        return resp['result'] if resp['success'] else default
+    def get_variable(self, varname, default=None, ref=False, index=None,
+                     progress=None):
+        """Get the value of a variable in the Matlab workspace
+
+        Parameters
+        ----------
+        varname : str
+            Name of the variable (or an expression) to evaluate in the base
+            workspace.
+        default : object, optional
+            Returned if the variable can't be evaluated (or indexed).
+        ref : bool, optional
+            Whether to return a `MatlabRef` to a copy of the value, kept in
+            the workspace, instead of the value.
+        index : int, slice, sequence of ints or tuple of them, optional
+            Get only this part of the value, indexed (0-based) as if it were
+            a numpy array. The indexing happens in Matlab, so that only the
+            part asked for is sent. ``session.var[varname][index]`` is a
+            shorthand.
+        progress : callable, optional
+            Called with the number of bytes received so far and the total,
+            after each chunk of an array bigger than `chunk_bytes`.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        request, result = self._get_request(varname, ref, index,
+                                            self.chunk_bytes)
+        resp = self._json_response(**request)
+        if self._is_chunked(resp):
+            resp = dict(resp, result=self._get_chunked(resp['result'],
+                                                       progress))
+        return result(resp, default)
+
+    def iter_variable(self, varname, chunk_bytes=None, progress=None):
+        """Get a variable in chunks, to process them as they arrive
+
+        Numeric and logical arrays are split along their last dimension (the
+        columns of a matrix) into chunks of about `chunk_bytes` bytes (default
+        `chunk_bytes` of the session), which are yielded as arrays with the
+        same number of dimensions. Other values are yielded whole. `progress`
+        is called as in `get_variable`.
+
+        Raises ValueError if the variable can't be evaluated.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        request, result = self._get_request(varname, chunk_bytes=0)
+        resp = self._json_response(**request)
+        if not resp['success']:
+            raise ValueError(resp['content']['stdout'])
+        if not self._is_chunked(resp):
+            yield result(resp)
+            return
+        for chunk in self._iter_chunks(resp['result'], chunk_bytes, progress):
+            yield chunk
+
+    @staticmethod
+    def _is_chunked(resp):
+        return (resp['success'] and isinstance(resp['result'], dict)
+                and bool(resp['result'].get('chunked', False)))
+
+    def _get_chunked(self, info, progress=None):
+        """Assemble the array that pymat_get kept aside"""
+        shape = tuple(int(n) for n in asarray(info['size']).ravel())
+        value = empty(shape, matlab_dtype(info['class'], info['complex']),
+                      order='F')
+        start = 0
+        for chunk in self._iter_chunks(info, progress=progress):
+            value[..., start:start + chunk.shape[-1]] = chunk
+            start += chunk.shape[-1]
+        return value
+
+    def _iter_chunks(self, info, chunk_bytes=None, progress=None):
+        """Get the array that pymat_get kept aside, a chunk at a time"""
+        ref = self._make_refs(dict(success=True, result=info))['result']
+        dtype = matlab_dtype(info['class'], info['complex'])
+        shape = ref.shape
+        # The elements of a chunk along the last dimension are contiguous
+        # in Matlab, which indexes them with a linear range
+        step = int(prod(shape[:-1]))
+        per_chunk = max(1, (chunk_bytes or self.chunk_bytes)
+                        // max(step * dtype.itemsize, 1))
+        total = step * shape[-1] * dtype.itemsize
+        for start in range(0, shape[-1], per_chunk):
+            stop = min(start + per_chunk, shape[-1])
+            resp = self._json_response(cmd='get', varname=ref.name,
+                                       range=[start * step, stop * step])
+            if not resp['success']:
+                raise ValueError(resp['content']['stdout'])
+            chunk = asarray(resp['result'], dtype)
+            if progress is not None:
+                progress(stop * step * dtype.itemsize, total)
+            yield chunk.reshape(shape[:-1] + (stop - start,), order='F')
+
+    def _get_request(self, varname, ref=False, index=None, chunk_bytes=None):
+        """The request of get_variable, and a function that turns its
+        response (and the default) into the value to return
+        """
+        request = dict(cmd='get', varname=varname)
+        dropped = []
+        if index is not None:
+            request['index'], dropped = matlab_index(index)
+        if ref:
+            request['ref'] = True
+        elif chunk_bytes is not None:
+            # Bigger arrays are kept aside, to be sent in chunks
+            request['chunk_bytes'] = chunk_bytes
+
+        def result(resp, default=None):
+            if not resp['success']:
+                return default
+            if ref:
+                return self._make_refs(resp)['result']
+            return drop_dims(resp['result'], dropped)
+        return request, result
+
+    def whos(self, varname=None):
+        """Describe variables of the Matlab workspace, without getting them
+
+        Parameters
+        ----------
+        varname : str, optional
+            Name of a variable, or a pattern with * wildcards. Default is all
+            the variables.
+
+        Returns
+        -------
+        A list with a dictionary for each variable, with keys 'name',
+        'class', 'size' (a tuple), 'bytes', 'complex' and 'sparse'.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        return self._whos_result(self._json_response(cmd='whos',
+                                                     varname=varname or ''))
+
+    @staticmethod
+    def _whos_result(resp):
+        if not resp['success']:
+            raise ValueError(resp['content']['stdout'])
+        info = resp['result']
+        # A single variable comes as a struct, none as an empty cell
+        if isinstance(info, dict):
+            info = [info]
+        elif not isinstance(info, list):
+            info = []
+        for item in info:
+            item['size'] = tuple(int(n) for n in asarray(item['size']).ravel())
+        return info
+
+    @property
+    def var(self):
+        """The workspace variables, by name: ``session.var['X'][:10, 0]``"""
+        return Workspace(self)
+
+    def set_variable(self, varname, value, progress=None):
+        """Assign a value to a variable in the Matlab workspace
+
+        Parameters
+        ----------
+        varname : str
+            Name of the variable.
+        value : object
+            Value to assign to it. Scipy sparse matrices become Matlab sparse
+            matrices, and a MatlabRef is copied within the workspace. Arrays
+            bigger than `chunk_bytes` are sent in chunks, which Matlab copies
+            into a preallocated array. With `blob_bytes` set, arrays of at
+            least that size are not sent again while the server keeps them
+            (see `blob_stats`).
+        progress : callable, optional
+            Called with the number of bytes sent so far and the total, after
+            each chunk of an array bigger than `chunk_bytes`.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
 
-    def set_variable(self, varname, value):
         if isinstance(value, spmatrix):
             return self._set_sparse_variable(varname, value)
-        return self.run_func('assignin', 'base', varname, value, nargout=0)
+        if (isinstance(value, ndarray) and value.dtype.kind in 'biufc'
+                and value.nbytes > self.chunk_bytes):
+            key = None if self.blob_bytes is None else blob_key(value)
+            if key not in self._blobs:
+                return self._set_chunked_variable(varname, value, progress,
+                                                  key)
+            # Sent as its key, without hashing it again
+            self._blob_keys[id(value)] = key
+            try:
+                return self._json_response(cmd='set', varname=varname,
+                                           value=value)
+            finally:
+                self._blob_keys.clear()
+        return self._json_response(cmd='set', varname=varname, value=value)
+
+    def _set_chunked_variable(self, varname, value, progress=None, key=None):
+        if value.ndim == 1:
+            # Like encode_ndarray does
+            value = value.reshape(1, -1)
+        if self.default_int_as_double and value.dtype == DEFAULT_INT:
+            # The chunks are sent as double, see PymatEncoder
+            value = value.astype(float64)
+        shape = value.shape
+        is_complex = value.dtype.kind == 'c'
+        dtype = wire_dtype(value.real.dtype if is_complex else value.dtype)
+        resp = self._json_response(cmd='set', varname=varname,
+                                   shape=list(shape), dtype=dtype.name,
+                                   complex=is_complex)
+        # Fill the array along its last dimension (see _iter_chunks)
+        step = int(prod(shape[:-1]))
+        per_chunk = max(1, self.chunk_bytes // max(step * value.itemsize, 1))
+        for start in range(0, shape[-1], per_chunk):
+            if not resp['success']:
+                break
+            stop = min(start + per_chunk, shape[-1])
+            resp = self._json_response(cmd='set', varname=varname,
+                                       value=value[..., start:stop],
+                                       range=[start * step, stop * step])
+            if progress is not None:
+                progress(stop * step * value.itemsize, value.nbytes)
+        if key is not None and resp['success']:
+            # Keep it as if it had been sent in one piece
+            kept = self.run_func('pymat_blobs', 'put', key, self.var[varname],
+                                 nargout=0, capture=False)
+            if kept['success']:
+                self._blobs.add(key)
+        return resp
+
+    def share(self, name, array):
+        """Hand an array over to Matlab through a file rather than the socket
+
+        The workspace variable `name` and the `array` of the returned
+        `SharedArray` start as a copy of `array`, and are then kept in step
+        explicitly: change the array in place and call `sync`, which reloads
+        the variable from the file along with the next request, without
+        encoding or sending anything. `array` maps the file, but Matlab can't
+        map memory into a variable, so each sync reads the whole file into
+        the variable, and each `pull` writes it back. Use the SharedArray as an argument of run_func to
+        refer to the variable::
+
+            buf = mlab.share('u', np.zeros((1000, 8)))
+            for k in range(50000):
+                buf.array[:] = read_sensors()
+                buf.sync()
+                res = mlab.run_func('controller', buf)
+
+        The file is in /dev/shm if possible (see `shared_bytes`), so the
+        server must run on the same host.
+
+        Parameters
+        ----------
+        name : str
+            Name of the workspace variable.
+        array : array_like
+            Initial value, of booleans, integers or floats (not float16).
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        array = asarray(array)
+        if (array.dtype.kind not in 'biuf'
+                or wire_dtype(array.dtype).itemsize != array.dtype.itemsize):
+            raise TypeError('Arrays of %s cannot be shared' % array.dtype)
+        if array.ndim == 0:
+            array = array.reshape(1)
+        if name in self._shares:
+            self._unshare(name)
+
+        fd, path = tempfile.mkstemp(prefix='share-', dir=self.shared_dir)
+        os.close(fd)
+        # In Fortran order, the file has the layout of the Matlab array
+        mapped = memmap(path, wire_dtype(array.dtype), mode='w+',
+                        shape=array.shape, order='F')
+        mapped[...] = array
+        mapped.flush()
+        shape = array.shape if array.ndim > 1 else (1,) + array.shape
+        resp = self.run_func('pymat_shared', 'attach', name, path,
+                             wire_dtype(array.dtype).name, list(shape),
+                             nargout=0, capture=False)
+        if not resp['success']:
+            os.remove(path)
+            raise ValueError(resp['content']['stdout'])
+        self._shares[name] = SharedArray(self, name, mapped, path)
+        return self._shares[name]
+
+    def _sync(self, name):
+        self._synced.append(name)
+
+    def _unshare(self, name):
+        share = self._shares.pop(name)
+        self.run_func('pymat_shared', 'detach', name, nargout=0,
+                      capture=False)
+        os.remove(share.path)
+
+    def batch(self):
+        """Collect several operations and run them in a single round trip
+
+        Returns a `Batch`, which is best used as a context manager::
+
+            with mlab.batch() as b:
+                b.set_variable('x', x)
+                b.run_code('y = x * 2;')
+                y = b.get_variable('y')
+            print(y.get())
+
+        The operations run in order when the block exits, stopping at the
+        first one that fails.
+        """
+        return Batch(self)
+
+    def run_batch(self, ops):
+        """Run a list of operations in a single round trip
+
+        Parameters
+        ----------
+        ops : list of tuples
+            Each operation is a tuple of the name of a session method
+            (run_func, run_code, get_variable or set_variable) followed by
+            its arguments, e.g. ``('set_variable', 'x', 1)``.
+
+        Returns
+        -------
+        A list with a `BatchResult` for each operation.
+        """
+        batch = Batch(self)
+        results = [getattr(batch, op[0])(*op[1:]) for op in ops]
+        batch.execute()
+        return results
+
+    def _batch_response(self, ops):
+        """Send a batch of requests and split the reply into raw results
+
+        Returns the batch header and, for each request that was run, the
+        frames that make up its response. These are only decoded when read.
+        """
+        if not self.started:
+            raise ValueError('Session not started, use start()')
+
+        return self._split_batch(self._response(cmd='batch', ops=ops))
+
+    def _split_batch(self, frames):
+        header = json.loads(bytes(frames[0]).decode('utf-8'))
+        results = header['results'] or []
+        if results and self.protocol == 'binary':
+            # With the binary protocol, each result is a JSON frame followed
+            # by its buffers; the header has the index and count of those.
+            layout = decode_pymat(results).reshape(-1, 2).astype(int)
+            results = [frames[start:start + 1 + nbuffers]
+                       for start, nbuffers in layout]
+        else:
+            results = [[r.encode('utf-8')] for r in results]
+        return header, results
 
     def set_plot_settings(self, width=512, height=384, inline=True):
+        self.run_func('evalin', 'base',
+                      self._plot_settings_code(width, height, inline),
+                      nargout=0, capture=False)
+
+    @staticmethod
+    def _plot_settings_code(width, height, inline):
         if inline:
             code = ["set(0, 'defaultfigurevisible', 'off')"]
         else:
@@ -342,7 +1816,7 @@ class _Session(object):
         code += ["set(0, 'defaultfigurepaperunits', 'inches')",
                  "set(0, 'defaultfigureunits', 'inches')",
                  size % (int(width) / 150., int(height) / 150.)]
-        self.run_code(';'.join(code))
+        return ';'.join(code)
 
     def _set_sparse_variable(self, varname, value):
         value = value.todok()
@@ -360,6 +1834,67 @@ class _Session(object):
         """If an attribute is not found, try to create a bound method"""
         return self._bind_method(name)
 
+    def __dir__(self):
+        """The attributes, along with the functions on the path"""
+        names = set(dir(type(self))) | set(self.__dict__)
+        if self.started:
+            names.update(self._function_index())
+        return sorted(names)
+
+    def refresh_functions(self):
+        """Forget the functions on the path listed so far, the names found
+        not to be functions, and the m-files that functions resolve to, e.g.
+        after changing the path or m-files that only the server sees"""
+        self._functions = None
+        self._not_functions.clear()
+        self._function_files.clear()
+
+    def _function_index(self):
+        """The names of the functions on the path, listed by the server in
+        one go the first time"""
+        if self._functions is None:
+            resp = self.run_func('pymat_functions', capture=False)
+            names = resp['result'] if resp['success'] else []
+            if not isinstance(names, list):
+                names = [names]
+            self._functions = frozenset(names)
+        return self._functions
+
+    def _is_function(self, name):
+        """Whether Matlab can call a function of this name
+
+        Names that aren't in the index of the functions on the path (which
+        misses functions created since) are looked up by the server, once.
+        """
+        if name in self._not_functions:
+            return False
+        if name in self._function_index():
+            return True
+        resp = self.run_func('pymat_functions', name, capture=False)
+        exists = resp['success'] and bool(resp['result'])
+        if not exists:
+            self._not_functions.add(name)
+        return exists
+
+    def _function_doc(self, name):
+        """The help of a function, kept in memory, and in doc_cache_dir"""
+        if self._doc_cache is None:
+            try:
+                self._doc_cache = ResultCache(directory=self.doc_cache_dir)
+            except OSError:
+                self._doc_cache = ResultCache()
+        request = self._func_request('help', name)
+        # The help changes along with the m-file of the function
+        key = self._cache_key(dict(request,
+                                   source=self._function_mtime('', name)))
+        doc = self._doc_cache.get(key)
+        if doc is None:
+            resp = self._func_response(request)
+            doc = resp['result']
+            if resp['success']:
+                self._doc_cache.put(key, doc)
+        return doc
+
     def _bind_method(self, name, unconditionally=False):
         """Generate a Matlab function and bind it to the instance
 
@@ -372,7 +1907,7 @@ class _Session(object):
         routes (__getattribute__, __dict__, class tree).
 
         bind_method first checks whether the requested name is a callable
-        Matlab function before generating a binding.
+        Matlab function (see `_is_function`) before generating a binding.
 
         Parameters
         ----------
@@ -396,9 +1931,7 @@ class _Session(object):
                 Matlab function
 
         """
-        # TODO: This does not work if the function is a mex function inside a folder of the same name
-        exists = self.run_func('exist', name)['result'] in [2, 3, 5]
-        if not unconditionally and not exists:
+        if not unconditionally and not self._is_function(name):
             raise AttributeError("'Matlab' object has no attribute '%s'" % name)
 
         # create a new method instance
@@ -415,10 +1948,217 @@ class _Session(object):
         return getattr(self, name)
 
 
+class SessionStartup(object):
+    """
+    Handle on a session whose server is booting, returned by
+    `start(wait=False)`.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.deadline = time.time() + session.maxtime
+        self._connected = None
+
+    def done(self):
+        """Whether the server answered, or the session timed out"""
+        return self._poll(0)
+
+    def result(self, timeout=None):
+        """Wait for the server and return the connected session
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait. Default is to wait until the session's `maxtime`
+            since the start has passed.
+
+        Returns
+        -------
+        The session, or None if it is still starting after `timeout`. Raises
+        ValueError if the server didn't answer within `maxtime`, and
+        ServerExitError if its process exited.
+        """
+        if not self._poll(timeout):
+            return None
+        return self.session._finish_start(self._connected)
+
+    def _poll(self, timeout=None):
+        if self._connected is None:
+            remaining = max(self.deadline - time.time(), 0)
+            wait = remaining if timeout is None else min(remaining, timeout)
+            if self.session._wait_readable(wait):
+                self._connected = self.session._recv_connected()
+            elif wait == remaining:
+                print("%s session timed out after %d seconds" % (self.session._program_name(), self.session.maxtime))
+                self._connected = False
+        return self._connected is not None
+
+
+def start_sessions(sessions):
+    """Start several sessions at once
+
+    The servers all boot at the same time, so that starting many sessions
+    takes about as long as starting one.
+
+    Parameters
+    ----------
+    sessions : list
+        Matlab or Octave sessions, not started yet.
+
+    Returns
+    -------
+    The list of sessions, all connected. If any of them fails to start, the
+    connected ones are stopped, the servers of the others are killed, and
+    ValueError is raised (ServerExitError if its process exited).
+    """
+    startups = [session.start(wait=False) for session in sessions]
+    pending = dict((startup.session.socket, startup) for startup in startups)
+    poller = zmq.Poller()
+    for socket in pending:
+        poller.register(socket, zmq.POLLIN)
+
+    deadline = max(startup.deadline for startup in startups)
+    interval = min(s.exit_check_interval for s in sessions)
+    try:
+        while pending and time.time() < deadline:
+            wait = min(interval, max(deadline - time.time(), 0))
+            for socket, _ in poller.poll(1000 * wait):
+                pending.pop(socket)._poll(0)
+            for startup in pending.values():
+                startup.session._check_server()
+        return [startup.result() for startup in startups]
+    except (ValueError, ServerExitError):
+        for startup in startups:
+            if startup._connected:
+                startup.session.stop()
+            else:
+                startup.session._discard()
+        raise
+
+
+class BatchResult(object):
+
+    def __init__(self, transform=None):
+        """The eventual response to an operation in a `Batch`
+
+        Parameters
+        ----------
+        transform: callable, optional
+            Turns the response dictionary into the value that `get` returns
+        """
+        self._transform = transform
+        self._frames = None
+        self._response = None
+        self._value = None
+        self.executed = False
+
+    def _set_frames(self, frames):
+        self._frames = frames
+        self.executed = True
+
+    @property
+    def response(self):
+        """The response dictionary of the operation, decoded on first access"""
+        if not self.executed:
+            raise RuntimeError('Operation was not executed, either because '
+                               'the batch has not run yet, or because an '
+                               'earlier operation failed')
+        if self._response is None:
+            self._response = decode_message(self._frames)
+            self._frames = None
+        return self._response
+
+    def get(self):
+        """What the equivalent session method would have returned"""
+        if self._transform is None:
+            return self.response
+        if self._value is None:
+            # Transform once, so that a MatlabRef isn't made twice
+            self._value = (self._transform(self.response),)
+        return self._value[0]
+
+
+class Batch(object):
+
+    def __init__(self, session):
+        """A list of operations to run in a single round trip
+
+        The methods mirror those of the session, but instead of running
+        right away they return a `BatchResult` that is filled in when the
+        batch executes.
+
+        Parameters
+        ----------
+        session: Matlab or Octave instance
+            The session to run the operations in
+        """
+        self.session = session
+        self.ops = []
+        self.results = []
+        self.success = None
+        self.failed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def _add(self, request, transform=None):
+        result = BatchResult(transform)
+        self.ops.append(request)
+        self.results.append(result)
+        return result
+
+    def run_func(self, func_path, *func_args, **kwargs):
+        request = self.session._func_request(func_path, *func_args, **kwargs)
+        transform = self.session._make_refs if request.get('ref') else None
+        return self._add(request, transform)
+
+    def run_code(self, code):
+        return self.run_func('evalin', 'base', code, nargout=0)
+
+    def get_variable(self, varname, default=None, ref=False, index=None):
+        request, result = self.session._get_request(varname, ref, index)
+        return self._add(request, partial(result, default=default))
+
+    def set_variable(self, varname, value):
+        if isinstance(value, spmatrix):
+            raise TypeError('Sparse matrices are not supported in a batch')
+        return self._add(dict(cmd='set', varname=varname, value=value))
+
+    def execute(self):
+        """Run the operations collected so far
+
+        Returns
+        -------
+        Whether all operations succeeded. If not, `failed` is the index of
+        the operation that failed; the operations after it were not run.
+        """
+        ops, results = self._take()
+        if not ops:
+            return self._finish(dict(success=True, failed=-1), [], [])
+        header, frames = self.session._batch_response(ops)
+        return self._finish(header, frames, results)
+
+    def _take(self):
+        ops, results = self.ops, self.results
+        self.ops, self.results = [], []
+        return ops, results
+
+    def _finish(self, header, frames, results):
+        for result, result_frames in zip(results, frames):
+            result._set_frames(result_frames)
+        self.success = header['success']
+        self.failed = None if header['failed'] < 0 else int(header['failed'])
+        return self.success
+
+
 class Matlab(_Session):
     def __init__(self, executable='matlab', socket_addr=None,
                  id='python-matlab-bridge', log=False, maxtime=60,
-                 platform=None, startup_options=None):
+                 platform=None, startup_options=None, jvm=True):
         """
         Initialize this thing.
 
@@ -450,6 +2190,12 @@ class Matlab(_Session):
         startup_options : string
            Command line options to pass to MATLAB. Optional; sensible defaults
            are used if this is not provided.
+
+        jvm : bool
+           Whether to start MATLAB with its JVM. With jvm=False, MATLAB runs
+           with -nojvm, which should start faster and take less memory (see
+           benchmarks/bench_startup.py), but needs R2016b or later, and
+           can't make figures.
         """
         if platform is None:
             platform = sys.platform
@@ -458,10 +2204,13 @@ class Matlab(_Session):
                 startup_options = ' -automation -nosplash'
             else:
                 startup_options = ' -nodesktop -nosplash'
+        if not jvm:
+            startup_options += ' -nojvm'
         if log:
             startup_options += ' -logfile ./pymatbridge/logs/matlablog_%s.txt' % id
         super(Matlab, self).__init__(executable, socket_addr, id, log, maxtime,
                                      platform, startup_options)
+        self.jvm = jvm
 
     def _program_name(self):
         return 'MATLAB'
@@ -473,7 +2222,7 @@ class Matlab(_Session):
 class Octave(_Session):
     def __init__(self, executable='octave', socket_addr=None,
                  id='python-matlab-bridge', log=False, maxtime=60,
-                 platform=None, startup_options=None):
+                 platform=None, startup_options=None, jvm=True):
         """
         Initialize this thing.
 
@@ -505,11 +2254,17 @@ class Octave(_Session):
         startup_options : string
            Command line options to pass to Octave. Optional; sensible defaults
            are used if this is not provided.
+
+        jvm : bool
+           Whether the server may start Octave's JVM. Octave only starts it
+           when Java is first used, so with jvm=False it never does, but the
+           server then needs Octave 7 or later.
         """
         if startup_options is None:
             startup_options = '--silent --no-gui'
         super(Octave, self).__init__(executable, socket_addr, id, log, maxtime,
                                      platform, startup_options)
+        self.jvm = jvm
 
     def _program_name(self):
         return 'Octave'
@@ -572,10 +2327,11 @@ class MatlabFunction(object):
         """Fetch the docstring from Matlab
 
         Get the documentation for a Matlab function by calling Matlab's builtin
-        help() then returning it as the Python docstring. The result is cached
-        so Matlab is only ever polled on the first request
+        help() then returning it as the Python docstring. The result is cached,
+        on disk too if `_Session.doc_cache_dir` is set, so Matlab is only
+        polled once per version of the function
 
         """
         if self.doc is None:
-            self.doc = self.parent.help(self.name)['result']
+            self.doc = self.parent._function_doc(self.name)
         return self.doc
@@ -0,0 +1,100 @@
+"""
+pymatbridge.stats
+=================
+
+Timings of the requests of a session, which `_Session.stats` summarizes.
+
+Each request makes a record, a dictionary with keys:
+
+cmd
+    The command of the request ('eval', 'call', 'get', 'set', 'whos' or
+    'batch').
+encode, send, wait, recv, decode
+    Seconds spent by the client serializing the request, sending it, waiting
+    for the reply, receiving it and deserializing it.
+bytes_out, bytes_in
+    Bytes of the request and of the reply, as sent over the socket.
+server
+    Seconds spent by the server in each phase of the request (see
+    pymat_timing): 'decode', 'request' (which includes 'path', 'eval',
+    'figures' and 'stdout' for function calls), 'encode' and 'total', along
+    with 'cpu' (CPU seconds) and 'memory' (resident bytes, -1 where
+    unknown). Empty unless the binary protocol is used.
+
+"""
+
+from collections import deque
+
+from numpy import percentile
+
+__all__ = ['CallStats']
+
+# The phases of a request on the client
+PHASES = ('encode', 'send', 'wait', 'recv', 'decode')
+
+
+class CallStats(object):
+
+    def __init__(self, max_samples=1000):
+        """
+        Counts, bytes and timings of requests, by command.
+
+        Parameters
+        ----------
+
+        max_samples : int
+            Number of latest timings kept per command and phase, from which
+            percentiles are computed.
+        """
+        self.max_samples = max_samples
+        self._commands = {}
+
+    def add(self, record):
+        """Account for a request"""
+        stats = self._commands.get(record['cmd'])
+        if stats is None:
+            stats = self._commands[record['cmd']] = dict(
+                count=0, bytes_out=0, bytes_in=0, memory=-1, samples={})
+        stats['count'] += 1
+        stats['bytes_out'] += record['bytes_out']
+        stats['bytes_in'] += record['bytes_in']
+
+        timings = dict((phase, record[phase]) for phase in PHASES)
+        timings['total'] = sum(timings.values())
+        server = dict(record['server'])
+        if 'memory' in server:
+            stats['memory'] = server.pop('memory')
+        for phase, seconds in server.items():
+            timings['server_' + phase] = seconds
+        for phase, seconds in timings.items():
+            samples = stats['samples'].get(phase)
+            if samples is None:
+                samples = stats['samples'][phase] = deque(
+                    maxlen=self.max_samples)
+            samples.append(seconds)
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """The statistics of each command
+
+        Returns
+        -------
+        Dictionary of dictionaries by command, with keys 'count', 'bytes_out',
+        'bytes_in', 'memory' (the latest resident memory of the server) and
+        'times', a dictionary with the percentiles of the seconds spent in
+        each phase, e.g. times['wait']['p90']. Server phases start with
+        'server_', and 'total' is the sum of the client phases.
+        """
+        summary = {}
+        for cmd, stats in self._commands.items():
+            times = {}
+            for phase, samples in stats['samples'].items():
+                times[phase] = dict(('p%g' % p, float(percentile(samples, p)))
+                                    for p in percentiles)
+            summary[cmd] = dict(count=stats['count'],
+                                bytes_out=stats['bytes_out'],
+                                bytes_in=stats['bytes_in'],
+                                memory=stats['memory'], times=times)
+        return summary
+
+    def clear(self):
+        self._commands.clear()
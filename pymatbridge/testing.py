@@ -0,0 +1,501 @@
+"""
+pymatbridge.testing
+===================
+
+A fake Matlab server, in Python, for testing and load testing code that uses
+the bridge where Matlab isn't available, and for measuring the overhead of
+the bridge alone.
+
+The server speaks the protocol of matlabserver.m (connect, handshake, eval,
+call, get, set, whos, batch and exit, with the binary protocol), and replies
+the way pymat_eval does. Shared arrays (see pymat_shared) are read from and
+written to their files, as Matlab does. It keeps a workspace of numpy arrays and knows a
+small table of functions (see FUNCTIONS), which are called with feval and
+run_func. Code run with evalin (e.g. by run_code) is a list of statements
+that are Python expressions of the workspace variables and of these
+functions, which may be assigned to a variable, as in ``y = plus(x, 2);``,
+or displayed with disp. Statements that aren't valid Python fail.
+
+Each function call can take an artificial `latency`, to load test pools,
+batches and asyncio sessions.
+
+Example
+-------
+
+>>> from pymatbridge.testing import FakeSession
+>>> mlab = FakeSession(latency=0.01)
+>>> mlab.start()
+>>> mlab.run_func('plus', 1, 2)['result']
+3
+
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import zmq
+
+from pymatbridge.pymatbridge import (_Session, encode_message,
+                                     decode_message, SharedBuffers)
+
+__all__ = ['FakeSession', 'fake_server']
+
+
+FUNCTIONS = {
+    'plus': np.add,
+    'minus': np.subtract,
+    'times': np.multiply,
+    'rdivide': np.divide,
+    'mtimes': np.dot,
+    'sqrt': np.sqrt,
+    'svd': lambda x: np.linalg.svd(x, compute_uv=False).reshape(-1, 1),
+    'sum': lambda x, dim=None: np.sum(
+        x, axis=first_dim(x) if dim is None else int(dim) - 1),
+    'ones': lambda *shape: np.ones(shape if len(shape) > 1 else shape * 2),
+    'zeros': lambda *shape: np.zeros(shape if len(shape) > 1 else shape * 2),
+    'numel': np.size,
+    'size': lambda x: np.array(np.shape(x), dtype=float),
+    'pause': time.sleep,
+    'version': lambda: 'fake',
+    # There are no figures, and the graphics functions do nothing
+    'figure': lambda *args: None,
+    'plot': lambda *args: None,
+    'close': lambda *args: None,
+    'set': lambda *args: None,
+}
+
+# The Matlab classes of numpy dtypes, for whos
+MATLAB_CLASSES = {
+    'float64': 'double', 'float32': 'single', 'complex128': 'double',
+    'complex64': 'single', 'bool': 'logical',
+    'int8': 'int8', 'int16': 'int16', 'int32': 'int32', 'int64': 'int64',
+    'uint8': 'uint8', 'uint16': 'uint16', 'uint32': 'uint32',
+    'uint64': 'uint64',
+}
+
+
+def first_dim(x):
+    """The first dimension of an array longer than one, along which Matlab
+    reduces"""
+    shape = np.shape(x)
+    return next((dim for dim, n in enumerate(shape) if n != 1), None)
+
+
+def matlab_value(value):
+    """Vectors come back from Matlab as 2-d arrays"""
+    if isinstance(value, np.ndarray) and value.ndim < 2:
+        return value.reshape(1, -1)
+    return value
+
+
+def matlab_class(value):
+    if isinstance(value, np.ndarray):
+        return MATLAB_CLASSES.get(value.dtype.name, 'double')
+    if isinstance(value, bool):
+        return 'logical'
+    if isinstance(value, (int, float, complex)):
+        return 'double'
+    if isinstance(value, dict):
+        return 'struct'
+    if isinstance(value, list):
+        return 'cell'
+    return 'char'
+
+
+def pymat_response(result='', stdout='', success=True):
+    """A response shaped like those of pymat_eval"""
+    return dict(success=success, result=result, stack=[],
+                content=dict(stdout=stdout, figures=[]))
+
+
+class FakeServer(object):
+
+    def __init__(self, address, latency=0., functions=None):
+        """
+        A server that answers the requests of a session in place of Matlab.
+
+        Parameters
+        ----------
+
+        address : str
+            ZMQ address to bind, as passed to matlabserver.
+
+        latency : float
+            Seconds that each function call takes, on top of the function
+            itself.
+
+        functions : dict, optional
+            Functions to add to (or replace in) FUNCTIONS, by name. They are
+            called with the arguments of the call, and return its result.
+        """
+        self.latency = latency
+        self.functions = dict(FUNCTIONS)
+        self.functions.update(functions or {})
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.REP)
+        self.socket.bind(address)
+        self.workspace = {}
+        self.blobs = {}
+        # The files of shared variables, with their dtype and shape
+        self.shares = {}
+        self._stdout = []
+
+    def serve(self):
+        """Answer requests until the exit command"""
+        try:
+            while True:
+                if not self._serve_one():
+                    break
+        finally:
+            self.socket.close(linger=0)
+            self.context.term()
+
+    def _serve_one(self):
+        frames = self.socket.recv_multipart()
+        started, cpu_started = time.time(), sum(os.times()[:2])
+        req = decode_message(frames)
+        timing = dict(decode=time.time() - started)
+        for name in req.get('release', []):
+            self.workspace.pop(name, None)
+        self.shared('load', req.get('sync', []))
+
+        missing = self.missing_blobs(req)
+        if missing:
+            self.socket.send_string(json.dumps(
+                {'missing_blobs': missing}, separators=(',', ':')))
+            return True
+
+        cmd = req['cmd']
+        if cmd == 'connect':
+            self.socket.send_string('connected')
+        elif cmd == 'handshake':
+            self.blobs.clear()
+            self.socket.send_string(json.dumps(
+                dict(protocol='binary', stream=False, timing=True)))
+        elif cmd == 'exit':
+            self.socket.send_string('exit')
+            return False
+        elif cmd in ('eval', 'call', 'get', 'set', 'whos', 'batch'):
+            start = time.time()
+            if cmd == 'batch':
+                resp, results = self.batch(req)
+            else:
+                resp, results = self.request(req), None
+            timing['request'] = time.time() - start
+            if cmd in ('eval', 'call'):
+                # All of a call is spent in the function, as there is no
+                # path to check, and no figures or output to collect
+                timing.update(path=0., eval=timing['request'], figures=0.,
+                              stdout=0.)
+
+            start = time.time()
+            if results is None:
+                frames = encode_message(resp, binary=True,
+                                        buffers=self._buffers(req))
+            else:
+                frames = self._batch_frames(req, resp, results)
+            timing['encode'] = time.time() - start
+
+            if req.get('timing'):
+                timing.update(total=time.time() - started,
+                              cpu=sum(os.times()[:2]) - cpu_started,
+                              memory=-1)
+                frames.append(json.dumps(timing).encode('utf-8'))
+            self.socket.send_multipart(frames)
+        else:
+            self.socket.send_string('i dont know what you want')
+        return True
+
+    @staticmethod
+    def _buffers(req):
+        """Where the arrays of a response go: files of the directory shared
+        with the client, if any, or frames"""
+        if 'shared' in req:
+            return SharedBuffers(req['shared']['dir'],
+                                 req['shared']['min_bytes'])
+        return None
+
+    def _batch_frames(self, req, resp, results):
+        """Each result is a JSON frame followed by its buffers, as with
+        respond_batch_ in matlabserver.m"""
+        frames, layout = [None], []
+        for result in results:
+            result_frames = encode_message(result, binary=True,
+                                           buffers=self._buffers(req))
+            layout.append([len(frames), len(result_frames) - 1])
+            frames.extend(result_frames)
+        resp = dict(resp, results=np.array(layout, dtype=float))
+        frames[0] = encode_message(resp)[0]
+        return frames
+
+    def missing_blobs(self, value):
+        """The keys of the arguments sent before that aren't kept"""
+        missing = []
+        if isinstance(value, dict):
+            if 'matlabblob' in value:
+                if ('value' not in value
+                        and value['matlabblob'] not in self.blobs):
+                    missing.append(value['matlabblob'])
+            else:
+                for item in value.values():
+                    missing.extend(self.missing_blobs(item))
+        elif isinstance(value, list):
+            for item in value:
+                missing.extend(self.missing_blobs(item))
+        return missing
+
+    def resolve(self, value):
+        """Replace references to variables and to kept arguments"""
+        if isinstance(value, dict) and 'matlabblob' in value:
+            if 'value' in value:
+                self.blobs[value['matlabblob']] = value['value']
+            return self.blobs[value['matlabblob']]
+        if isinstance(value, dict) and list(value) == ['matlabref']:
+            return self.workspace[value['matlabref']]
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+        return value
+
+    def request(self, req):
+        """The response to a single request, as pymat_request makes it"""
+        if req['cmd'] in ('eval', 'call'):
+            return self.call(req)
+        return getattr(self, req['cmd'])(req)
+
+    def batch(self, req):
+        """Run the requests of a batch until one fails, as pymat_batch"""
+        resp = dict(success=True, failed=-1)
+        results = []
+        for i, op in enumerate(req['ops']):
+            results.append(self.request(op))
+            if not results[-1]['success']:
+                resp.update(success=False, failed=i)
+                break
+        return resp, results
+
+    def call(self, req):
+        args = req['func_args']
+        if not isinstance(args, list):
+            args = [args] if args != '' else []
+        self._stdout = []
+        try:
+            time.sleep(self.latency)
+            result = self.feval(req['func_name'], *self.resolve(args))
+        except Exception as e:
+            return pymat_response(stdout=str(e), success=False)
+        resp = pymat_response(stdout=''.join(self._stdout))
+        nargout = req['nargout']
+        if nargout == 1:
+            resp['result'] = matlab_value(result)
+        elif nargout > 1:
+            resp['result'] = [matlab_value(r) for r in result[:nargout]]
+        return resp
+
+    def feval(self, name, *args):
+        if name == 'feval':
+            return self.feval(*args)
+        elif name == 'evalin':
+            return self.run_code(args[1])
+        elif name == 'assignin':
+            self.workspace[args[1]] = matlab_value(args[2])
+            return ''
+        elif name == 'disp':
+            self.disp(*args)
+            return ''
+        elif name == 'exist':
+            if args[0] in self.workspace:
+                return 1
+            return 2 if args[0] in self.functions else 0
+        elif name == 'pymat_functions' and args:
+            return args[0] in self.functions
+        elif name == 'pymat_functions':
+            return sorted(self.functions)
+        elif name == 'pymat_path' and args[0] == 'which':
+            return dict(file='built-in', mtime=-1)
+        elif name == 'pymat_shared':
+            return self.shared(*args)
+        elif name in self.functions:
+            return self.functions[name](*args)
+        raise NameError("Undefined function or variable '%s'." % name)
+
+    def shared(self, cmd, *args):
+        """pymat_shared: copy shared variables from and to their files"""
+        if cmd == 'attach':
+            name, path, dtype, shape = args
+            self.shares[name] = (path, np.dtype(dtype),
+                                 tuple(int(n) for n in np.ravel(shape)))
+            self.shared('load', [name])
+        elif cmd == 'load':
+            names = [args[0]] if isinstance(args[0], str) else args[0]
+            for name in names:
+                path, dtype, shape = self.shares[name]
+                value = np.fromfile(path, dtype, int(np.prod(shape)))
+                self.workspace[name] = value.reshape(shape, order='F')
+        elif cmd == 'store':
+            path, dtype, shape = self.shares[args[0]]
+            value = np.asarray(self.workspace[args[0]])
+            if value.dtype != dtype or value.size != np.prod(shape):
+                raise ValueError('pymat_shared: %s is no longer a %s array '
+                                 'with %d elements'
+                                 % (args[0], dtype, np.prod(shape)))
+            with open(path, 'r+b') as f:
+                value.ravel(order='F').tofile(f)
+        elif cmd == 'detach':
+            self.shares.pop(args[0], None)
+        return True
+
+    def disp(self, value):
+        self._stdout.append('%s\n' % (value,))
+
+    def run_code(self, code):
+        result = ''
+        for statement in re.split(r'[;\n]', code):
+            match = re.match(r'\s*([A-Za-z]\w*)\s*=(?!=)\s*(.+?)\s*$',
+                             statement)
+            expression = match.group(2) if match else statement.strip()
+            if not expression:
+                continue
+            try:
+                compile(expression, '<evalin>', 'eval')
+            except SyntaxError:
+                raise SyntaxError("The fake server can't run '%s'."
+                                  % statement.strip())
+            value = self.evaluate(expression)
+            if match:
+                self.workspace[match.group(1)] = matlab_value(value)
+            else:
+                result = value
+        return result
+
+    def evaluate(self, expression):
+        namespace = dict(self.functions, disp=self.disp, **self.workspace)
+        try:
+            return eval(expression, {'__builtins__': {}}, namespace)
+        except NameError as e:
+            name = re.search(r"'(\w+)'", str(e))
+            raise NameError("Undefined function or variable '%s'."
+                            % (name.group(1) if name else expression))
+
+    def get(self, req):
+        name = req['varname']
+        # Values are always sent whole, however big
+        if req.get('ref') or 'index' in req:
+            return dict(success=False, result='', content=dict(
+                stdout='The fake server only gets whole variables'))
+        if name not in self.workspace:
+            try:
+                value = matlab_value(self.evaluate(name))
+            except Exception:
+                return dict(success=False, result='', content=dict(
+                    stdout="Undefined function or variable '%s'." % name))
+            return dict(success=True, result=value, content=dict(stdout=''))
+        return dict(success=True, result=self.workspace[name],
+                    content=dict(stdout=''))
+
+    def set(self, req):
+        name = req['varname']
+        if 'shape' in req:
+            dtype = np.dtype(req['dtype'])
+            if req['complex']:
+                dtype = np.result_type(dtype, np.complex64)
+            self.workspace[name] = np.zeros(req['shape'], dtype, order='F')
+        elif 'range' in req:
+            start, stop = req['range']
+            flat = self.workspace[name].reshape(-1, order='F')
+            flat[start:stop] = np.ravel(req['value'], order='F')
+        else:
+            self.workspace[name] = matlab_value(self.resolve(req['value']))
+        return dict(success=True, result='', content=dict(stdout=''))
+
+    def whos(self, req):
+        pattern = req.get('varname') or '*'
+        result = []
+        for name in sorted(fnmatch.filter(self.workspace, pattern)):
+            value = self.workspace[name]
+            if isinstance(value, (dict, list)):
+                array = np.empty((1, len(value)))
+            else:
+                array = matlab_value(np.asarray(value))
+            info = dict(name=name, size=[float(n) for n in
+                                         array.shape or (1, 1)],
+                        bytes=float(array.nbytes),
+                        complex=bool(np.iscomplexobj(array)), sparse=False)
+            info['class'] = matlab_class(value)
+            result.append(info)
+        return dict(success=True, result=result, content=dict(stdout=''))
+
+def fake_server(address, latency=0., functions=None):
+    """Serve the requests of a session at `address` until it exits
+
+    See `FakeServer` for the parameters.
+    """
+    FakeServer(address, latency, functions).serve()
+
+
+class FakeSession(_Session):
+
+    def __init__(self, latency=0., socket_addr=None,
+                 id='python-matlab-bridge', log=False, maxtime=60,
+                 platform=None, startup_options=None):
+        """
+        A session with a fake server (see `FakeServer`), which runs in its
+        own Python process, as Matlab would.
+
+        Parameters
+        ----------
+
+        latency : float
+            Seconds that each function call takes in the server.
+
+        startup_options : string
+            Command line options of the server (e.g. '--latency 0.1'), in
+            place of the ones made from `latency`.
+
+        See `Matlab` for the other parameters.
+        """
+        executable = '"%s" -m pymatbridge.testing' % sys.executable
+        if startup_options is None:
+            startup_options = '--latency %r' % float(latency)
+        super(FakeSession, self).__init__(executable, socket_addr, id, log,
+                                          maxtime, platform, startup_options)
+
+    def _program_name(self):
+        return 'Fake server'
+
+    def _preamble_code(self):
+        return []
+
+    def _execute_flag(self):
+        return ''
+
+
+try:
+    from pymatbridge.aio import _AsyncSession
+except (ImportError, SyntaxError):
+    pass
+else:
+    class AsyncFakeSession(_AsyncSession, FakeSession):
+        """A fake session whose methods are coroutines (see `FakeSession`)"""
+
+    __all__.append('AsyncFakeSession')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Matlab server')
+    parser.add_argument('--latency', type=float, default=0.,
+                        help='seconds that each function call takes')
+    parser.add_argument('code', help="matlabserver('address'...) as passed "
+                                     "to Matlab")
+    args = parser.parse_args()
+    address = re.search(r"matlabserver\('([^']+)'", args.code).group(1)
+    fake_server(address, args.latency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+import numpy.testing as npt
+from pymatbridge.aio import AsyncMatlab, AsyncOctave
+from pymatbridge.testing import AsyncFakeSession
+import test_utils as tu
+
+
+class TestAsync:
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.loop = asyncio.new_event_loop()
+        if tu.on_fake():
+            cls.mlab = AsyncFakeSession()
+        else:
+            cls.mlab = AsyncOctave() if tu.on_octave() else AsyncMatlab(log=True)
+        cls.run(cls.mlab.start())
+        npt.assert_(cls.run(cls.mlab.is_connected()))
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        cls.run(cls.mlab.stop())
+        cls.loop.close()
+
+    @classmethod
+    def run(cls, coroutine):
+        return cls.loop.run_until_complete(coroutine)
+
+    def test_run_func(self):
+        res = self.run(self.mlab.run_func('plus', 1.0, 2.0))
+        npt.assert_equal(res['result'], 3.0)
+
+    # Results are cached as with run_func of the blocking sessions
+    def test_cache(self):
+        value = np.random.random_sample((3, 3))
+        before = self.mlab.result_cache.stats()
+        res = self.run(self.mlab.run_func('plus', value, 1., cache=True))
+        again = self.run(self.mlab.run_func('plus', value, 1., cache=True))
+        npt.assert_equal(again['result'], res['result'])
+        stats = self.mlab.result_cache.stats()
+        npt.assert_equal((stats['hits'] - before['hits'],
+                          stats['misses'] - before['misses']), (1, 1))
+
+    # There is no stream to listen to
+    def test_stream(self):
+        npt.assert_raises(TypeError, self.run,
+                          self.mlab.run_func('plus', 1., 2., stream=print))
+
+    def test_variables(self):
+        value = np.random.random_sample((3, 4))
+        self.run(self.mlab.set_variable('x', value))
+        npt.assert_equal(self.run(self.mlab.get_variable('x')), value)
+        npt.assert_equal(self.run(self.mlab.get_variable('no_such_variable', 1)), 1)
+
+    # Several requests can be in flight at once
+    def test_gather(self):
+        async def gather():
+            return await asyncio.gather(*[
+                self.mlab.run_func('sqrt', float(i * i)) for i in range(10)])
+        results = self.run(gather())
+        npt.assert_equal([r['result'] for r in results], list(range(10)))
+
+    # A timed out request doesn't get in the way of the next ones
+    def test_timeout(self):
+        npt.assert_raises(asyncio.TimeoutError, self.run,
+                          self.mlab.run_code('pause(2)', timeout=0.1))
+        res = self.run(self.mlab.run_func('plus', 1.0, 1.0, timeout=10))
+        npt.assert_equal(res['result'], 2.0)
+
+    def test_batch(self):
+        async def batch():
+            async with self.mlab.batch() as b:
+                b.set_variable('y', 2.0)
+                y = b.get_variable('y')
+            return y.get()
+        npt.assert_equal(self.run(batch()), 2.0)
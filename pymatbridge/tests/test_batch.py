@@ -0,0 +1,50 @@
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+
+class TestBatch:
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = tu.connect_to_matlab()
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def test_batch(self):
+        x = np.random.random_sample((3, 4))
+        with self.mlab.batch() as b:
+            b.set_variable('x', x)
+            stdout = b.run_code('disp(1)')
+            res = b.run_func('plus', x, 1)
+            y = b.get_variable('x')
+
+        assert b.success
+        assert b.failed is None
+        npt.assert_equal(stdout.get()['content']['stdout'].strip(), '1')
+        npt.assert_almost_equal(res.get()['result'], x + 1)
+        npt.assert_equal(y.get(), x)
+
+    # Execution stops at the first failure
+    def test_failure(self):
+        with self.mlab.batch() as b:
+            b.run_code('a = 1;')
+            failing = b.run_code('this_is_nonsense')
+            skipped = b.run_code('a = 2;')
+
+        assert not b.success
+        npt.assert_equal(b.failed, 1)
+        assert not failing.get()['success']
+        assert not skipped.executed
+        npt.assert_raises(RuntimeError, skipped.get)
+        npt.assert_equal(self.mlab.get_variable('a'), 1)
+
+    def test_run_batch(self):
+        results = self.mlab.run_batch([('set_variable', 'b', 3.0),
+                                       ('get_variable', 'b'),
+                                       ('get_variable', 'b + 1')])
+        npt.assert_equal([r.get() for r in results[1:]], [3.0, 4.0])
@@ -0,0 +1,52 @@
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+
+class TestBlobs:
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = tu.connect_to_matlab()
+        # Smaller than the arrays handed over through files
+        cls.mlab.blob_bytes = 2**16
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def hits(self):
+        return self.mlab.blob_stats()['hits']
+
+    # An unchanged argument is sent as its key the second time
+    def test_argument(self):
+        tu.skip_on_fake('The fake server has no pymat_blobs')
+        value = np.random.random_sample(self.mlab.blob_bytes // 8)
+        res = self.mlab.run_func('sum', value)
+        hits = self.hits()
+        npt.assert_almost_equal(self.mlab.run_func('sum', value)['result'],
+                                res['result'])
+        npt.assert_equal(self.hits(), hits + 1)
+
+        value[0] += 1
+        npt.assert_almost_equal(self.mlab.run_func('sum', value)['result'],
+                                value.sum())
+
+    def test_set_variable(self):
+        tu.skip_on_fake('The fake server has no pymat_blobs')
+        value = np.random.random_sample(self.mlab.blob_bytes // 8)
+        self.mlab.set_variable('pymat_test_a', value)
+        hits = self.hits()
+        self.mlab.set_variable('pymat_test_b', value)
+        npt.assert_equal(self.hits(), hits + 1)
+        npt.assert_equal(self.mlab.get_variable('pymat_test_b').ravel(), value)
+
+    # Arguments that the server dropped are sent again
+    def test_dropped(self):
+        value = np.random.random_sample(self.mlab.blob_bytes // 8)
+        self.mlab.run_func('sum', value)
+        self.mlab.run_func('pymat_blobs', 'clear', nargout=0)
+        npt.assert_almost_equal(self.mlab.run_func('sum', value)['result'],
+                                value.sum())
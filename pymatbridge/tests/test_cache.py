@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+from pymatbridge import ResultCache
+
+
+class TestCache(object):
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = tu.connect_to_matlab()
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def setup_method(self, method):
+        self.mlab.result_cache = ResultCache()
+
+    def test_hit(self):
+        tu.skip_on_fake('The fake server has no m-files')
+        value = np.random.random_sample((3, 3))
+        res = self.mlab.run_func('inv', value, cache=True)
+        res['result'][0, 0] = 0
+        again = self.mlab.run_func('inv', value, cache=True)
+        npt.assert_almost_equal(again['result'], np.linalg.inv(value))
+        stats = self.mlab.result_cache.stats()
+        npt.assert_equal((stats['hits'], stats['misses']), (1, 1))
+
+        self.mlab.run_func('inv', value + 1, cache=True)
+        self.mlab.run_func('inv', value, nargout=1, capture=False, cache=True)
+        npt.assert_equal(self.mlab.result_cache.stats()['misses'], 3)
+
+    def test_mfile_changed(self):
+        tu.skip_on_fake('The fake server has no m-files')
+        dname = tempfile.mkdtemp()
+        fname = os.path.join(dname, 'pymat_cache_test.m')
+        try:
+            with open(fname, 'w') as f:
+                f.write('function x = pymat_cache_test(y)\nx = y + 1;\n')
+            npt.assert_equal(
+                self.mlab.run_func(fname, 1, cache=True)['result'], 2)
+            npt.assert_equal(
+                self.mlab.run_func(fname, 1, cache=True)['result'], 2)
+
+            with open(fname, 'w') as f:
+                f.write('function x = pymat_cache_test(y)\nx = y + 2;\n')
+            mtime = os.path.getmtime(fname) + 10
+            os.utime(fname, (mtime, mtime))
+            npt.assert_equal(
+                self.mlab.run_func(fname, 1, cache=True)['result'], 3)
+        finally:
+            shutil.rmtree(dname)
+
+    # Results on disk outlive the cache that stored them
+    def test_directory(self):
+        tu.skip_on_fake('The fake server has no m-files')
+        dname = tempfile.mkdtemp()
+        try:
+            self.mlab.result_cache = ResultCache(directory=dname)
+            self.mlab.run_func('magic', 4, cache=True)
+            self.mlab.result_cache = ResultCache(directory=dname)
+            res = self.mlab.run_func('magic', 4, cache=True)
+            npt.assert_equal(res['result'][0, 0], 16)
+            npt.assert_equal(self.mlab.result_cache.stats()['disk_hits'], 1)
+        finally:
+            shutil.rmtree(dname)
+
+    # The server is only asked once where a function is, even if it can't
+    # find it, until refresh_functions
+    def test_lookups(self):
+        def requests(calls):
+            cmds = []
+            self.mlab.stats_hook = cmds.append
+            try:
+                for _ in range(calls):
+                    self.mlab.run_func('no_such_function_pymat', cache=True)
+            finally:
+                self.mlab.stats_hook = None
+            return len(cmds)
+
+        requests(1)
+        npt.assert_equal(requests(2), 2)
+        self.mlab.refresh_functions()
+        npt.assert_equal(requests(1), 2)
+
+    def test_not_cached(self):
+        ref = self.mlab.run_func('magic', 4, ref=True)['result']
+        self.mlab.run_func('sum', ref, cache=True)
+        self.mlab.run_func('no_such_function_pymat', cache=True)
+        npt.assert_equal(self.mlab.result_cache.stats()['entries'], 0)
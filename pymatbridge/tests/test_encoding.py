@@ -0,0 +1,117 @@
+import numpy as np
+import numpy.testing as npt
+
+import pymatbridge as pymat
+
+
+class TestEncoding:
+
+    # Serialize a message with the JSON protocol and read it back
+    def test_json_roundtrip(self):
+        value = np.random.random_sample((3, 4))
+        frames = pymat.encode_message({'value': value})
+        npt.assert_equal(len(frames), 1)
+        res = pymat.decode_message(frames)
+        npt.assert_equal(res['value'], value)
+
+    # With the binary protocol arrays travel as separate raw frames
+    def test_binary_roundtrip(self):
+        value = np.random.random_sample((3, 4))
+        frames = pymat.encode_message({'value': value}, binary=True)
+        npt.assert_equal(len(frames), 2)
+        npt.assert_equal(memoryview(frames[1]).nbytes, value.nbytes)
+        res = pymat.decode_message(frames)
+        npt.assert_equal(res['value'], value)
+
+    def test_binary_complex(self):
+        value = np.random.random_sample((2, 5)) + 1j * np.random.random_sample((2, 5))
+        frames = pymat.encode_message({'value': value}, binary=True)
+        npt.assert_equal(len(frames), 3)
+        res = pymat.decode_message(frames)
+        npt.assert_equal(res['value'], value)
+
+    def test_binary_non_contiguous(self):
+        value = np.random.random_sample((6, 6))[::2, 1::2]
+        frames = pymat.encode_message([value, 'hello', 1.5], binary=True)
+        res = pymat.decode_message(frames)
+        npt.assert_equal(res[0], value)
+        npt.assert_equal(res[1:], ['hello', 1.5])
+
+    # Arrays keep their element type on the wire
+    def test_dtypes(self):
+        for dtype in ['float64', 'float32', 'int8', 'uint8', 'int16', 'uint16',
+                      'int32', 'uint32', 'int64', 'uint64']:
+            value = (np.random.random_sample((4, 3)) * 100).astype(dtype)
+            for binary in [False, True]:
+                frames = pymat.encode_message(value, binary=binary)
+                res = pymat.decode_message(frames)
+                npt.assert_equal(res.dtype, np.dtype(dtype))
+                npt.assert_equal(res, value)
+
+    # Sessions send arrays of the default integer type as double
+    def test_default_int(self):
+        value = np.arange(12).reshape(4, 3)
+        for binary in [False, True]:
+            res = pymat.decode_message(pymat.encode_message(value,
+                                                            binary=binary))
+            npt.assert_equal(res.dtype, value.dtype)
+            res = pymat.decode_message(pymat.encode_message(
+                [value, value.astype(np.int32)], binary=binary,
+                default_int_as_double=True))
+            npt.assert_equal(res[0].dtype, np.dtype(np.float64))
+            npt.assert_equal(res[0], value)
+            npt.assert_equal(res[1].dtype, np.dtype(np.int32))
+
+    # Matlab has no extended precision
+    def test_longdouble(self):
+        value = np.random.random_sample((4, 3)).astype(np.longdouble)
+        for binary in [False, True]:
+            res = pymat.decode_message(pymat.encode_message(value,
+                                                            binary=binary))
+            npt.assert_equal(res.dtype, np.dtype(np.float64))
+            npt.assert_equal(res, value.astype(np.float64))
+        value = value + 1j * value
+        res = pymat.decode_message(pymat.encode_message(value, binary=True))
+        npt.assert_equal(res.dtype, np.dtype(np.complex128))
+        npt.assert_equal(res, value.astype(np.complex128))
+        npt.assert_equal(pymat.wire_dtype(np.dtype(np.longdouble)),
+                         np.dtype(np.float64))
+
+    def test_complex64(self):
+        value = (np.random.random_sample((2, 3)) +
+                 1j * np.random.random_sample((2, 3))).astype(np.complex64)
+        res = pymat.decode_message(pymat.encode_message(value, binary=True))
+        npt.assert_equal(res.dtype, np.dtype(np.complex64))
+        npt.assert_equal(res, value)
+
+    # Logical arrays are packed to one bit per element
+    def test_bool(self):
+        value = np.random.random_sample((5, 7)) > 0.5
+        frames = pymat.encode_message(value, binary=True)
+        npt.assert_equal(memoryview(frames[1]).nbytes, 5)
+        res = pymat.decode_message(frames)
+        npt.assert_equal(res.dtype, np.dtype(bool))
+        npt.assert_equal(res, value)
+
+    # Big arrays are sent along with their key once, then as the key only
+    def test_blobs(self):
+        value = np.random.random_sample((10, 10))
+        blobs = set()
+        first = pymat.encode_message([value], binary=True, blobs=blobs,
+                                     blob_bytes=value.nbytes)
+        npt.assert_equal(len(first), 2)
+        npt.assert_equal(blobs, set([pymat.blob_key(value)]))
+        again = pymat.encode_message([value.copy()], binary=True, blobs=blobs,
+                                     blob_bytes=value.nbytes)
+        npt.assert_equal(len(again), 1)
+        npt.assert_equal(pymat.decode_message(again),
+                         [{'matlabblob': pymat.blob_key(value)}])
+        npt.assert_(pymat.blob_key(value) != pymat.blob_key(value.T))
+        # A key that is already known isn't computed again
+        other = np.ones(3)
+        frames = pymat.encode_message([other], binary=True, blobs=blobs,
+                                      blob_bytes=other.nbytes,
+                                      blob_keys={id(other): 'known'})
+        npt.assert_equal(pymat.decode_message(frames)[0]['matlabblob'],
+                         'known')
+        npt.assert_(pymat.blob_key(value) != pymat.blob_key(value + 1))
@@ -8,6 +8,7 @@ class TestFunctionProcessor:
     # Start a Matlab session before running any tests
     @classmethod
     def setup_class(cls):
+        tu.skip_on_fake('Calls an m-file')
         cls.mlab = tu.connect_to_matlab()
 
     # Tear down the Matlab session after running all the tests
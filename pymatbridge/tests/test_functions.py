@@ -1,3 +1,7 @@
+import os
+import shutil
+import tempfile
+
 import numpy as np
 import numpy.testing as npt
 import test_utils as tu
@@ -16,6 +20,7 @@ class TestFunctions(object):
         tu.stop_matlab(cls.mlab)
 
     def test_nargout(self):
+        tu.skip_on_fake('Runs m-files')
         res  = self.mlab.run_func('svd', np.array([[1,2],[1,3]]), nargout=3)
         U, S, V = res['result']
         npt.assert_almost_equal(U, np.array([[-0.57604844, -0.81741556],
@@ -35,6 +40,7 @@ class TestFunctions(object):
         assert res['result'] == []
 
     def test_tuple_args(self):
+        tu.skip_on_fake('Runs m-files')
         res = self.mlab.run_func('ones', (1, 2))
         npt.assert_almost_equal(res['result'], [[1, 1]])
 
@@ -44,16 +50,94 @@ class TestFunctions(object):
                                 [[1.41421356, 0.],
                                  [0.70710678, 0.70710678]])
 
+    # Arrays of the default integer type arrive as double, unless asked not to
+    def test_default_int(self):
+        tu.skip_on_fake('Runs m-files')
+        res = self.mlab.run_func('class', np.array([[1, 2], [1, 3]]))
+        npt.assert_equal(res['result'], 'double')
+        res = self.mlab.run_func('class', np.array([1, 2], dtype=np.int32))
+        npt.assert_equal(res['result'], 'int32')
+        self.mlab.default_int_as_double = False
+        try:
+            res = self.mlab.run_func('class', np.array([[1, 2], [1, 3]]))
+            npt.assert_equal(res['result'], 'int64')
+        finally:
+            self.mlab.default_int_as_double = True
+
     def test_create_func(self):
+        tu.skip_on_fake('Runs m-files')
         test = self.mlab.ones(3)
         npt.assert_array_equal(test['result'], np.ones((3, 3)))
         doc = self.mlab.zeros.__doc__
         assert 'zeros' in doc
 
+    # Names that aren't functions are only looked up once
+    def test_missing_func(self):
+        assert 'zeros' in dir(self.mlab)
+        assert not hasattr(self.mlab, 'pymat_no_such_function')
+        assert 'pymat_no_such_function' in self.mlab._not_functions
+        assert not hasattr(self.mlab, 'pymat_no_such_function')
+
+        self.mlab.refresh_functions()
+        assert not self.mlab._not_functions
+
+    # Names missing from the index of functions are looked up on the lean
+    # path of the server, without capturing output
+    def test_unlisted_func(self):
+        cmds = []
+        self.mlab._functions = frozenset()
+        self.mlab.stats_hook = lambda record: cmds.append(record['cmd'])
+        try:
+            assert hasattr(self.mlab, 'plus')
+            assert not hasattr(self.mlab, 'pymat_no_such_function')
+        finally:
+            self.mlab.stats_hook = None
+            self.mlab.refresh_functions()
+        npt.assert_equal(cmds, ['call', 'call'])
+
     def test_pass_kwargs(self):
+        tu.skip_on_fake('Runs m-files')
         resp = self.mlab.run_func('plot', [1, 2, 3], Linewidth=3)
         assert resp['success']
         assert len(resp['content']['figures'])
         resp = self.mlab.plot([1, 2, 3], Linewidth=3)
         assert resp['result'] is not None
         assert len(resp['content']['figures'])
+
+    def test_no_capture(self):
+        tu.skip_on_fake('Runs m-files')
+        res = self.mlab.run_func('disp', 'hello', nargout=0)
+        assert res['content']['stdout'] == 'hello\n'
+        res = self.mlab.run_func('disp', 'hello', nargout=0, capture=False)
+        assert res['success']
+        assert res['content']['stdout'] == ''
+        res = self.mlab.run_func('plus', 1, 2, capture=False)
+        assert res['result'] == 3
+        res = self.mlab.run_func('this_is_nonsense', capture=False)
+        assert not res['success']
+
+    def test_rehash_on_change(self):
+        tu.skip_on_fake('Runs m-files')
+        dname = tempfile.mkdtemp()
+        fname = os.path.join(dname, 'pymat_rehash_test.m')
+        try:
+            with open(fname, 'w') as f:
+                f.write('function x = pymat_rehash_test()\nx = 1;\n')
+            res = self.mlab.run_func(fname)
+            assert res['result'] == 1
+
+            # Calling an unchanged function doesn't rehash the path
+            before = self.mlab.path_stats()['rehashes']
+            res = self.mlab.run_func(fname)
+            assert self.mlab.path_stats()['rehashes'] == before
+
+            with open(fname, 'w') as f:
+                f.write('function x = pymat_rehash_test()\nx = 2;\n')
+            mtime = os.path.getmtime(fname) + 10
+            os.utime(fname, (mtime, mtime))
+            res = self.mlab.run_func(fname)
+            assert res['result'] == 2
+            assert self.mlab.path_stats()['rehashes'] == before + 1
+        finally:
+            self.mlab.run_func('rmpath', dname, nargout=0)
+            shutil.rmtree(dname)
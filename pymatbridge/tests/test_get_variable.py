@@ -1,4 +1,5 @@
 import pymatbridge as pymat
+import numpy as np
 import numpy.testing as npt
 import test_utils as tu
 
@@ -27,6 +28,7 @@ class TestGetVariable:
 
     # Get some arrays
     def test_get_array(self):
+        tu.skip_on_fake('Runs Matlab code')
         self.mlab.run_code("a = [1 2 3 4]")
         self.mlab.run_code("b = [1 2; 3 4]")
 
@@ -36,6 +38,7 @@ class TestGetVariable:
 
     # Try to get a non-existent variable
     def test_nonexistent_var(self):
+        tu.skip_on_fake('Runs Matlab code')
         self.mlab.run_code("clear")
 
         npt.assert_equal(self.mlab.get_variable('a'), None)
@@ -43,6 +46,38 @@ class TestGetVariable:
 
     # Try to get a non-existent variable with default
     def test_nonexistent_var_default(self):
+        tu.skip_on_fake('Runs Matlab code')
         self.mlab.run_code("clear")
 
         npt.assert_equal(self.mlab.get_variable('a', 'some_val'), 'some_val')
+
+
+    # Index a variable in Matlab, the way numpy would
+    def test_index(self):
+        tu.skip_on_fake('Runs Matlab code')
+        x = np.arange(60.).reshape(3, 4, 5)
+        self.mlab.set_variable('x', x)
+
+        for index in [(1, slice(None), 2), (slice(None, None, -1), 0),
+                      (slice(1, None), [0, -1], slice(4, 0, -2)), -1]:
+            npt.assert_equal(self.mlab.get_variable('x', index=index),
+                             x[index])
+        npt.assert_equal(self.mlab.var['x'][:, 1:3, 4], x[:, 1:3, 4])
+        npt.assert_equal(self.mlab.get_variable('x', 'oops', index=3), 'oops')
+
+
+    # Describe variables without getting them
+    def test_whos(self):
+        tu.skip_on_fake('Runs Matlab code')
+        self.mlab.run_code("clear")
+        self.mlab.set_variable('x', np.zeros((100, 20)))
+        self.mlab.run_code("s = 'text';")
+
+        info = self.mlab.var['x'].info()
+        npt.assert_equal(info['class'], 'double')
+        npt.assert_equal(info['size'], (100, 20))
+        npt.assert_equal(info['bytes'], 16000)
+        npt.assert_equal(sorted(v['name'] for v in self.mlab.whos()),
+                         ['s', 'x'])
+        assert 'x' in self.mlab.var
+        npt.assert_equal(self.mlab.var['y'].info(), None)
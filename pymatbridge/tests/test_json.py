@@ -8,6 +8,7 @@ class TestJson:
     # Start a Matlab session before doing any tests
     @classmethod
     def setup_class(cls):
+        tu.skip_on_fake('Runs m-files and Matlab code')
         cls.mlab = tu.connect_to_matlab()
 
     # Tear down the Matlab session after all the tests are done
@@ -67,3 +68,40 @@ class TestJson:
                 + unichr(13) + unichr(9) + unichr(12) + unichr(8) + unichr(8) + unichr(12) \
                 + unichr(47) + unichr(34) + unichr(47) + unichr(10) + unichr(10) + unichr(47) + unichr(34)
         npt.assert_equal(res, ans, err_msg = "Special Character Test 8 failed")
+
+    # Both codecs read and write the same values
+    def test_codecs(self):
+        value = {'names': ['item %d' % i for i in range(100)],
+                 'x': 1.5,
+                 'nested': [{'a': 1.0, 'b': 'x'}, {'a': 2.0, 'b': 'y'}],
+                 'args': ['base', 3.0]}
+        results = {}
+        try:
+            for codec in ('java', 'native'):
+                if not self.mlab.run_func('json_codec', codec)['success']:
+                    continue
+                self.mlab.set_variable('codec_value', value)
+                results[codec] = self.mlab.get_variable('codec_value')
+                npt.assert_equal(results[codec], value)
+                res = self.mlab.run_func('plus', 1.0, 2.0)['result']
+                npt.assert_equal(res, 3.0)
+        finally:
+            self.mlab.run_func('json_codec', 'auto')
+        npt.assert_('java' in results)
+
+    # Without the JVM, the server works with the native codec alone
+    def test_nojvm(self):
+        if tu.on_fake() or not self.mlab.run_func('exist',
+                                                  'jsondecode')['result']:
+            return
+        cls = pymat.Octave if tu.on_octave() else pymat.Matlab
+        mlab = cls(jvm=False)
+        mlab.start()
+        try:
+            if not tu.on_octave():
+                npt.assert_(not mlab.run_func('usejava', 'jvm')['result'])
+            npt.assert_equal(mlab.run_func('json_codec')['result'], 'native')
+            mlab.set_variable('x', ['a', 'b'])
+            npt.assert_equal(mlab.get_variable('x'), ['a', 'b'])
+        finally:
+            tu.stop_matlab(mlab)
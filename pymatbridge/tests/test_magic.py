@@ -83,6 +83,7 @@ class TestMagic:
     def test_figure(self):
         # Just make a plot to get more testing coverage
         self.ip.run_line_magic('matlab', 'plot([1 2 3])')
+        self.ip.run_line_magic('matlab', '-f svg -r 72 plot([1 2 3])')
 
 
     def test_matrix(self):
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import numpy as np
+import numpy.testing as npt
+import pymatbridge as pymat
+from pymatbridge.testing import FakeSession
+import test_utils as tu
+
+
+class TestPool:
+
+    # Start a pool of sessions before running any tests
+    @classmethod
+    def setup_class(cls):
+        if tu.on_fake():
+            backend = FakeSession
+        else:
+            backend = pymat.Octave if tu.on_octave() else pymat.Matlab
+        cls.pool = pymat.SessionPool(2, backend=backend,
+                                     preamble='pool_offset = 10;')
+        cls.pool.start()
+
+    # Tear down the sessions after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        cls.pool.close()
+
+    def test_submit(self):
+        x = np.random.random_sample((3, 4))
+        future = self.pool.submit('plus', x, 1)
+        npt.assert_almost_equal(future.result()['result'], x + 1)
+
+    def test_submit_callable(self):
+        def offset(session, x):
+            return session.get_variable('pool_offset') + x
+
+        npt.assert_equal(self.pool.submit(offset, 1).result(), 11)
+
+    def test_map(self):
+        x = [float(i) for i in range(10)]
+        for chunksize in (1, 3):
+            res = list(self.pool.map('plus', x, x, chunksize=chunksize))
+            npt.assert_almost_equal(res, [2 * i for i in x])
+
+    def test_map_unordered(self):
+        x = [float(i) for i in range(10)]
+        res = list(self.pool.map('sqrt', x, ordered=False, chunksize=2))
+        npt.assert_almost_equal(sorted(res), np.sqrt(x))
+
+    def test_map_failure(self):
+        npt.assert_raises(RuntimeError, list,
+                          self.pool.map('this_is_nonsense', [1., 2.]))
+
+
+# When a dead session can't be replaced, the calls waiting for it fail
+# instead of hanging, and the new session is stopped
+def test_failed_replacement():
+    sessions = []
+
+    def preamble(session):
+        sessions.append(session)
+        if len(sessions) > 1:
+            raise RuntimeError('preamble failed')
+
+    def exit_server(session):
+        session._response(cmd='exit')
+        return session.run_func('plus', 1., 2.)
+
+    pool = pymat.SessionPool(1, backend=FakeSession, preamble=preamble)
+    pool.start()
+    try:
+        dying = pool.submit(exit_server)
+        waiting = pool.submit('plus', 1., 2.)
+        npt.assert_raises(pymat.ServerExitError, dying.result, 30)
+        npt.assert_raises_regex(RuntimeError, 'preamble failed',
+                                waiting.result, 30)
+        npt.assert_raises_regex(RuntimeError, 'failed to restart',
+                                pool.submit('plus', 1., 2.).result, 1)
+        npt.assert_equal(pool.replaced, 1)
+        npt.assert_(sessions[1].process.wait(10) is not None)
+        npt.assert_(not sessions[1].started)
+    finally:
+        pool.close()
+
+
+# When one of the sessions can't be replaced, the others run the calls that
+# were waiting in the queue
+def test_failed_replacement_others_alive():
+    sessions = []
+    release = threading.Event()
+
+    def preamble(session):
+        sessions.append(session)
+        if len(sessions) > 2:
+            raise RuntimeError('preamble failed')
+
+    def exit_server(session):
+        session._response(cmd='exit')
+        return session.run_func('plus', 1., 2.)
+
+    def block(session):
+        release.wait(30)
+        return session.run_func('plus', 1., 2.)['result']
+
+    pool = pymat.SessionPool(2, backend=FakeSession, preamble=preamble)
+    pool.start()
+    try:
+        # One session waits while the other dies
+        blocked = pool.submit(block)
+        dying = pool.submit(exit_server)
+        waiting = [pool.submit('plus', 1., float(i)) for i in range(4)]
+        npt.assert_raises(pymat.ServerExitError, dying.result, 30)
+        deadline = time.time() + 30
+        while pool._alive > 1 and time.time() < deadline:
+            time.sleep(0.01)
+        npt.assert_equal(pool._alive, 1)
+        release.set()
+        npt.assert_equal(blocked.result(30), 3)
+        npt.assert_equal([w.result(30)['result'] for w in waiting],
+                         [1., 2., 3., 4.])
+        npt.assert_equal(pool.submit('plus', 1., 2.).result(30)['result'], 3)
+        npt.assert_equal(pool.replaced, 1)
+    finally:
+        release.set()
+        pool.close()
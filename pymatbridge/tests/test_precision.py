@@ -10,6 +10,7 @@ class TestPrecision:
     # Start a Matlab session before running any tests
     @classmethod
     def setup_class(cls):
+        tu.skip_on_fake('Runs m-files')
         cls.mlab = tu.connect_to_matlab()
 
     # Tear down the Matlab session after running all the tests
@@ -59,3 +60,37 @@ class TestPrecision:
 
             res = self.mlab.run_func('precision_sqrt.m', {'val':val})['result']
             npt.assert_almost_equal(res, np.sqrt(val), decimal=7, err_msg="Float64 square root error")
+
+    # Pass arrays of every supported type through the signal path and check
+    # that they come back with the same type
+    def test_dtype_roundtrip(self):
+        self.mlab.default_int_as_double = False
+        try:
+            for dtype in [np.float64, np.float32, np.int8, np.uint8, np.int16,
+                          np.uint16, np.int32, np.uint32, np.int64, np.uint64]:
+                val = (np.random.random_sample((4, 5)) * 100).astype(dtype)
+                res = self.mlab.run_func('precision_pass.m', {'val':val})['result']
+                npt.assert_equal(res.dtype, np.dtype(dtype), err_msg="%s type error" % np.dtype(dtype).name)
+                npt.assert_equal(res, val, err_msg="%s roundtrip error" % np.dtype(dtype).name)
+        finally:
+            self.mlab.default_int_as_double = True
+
+    # Single precision complex numbers stay single precision
+    def test_complex64_roundtrip(self):
+        val = (np.random.random_sample((3, 3)) +
+               1j * np.random.random_sample((3, 3))).astype(np.complex64)
+        res = self.mlab.run_func('precision_pass.m', {'val':val})['result']
+        npt.assert_equal(res.dtype, np.dtype(np.complex64), err_msg="Complex64 type error")
+        npt.assert_equal(res, val, err_msg="Complex64 roundtrip error")
+
+    # Logical masks come back as boolean arrays
+    def test_logical_roundtrip(self):
+        val = np.random.random_sample((7, 3)) > 0.5
+        res = self.mlab.run_func('precision_pass.m', {'val':val})['result']
+        npt.assert_equal(res.dtype, np.dtype(bool), err_msg="Logical type error")
+        npt.assert_equal(res, val, err_msg="Logical roundtrip error")
+
+        self.mlab.run_code('mask = magic(4) > 8;')
+        npt.assert_equal(self.mlab.get_variable('mask'), np.array(
+            [[True, False, False, True], [False, True, True, False],
+             [True, False, False, True], [False, True, True, False]]))
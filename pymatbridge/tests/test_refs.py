@@ -0,0 +1,91 @@
+import gc
+
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+from pymatbridge import MatlabRef
+
+
+class TestRefs:
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        tu.skip_on_fake('The fake server keeps no references')
+        cls.mlab = tu.connect_to_matlab()
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def count(self):
+        return self.mlab.run_func('pymat_refs', 'count', capture=False)['result']
+
+    def test_ref_result(self):
+        ref = self.mlab.run_func('magic', 4, ref=True)['result']
+        assert isinstance(ref, MatlabRef)
+        npt.assert_equal(ref.shape, (4, 4))
+        npt.assert_equal(ref.matlab_class, 'double')
+        npt.assert_equal(np.asarray(ref), self.mlab.run_func('magic', 4)['result'])
+
+    # A reference is passed back without sending the value
+    def test_ref_argument(self):
+        ref = self.mlab.run_func('magic', 4, ref=True)['result']
+        res = self.mlab.run_func('sum', ref, 2)
+        npt.assert_equal(res['result'].ravel(), [34, 34, 34, 34])
+
+        self.mlab.set_variable('pymat_test_copy', ref)
+        npt.assert_equal(self.mlab.get_variable('pymat_test_copy'), ref.get())
+
+    def test_nargout(self):
+        refs = self.mlab.run_func('size', np.zeros((2, 3)), nargout=2,
+                                  ref=True)['result']
+        npt.assert_equal([r.get() for r in refs], [2, 3])
+
+    def test_get_variable(self):
+        self.mlab.run_code('pymat_test_x = 1:5;')
+        ref = self.mlab.get_variable('pymat_test_x', ref=True)
+        npt.assert_equal(ref.shape, (1, 5))
+        npt.assert_equal(ref.get().ravel(), np.arange(1, 6))
+
+    def test_batch(self):
+        with self.mlab.batch() as b:
+            res = b.run_func('ones', 3, ref=True)
+        npt.assert_equal(res.get()['result'].get(), np.ones((3, 3)))
+
+    # Variables are cleared along with the next request once the refs are
+    # garbage collected
+    def test_release(self):
+        gc.collect()
+        before = self.count()
+        refs = [self.mlab.run_func('rand', 2, ref=True)['result']
+                for _ in range(3)]
+        npt.assert_equal(self.count(), before + 3)
+        del refs
+        gc.collect()
+        npt.assert_equal(self.count(), before)
+
+
+# Refs of a server that was restarted since don't clear the variables of the
+# new one, which reuses their names
+def test_restart():
+    mlab = tu.new_session()
+    mlab.start()
+    try:
+        stale = MatlabRef(mlab, 'pymatref_1')
+        mlab._release('pymatref_2', mlab._generation)
+        mlab.stop()
+        mlab.start()
+        npt.assert_equal(list(mlab._released), [])
+        del stale
+        gc.collect()
+        npt.assert_equal(list(mlab._released), [])
+
+        fresh = MatlabRef(mlab, 'pymatref_1')
+        del fresh
+        gc.collect()
+        npt.assert_equal(list(mlab._released), ['pymatref_1'])
+    finally:
+        mlab.stop()
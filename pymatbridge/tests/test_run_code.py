@@ -21,6 +21,7 @@ class TestRunCode:
 
     # Running 'disp()' in Matlab command window
     def test_disp(self):
+        tu.skip_on_fake('Runs Matlab code')
         result1 = self.mlab.run_code("disp('Hello world')")['content']['stdout']
         result2 = self.mlab.run_code("disp('   ')")['content']['stdout']
         result3 = self.mlab.run_code("disp('')")['content']['stdout']
@@ -34,6 +35,7 @@ class TestRunCode:
 
     # Make some assignments and run basic operations
     def test_basic_operation(self):
+        tu.skip_on_fake('Runs Matlab code')
         result_assignment_a = self.mlab.run_code("a = 21.23452261")['content']['stdout']
         result_assignment_b = self.mlab.run_code("b = 347.745")['content']['stdout']
         result_sum = self.mlab.run_code("a + b")['content']['stdout']
@@ -67,7 +69,64 @@ class TestRunCode:
         else:
             npt.assert_equal(message, "Undefined function or variable 'this_is_nonsense'.")
 
+    def test_figures(self):
+        tu.skip_on_fake('Runs Matlab code')
+        figures = self.mlab.run_code('plot([1 2 3])')['content']['figures']
+        npt.assert_equal(len(figures), 1)
+        assert figures[0].tobytes().startswith(b'\x89PNG')
+
+        figures = self.mlab.run_code('plot([1 2 3])', figure_format='jpeg',
+                                     figure_dpi=72)['content']['figures']
+        assert figures[0].tobytes().startswith(b'\xff\xd8')
+
+        figures = self.mlab.run_code('plot([1 2 3])',
+                                     figures=False)['content']['figures']
+        npt.assert_equal(len(figures), 0)
+        self.mlab.run_code('close all')
+
+        # Calls that don't plot don't return figures
+        figures = self.mlab.run_code('a = 1;')['content']['figures']
+        npt.assert_equal(len(figures), 0)
+
+    def test_unchanged_figures(self):
+        tu.skip_on_fake('Runs Matlab code')
+        code = "pymat_fig = figure('visible', 'on'); plot([1 2 3]);"
+        figures = self.mlab.run_code(code)['content']['figures']
+        npt.assert_equal(len(figures), 1)
+
+        # The figure stays open, and isn't rendered again until it changes
+        figures = self.mlab.run_code('a = 1;')['content']['figures']
+        npt.assert_equal(len(figures), 0)
+        self.mlab.run_code('pymat_open = ishandle(pymat_fig);')
+        npt.assert_(self.mlab.get_variable('pymat_open'))
+        figures = self.mlab.run_code("title('changed');")['content']['figures']
+        npt.assert_equal(len(figures), 1)
+        self.mlab.run_code('close(pymat_fig); clear pymat_fig pymat_open')
+
+    def test_stream(self):
+        tu.skip_on_fake('Runs Matlab code')
+        records = []
+        result = self.mlab.run_code("disp('hello'); pymat_progress(0.5);",
+                                    stream=records.append)
+        assert result['success']
+        progress = [r['data'] for r in records if r['kind'] == 'progress']
+        npt.assert_equal(progress, [0.5])
+        stdout = ''.join(r['data'] for r in records if r['kind'] == 'stdout')
+        npt.assert_equal(stdout, "hello\n")
+
+        kinds = [r['kind'] for r in self.mlab.iter_func('disp', 'hello',
+                                                        nargout=0)]
+        npt.assert_equal(kinds[-1], 'result')
+
+    def test_max_stdout(self):
+        tu.skip_on_fake('Runs Matlab code')
+        content = self.mlab.run_code("disp('hello world')",
+                                     max_stdout=6)['content']
+        npt.assert_equal(content['stdout'], 'world\n')
+        npt.assert_equal(content['stdout_dropped'], 6)
+
     def test_stack_traces(self):
+        tu.skip_on_fake('Runs Matlab code')
         this_dir = os.path.abspath(os.path.dirname(__file__))
         test_file = os.path.join(this_dir, 'test_stack_trace.m')
 
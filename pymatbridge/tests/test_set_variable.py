@@ -1,3 +1,4 @@
+import os
 import pymatbridge as pymat
 import random as rd
 import numpy as np
@@ -19,6 +20,7 @@ class TestArray:
 
     # Pass a 1000*1000 array to Matlab
     def test_array_size(self):
+        tu.skip_on_fake('Runs m-files')
         array = np.random.random_sample((50,50))
         res = self.mlab.run_func("array_size.m",{'val':array})['result']
         npt.assert_almost_equal(res, array, decimal=8, err_msg = "test_array_size: error")
@@ -42,8 +44,49 @@ class TestArray:
         npt.assert_equal(self.mlab.get_variable('test'), test_array)
 
     def test_others(self):
-        self.mlab.set_variable('test', np.float(1.5))
+        self.mlab.set_variable('test', np.float64(1.5))
         npt.assert_equal(self.mlab.get_variable('test'), 1.5)
         self.mlab.set_variable('test', 'hello')
         npt.assert_equal(self.mlab.get_variable('test'), 'hello')
 
+
+    # Arrays bigger than chunk_bytes travel in chunks
+    def test_chunks(self):
+        tu.skip_on_fake('The fake server sends variables whole')
+        chunk_bytes = self.mlab.chunk_bytes
+        self.mlab.chunk_bytes = 1000
+        try:
+            for test_array in [np.random.random_sample((37, 29)),
+                               np.random.random_sample((10, 10, 30)) > 0.5,
+                               np.arange(24000, dtype=np.int16)[::2],
+                               np.random.random_sample((20, 30)) * 1j]:
+                sent = []
+                res = self.mlab.set_variable('test', test_array,
+                                             progress=lambda n, total: sent.append(n))
+                assert res['success']
+                npt.assert_equal(sent[-1], test_array.nbytes)
+                result = self.mlab.get_variable('test')
+                npt.assert_equal(result.dtype, test_array.dtype)
+                npt.assert_equal(result.ravel(), test_array.ravel())
+
+            chunks = list(self.mlab.iter_variable('test', chunk_bytes=2000))
+            assert len(chunks) > 1
+            npt.assert_equal(np.concatenate(chunks, axis=-1), test_array)
+        finally:
+            self.mlab.chunk_bytes = chunk_bytes
+
+    # On Linux, big arrays go through files in /dev/shm
+    def test_shared(self):
+        shared_bytes = self.mlab.shared_bytes
+        self.mlab.shared_bytes = 1000
+        try:
+            for test_array in [np.random.random_sample((40, 30)),
+                               np.random.random_sample((100, 100)) > 0.5,
+                               np.random.random_sample((20, 30)) * 1j]:
+                self.mlab.set_variable('test', test_array)
+                npt.assert_equal(self.mlab.get_variable('test'), test_array)
+            if self.mlab.shared_dir is not None:
+                # Only the files of the last request are left
+                npt.assert_equal(len(os.listdir(self.mlab.shared_dir)), 1)
+        finally:
+            self.mlab.shared_bytes = shared_bytes
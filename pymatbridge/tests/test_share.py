@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+
+class TestShare:
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = tu.connect_to_matlab()
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def test_share(self):
+        data = np.random.random_sample((30, 4))
+        shared = self.mlab.share('u', data)
+        npt.assert_equal(self.mlab.get_variable('u'), data)
+        npt.assert_almost_equal(self.mlab.run_func('sum', shared, 1)['result'],
+                                data.sum(0)[None])
+
+        # Changes are only seen after sync
+        shared.array[:] = 2
+        npt.assert_equal(self.mlab.get_variable('u'), data)
+        shared.sync()
+        npt.assert_equal(self.mlab.run_func('sum', shared, 1)['result'],
+                         [[60, 60, 60, 60]])
+
+        # And the other way around, after pull
+        self.mlab.run_code('u = u * 3;')
+        shared.pull()
+        npt.assert_equal(shared.array, 6)
+
+        shared.close()
+        assert not os.path.exists(shared.path)
+
+    def test_types(self):
+        for data in [np.arange(10, dtype=np.int16), np.ones((2, 3, 4), bool)]:
+            shared = self.mlab.share('v', data)
+            result = self.mlab.get_variable('v')
+            npt.assert_equal(result.dtype, data.dtype)
+            npt.assert_equal(result.ravel(), data.ravel())
+            shared.close()
+        npt.assert_raises(TypeError, self.mlab.share, 'v', np.ones(3) * 1j)
@@ -0,0 +1,46 @@
+import sys
+
+import pymatbridge as pymat
+from pymatbridge.testing import FakeSession
+import numpy.testing as npt
+import test_utils as tu
+
+
+def test_start_no_wait():
+    mlab = tu.new_session()
+    startup = mlab.start(wait=False)
+    npt.assert_(startup.session is mlab)
+    npt.assert_(startup.result() is mlab)
+    npt.assert_(startup.done())
+    npt.assert_(mlab.is_connected())
+    tu.stop_matlab(mlab)
+
+
+def test_start_sessions():
+    sessions = pymat.start_sessions([tu.new_session() for _ in range(2)])
+    for mlab in sessions:
+        npt.assert_equal(mlab.run_func('plus', 1., 2.)['result'], 3)
+        tu.stop_matlab(mlab)
+
+
+def test_server_process():
+    mlab = tu.connect_to_matlab()
+    npt.assert_(mlab.process.poll() is None)
+    npt.assert_(isinstance(mlab.server_output(), str))
+    npt.assert_equal(mlab.server_output(0), '')
+    tu.stop_matlab(mlab)
+
+
+# When one session fails to start, the others are stopped or killed, even
+# those still waiting for their server to answer
+def test_start_sessions_failure():
+    good = FakeSession()
+    failing = FakeSession(startup_options='--latency nonsense')
+    hanging = FakeSession()
+    hanging.executable = '"%s" -c "import time; time.sleep(60)"' % sys.executable
+    sessions = [good, failing, hanging]
+    npt.assert_raises(pymat.ServerExitError, pymat.start_sessions, sessions)
+    for mlab in sessions:
+        npt.assert_(not mlab.started)
+        npt.assert_(mlab.process.wait(10) is not None)
+        npt.assert_(mlab.stop())
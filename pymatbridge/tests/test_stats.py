@@ -0,0 +1,70 @@
+import numpy as np
+import numpy.testing as npt
+import test_utils as tu
+
+from pymatbridge import CallStats
+
+
+def record(cmd, wait, **server):
+    return dict(cmd=cmd, encode=0., send=0., wait=wait, recv=0., decode=0.,
+                bytes_out=10, bytes_in=20, server=server)
+
+
+class TestCallStats(object):
+
+    def test_summary(self):
+        stats = CallStats()
+        for wait in range(1, 101):
+            stats.add(record('call', wait, eval=wait / 2., memory=100))
+        stats.add(record('get', 1.))
+        summary = stats.summary()
+        npt.assert_equal(sorted(summary), ['call', 'get'])
+        call = summary['call']
+        npt.assert_equal((call['count'], call['bytes_out'], call['bytes_in'],
+                          call['memory']), (100, 1000, 2000, 100))
+        npt.assert_almost_equal(call['times']['wait']['p50'], 50.5)
+        npt.assert_almost_equal(call['times']['total']['p99'], 99.01)
+        npt.assert_almost_equal(call['times']['server_eval']['p50'], 25.25)
+        npt.assert_equal(summary['get']['memory'], -1)
+
+    def test_max_samples(self):
+        stats = CallStats(max_samples=10)
+        for wait in range(100):
+            stats.add(record('call', wait))
+        summary = stats.summary(percentiles=(0,))
+        npt.assert_equal(summary['call']['count'], 100)
+        npt.assert_equal(summary['call']['times']['wait']['p0'], 90)
+
+
+class TestStats(object):
+
+    # Start a Matlab session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = tu.connect_to_matlab()
+
+    # Tear down the Matlab session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        tu.stop_matlab(cls.mlab)
+
+    def test_stats(self):
+        records = []
+        self.mlab.stats(reset=True)
+        self.mlab.stats_hook = records.append
+        try:
+            self.mlab.run_func('svd', np.random.random_sample((50, 50)))
+            self.mlab.set_variable('pymat_test_x', np.ones(10))
+        finally:
+            self.mlab.stats_hook = None
+
+        stats = self.mlab.stats()
+        npt.assert_equal(sorted(stats), ['eval', 'set'])
+        npt.assert_equal(stats['eval']['count'], 1)
+        assert stats['eval']['bytes_out'] >= 50 * 50 * 8
+        times = stats['eval']['times']
+        for phase in ['encode', 'send', 'wait', 'recv', 'decode', 'total',
+                      'server_decode', 'server_path', 'server_eval',
+                      'server_figures', 'server_encode', 'server_total']:
+            assert times[phase]['p50'] >= 0, phase
+        npt.assert_equal([r['cmd'] for r in records], ['eval', 'set'])
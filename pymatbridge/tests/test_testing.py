@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import numpy as np
+import numpy.testing as npt
+from pymatbridge import SessionPool
+from pymatbridge.testing import FakeSession, AsyncFakeSession
+
+
+class TestFakeSession:
+
+    # Start a fake session before running any tests
+    @classmethod
+    def setup_class(cls):
+        cls.mlab = FakeSession()
+        cls.mlab.start()
+        npt.assert_(cls.mlab.is_connected())
+
+    # Tear down the fake session after running all the tests
+    @classmethod
+    def teardown_class(cls):
+        cls.mlab.stop()
+        npt.assert_(not cls.mlab.is_connected())
+
+    def test_run_func(self):
+        x = np.random.random_sample((3, 4))
+        res = self.mlab.run_func('plus', x, 1)
+        npt.assert_(res['success'])
+        npt.assert_equal(res['content'], dict(stdout='', figures=[]))
+        npt.assert_almost_equal(res['result'], x + 1)
+        npt.assert_almost_equal(self.mlab.run_func('feval', 'sqrt',
+                                                   4.)['result'], 2.)
+
+    def test_run_code(self):
+        res = self.mlab.run_code('a = ones(2) * 3; disp(numel(a))')
+        npt.assert_equal(res['content']['stdout'], '4\n')
+        npt.assert_equal(self.mlab.get_variable('a'), 3 * np.ones((2, 2)))
+
+    def test_errors(self):
+        res = self.mlab.run_func('no_such_function')
+        npt.assert_(not res['success'])
+        npt.assert_equal(res['content']['stdout'],
+                         "Undefined function or variable 'no_such_function'.")
+        npt.assert_(not self.mlab.run_code('b = no_such_variable')['success'])
+        # Matlab syntax isn't ignored, but fails
+        self.mlab.set_variable('a', 1.)
+        res = self.mlab.run_code('a = [1 2 3 4];')
+        npt.assert_(not res['success'])
+        npt.assert_equal(res['content']['stdout'],
+                         "The fake server can't run 'a = [1 2 3 4]'.")
+        npt.assert_equal(self.mlab.get_variable('a'), 1.)
+        npt.assert_equal(self.mlab.get_variable('no_such_variable', 1), 1)
+
+    def test_set_variable(self):
+        for dtype in ('float64', 'float32', 'int32', 'uint8', 'bool',
+                      'complex128'):
+            x = (np.random.random_sample((5, 4)) * 100).astype(dtype)
+            self.mlab.set_variable('x', x)
+            npt.assert_equal(self.mlab.get_variable('x'), x)
+        self.mlab.set_variable('s', dict(a=1., b='text'))
+        npt.assert_equal(self.mlab.get_variable('s'), dict(a=1., b='text'))
+        info = dict((v['name'], v) for v in self.mlab.whos())
+        npt.assert_equal((info['x']['class'], info['x']['size'],
+                          info['x']['complex']), ('double', (5, 4), True))
+
+    # Big arguments are kept by the server, and only sent once
+    def test_blobs(self):
+        # Smaller than the arrays handed over through files
+        self.mlab.blob_bytes = 2**16
+        x = np.random.random_sample(self.mlab.blob_bytes // 8)
+        sent = []
+        self.mlab.stats_hook = lambda record: sent.append(record['bytes_out'])
+        try:
+            for _ in range(2):
+                res = self.mlab.run_func('sum', x)
+                npt.assert_almost_equal(res['result'], x.sum())
+        finally:
+            self.mlab.stats_hook = None
+            del self.mlab.blob_bytes
+        npt.assert_(sent[0] > x.nbytes > 100 * sent[1])
+
+    def test_batch(self):
+        with self.mlab.batch() as b:
+            b.set_variable('y', 2.)
+            stdout = b.run_code('disp(y)')
+            y = b.get_variable('y')
+        npt.assert_(b.success)
+        npt.assert_equal(stdout.get()['content']['stdout'], '2.0\n')
+        npt.assert_equal(y.get(), 2.)
+
+        with self.mlab.batch() as b:
+            b.run_code('c = 1')
+            b.run_code('c = no_such_variable')
+            b.run_code('c = 2')
+        npt.assert_(not b.success)
+        npt.assert_equal(b.failed, 1)
+        npt.assert_equal(self.mlab.get_variable('c'), 1)
+
+    def test_stats(self):
+        self.mlab.stats(reset=True)
+        self.mlab.run_func('plus', 1, 2, capture=False)
+        times = self.mlab.stats()['call']['times']
+        npt.assert_(times['server_request']['p50']
+                    <= times['server_total']['p50'])
+
+    def test_methods(self):
+        npt.assert_('sqrt' in dir(self.mlab))
+        npt.assert_equal(self.mlab.sqrt(9.)['result'], 3.)
+
+
+class TestLatency:
+
+    def test_session(self):
+        mlab = FakeSession(latency=0.1)
+        mlab.start()
+        try:
+            start = time.time()
+            mlab.run_func('plus', 1, 2)
+            npt.assert_(time.time() - start >= 0.1)
+            # Getting a variable doesn't call a function
+            start = time.time()
+            mlab.get_variable('x')
+            npt.assert_(time.time() - start < 0.1)
+        finally:
+            mlab.stop()
+
+    # The calls of a pool run in parallel
+    def test_pool(self):
+        with SessionPool(2, backend=FakeSession, latency=0.2) as pool:
+            start = time.time()
+            npt.assert_equal(list(pool.map('sqrt', [1., 4., 9., 16.])),
+                             [1., 2., 3., 4.])
+            npt.assert_(time.time() - start < 0.8)
+
+    # Requests are queued to the server without waiting for each reply
+    def test_async(self):
+        async def gather():
+            mlab = AsyncFakeSession(latency=0.05)
+            await mlab.start()
+            try:
+                calls = [mlab.run_func('sqrt', float(i * i))
+                         for i in range(5)]
+                return await asyncio.gather(*calls)
+            finally:
+                await mlab.stop()
+
+        results = asyncio.new_event_loop().run_until_complete(gather())
+        npt.assert_equal([r['result'] for r in results], list(range(5)))
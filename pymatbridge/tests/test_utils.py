@@ -1,12 +1,30 @@
 import os
+from unittest import SkipTest
 import pymatbridge as pymat
+from pymatbridge.testing import FakeSession
 import numpy.testing as npt
 
 def on_octave():
     return bool(os.environ.get('USE_OCTAVE', False))
 
+def on_fake():
+    return bool(os.environ.get('USE_FAKE', False))
+
+def skip_on_fake(reason='Needs Matlab or Octave'):
+    """Skip a test (or a test class, from setup_class) that the fake server
+    can't run, e.g. Matlab syntax, m-files or figures"""
+    if on_fake():
+        raise SkipTest(reason)
+
+def new_session(**kwargs):
+    if on_fake():
+        return FakeSession(**kwargs)
+    if on_octave():
+        return pymat.Octave(**kwargs)
+    return pymat.Matlab(log=True, **kwargs)
+
 def connect_to_matlab():
-    mlab = pymat.Octave() if on_octave() else pymat.Matlab(log=True)
+    mlab = new_session()
     mlab.start()
     npt.assert_(mlab.is_connected(), msg = "connect_to_matlab(): Connection failed")
 
@@ -92,6 +92,7 @@ REQUIRES = ['pyzmq']
 EXTRAS_REQUIRE = {
     'sparse arrays':  ["scipy>=0.13.0"],
     'ipython': ["ipython>=3.0"],
+    'pool': ["futures; python_version < '3.0'"],
 }
 
 BIN=['scripts/publish-notebook']